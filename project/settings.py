@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     "rest_framework_simplejwt",
     "django_ratelimit",
     "drf_yasg",
+    "django_filters",
     # Local apps
     "accounts",
     "wallet",
@@ -154,6 +155,32 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:63
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "wallet-daily-aggregates": {
+        "task": "wallet.tasks.roll_up_daily_aggregates",
+        "schedule": float(os.getenv("WALLET_ROLLUP_INTERVAL_SECONDS", 60)),
+    },
+    "wallet-outbox": {
+        "task": "wallet.tasks.dispatch_outbox",
+        "schedule": float(os.getenv("WALLET_OUTBOX_INTERVAL_SECONDS", 1)),
+    },
+    "wallet-requeue-transfers": {
+        "task": "wallet.tasks.requeue_async_transfers",
+        "schedule": float(os.getenv("WALLET_TRANSFER_REQUEUE_INTERVAL_SECONDS", 60)),
+    },
+    "wallet-expire-holds": {
+        "task": "wallet.tasks.expire_wallet_holds",
+        "schedule": float(os.getenv("WALLET_HOLD_SWEEP_INTERVAL_SECONDS", 60)),
+    },
+    "wallet-pending-payments": {
+        "task": "wallet.tasks.sweep_pending_payments",
+        "schedule": float(os.getenv("WALLET_PAYMENT_SWEEP_INTERVAL_SECONDS", 300)),
+    },
+    "wallet-ledger-partitions": {
+        "task": "wallet.tasks.ensure_ledger_partitions",
+        "schedule": float(os.getenv("WALLET_LEDGER_PARTITIONS_INTERVAL_SECONDS", 3600)),
+    },
+}
 
 # Django Ratelimit
 RATELIMIT_ENABLED = not DEBUG
@@ -190,6 +217,57 @@ REGISTRATION_TOKEN_EXPIRATION_MINUTES = 10
 PASSWORD_RESET_TOKEN_EXPIRATION_MINUTES = 5
 PREVIOUS_PASSWORD_COUNT = 5
 
+# Zarinpal payment gateway
+ZARINPAL_MERCHANT_ID = os.getenv(
+    "ZARINPAL_MERCHANT_ID", "cb2833bb-f8d9-4535-9b16-b68202fc686a"
+)
+ZARINPAL_BASE_URL = os.getenv("ZARINPAL_BASE_URL", "https://sandbox.zarinpal.com")
+ZARINPAL_CALLBACK_URL = os.getenv("ZARINPAL_CALLBACK_URL", "http://127.0.0.1:8000")
+ZARINPAL_CONNECT_TIMEOUT = float(os.getenv("ZARINPAL_CONNECT_TIMEOUT", 3))
+ZARINPAL_READ_TIMEOUT = float(os.getenv("ZARINPAL_READ_TIMEOUT", 10))
+ZARINPAL_VERIFY_RETRIES = int(os.getenv("ZARINPAL_VERIFY_RETRIES", 2))
+ZARINPAL_POOL_SIZE = int(os.getenv("ZARINPAL_POOL_SIZE", 20))
+
+# Cached WalletDetailView payloads; writes refresh them, the TTL bounds staleness
+WALLET_CACHE_TIMEOUT = int(os.getenv("WALLET_CACHE_TIMEOUT", 300))
+
+# Lifetime of the Redis marker of an in-flight Idempotency-Key request; a
+# crashed request blocks retries of its key for at most this long
+WALLET_IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("WALLET_IDEMPOTENCY_LOCK_SECONDS", 60))
+
+# Cold ledger archive (archive_ledger command)
+WALLET_ARCHIVE_DIR = Path(os.getenv("WALLET_ARCHIVE_DIR", BASE_DIR / "archive" / "ledger"))
+WALLET_ARCHIVE_SHARDS = int(os.getenv("WALLET_ARCHIVE_SHARDS", 16))
+WALLET_ARCHIVE_CHUNK_ROWS = int(os.getenv("WALLET_ARCHIVE_CHUNK_ROWS", 5000))
+
+# Monthly ledger partitions: ensure_ledger_partitions keeps this many
+# future months created and logs an error when fewer than the minimum exist
+WALLET_LEDGER_PARTITIONS_AHEAD = int(os.getenv("WALLET_LEDGER_PARTITIONS_AHEAD", 3))
+WALLET_LEDGER_PARTITIONS_MIN_AHEAD = int(os.getenv("WALLET_LEDGER_PARTITIONS_MIN_AHEAD", 2))
+
+# Daily aggregate rollup: only rows at least this old are folded in, so
+# transactions that commit late are not skipped
+WALLET_ROLLUP_LAG_SECONDS = int(os.getenv("WALLET_ROLLUP_LAG_SECONDS", 300))
+
+# Topic exchange on the Celery broker that wallet events are published to
+WALLET_EVENTS_EXCHANGE = os.getenv("WALLET_EVENTS_EXCHANGE", "wallet.events")
+
+# Async transfers are spread over this many Celery queues by sender wallet;
+# run one single-process worker per queue (wallet.transfers.0, ...)
+WALLET_TRANSFER_QUEUES = int(os.getenv("WALLET_TRANSFER_QUEUES", 8))
+# Pending transfers whose task was still not handed to the broker this long
+# after they were accepted are sent by requeue_async_transfers
+WALLET_TRANSFER_REQUEUE_AFTER_SECONDS = int(os.getenv("WALLET_TRANSFER_REQUEUE_AFTER_SECONDS", 60))
+
+# Holds (WalletService.hold) not captured or released within this many
+# seconds are expired by the expire_wallet_holds task
+WALLET_HOLD_TTL_SECONDS = int(os.getenv("WALLET_HOLD_TTL_SECONDS", 900))
+
+# Payments still pending this long are verified by sweep_pending_payments,
+# this many gateway calls at a time
+WALLET_PAYMENT_SWEEP_AFTER_SECONDS = int(os.getenv("WALLET_PAYMENT_SWEEP_AFTER_SECONDS", 1800))
+WALLET_PAYMENT_SWEEP_WORKERS = int(os.getenv("WALLET_PAYMENT_SWEEP_WORKERS", 8))
+
 # ==============================================================================
 # Logging
 # ==============================================================================
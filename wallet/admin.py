@@ -2,11 +2,33 @@ from django.contrib import admin
 from .models import (
     Wallet,
     WalletTransaction,
-    Payment
+    Payment,
+    IdempotencyKey,
+    ArchivedLedgerChunk,
+    WalletBalanceCheckpoint,
+    WalletDailyAggregate,
+    LedgerWatermark,
+    WalletStatement,
+    JournalEntry,
+    JournalPosting,
+    OutboxEvent,
+    AsyncTransfer,
+    WalletHold,
 )
 
 
 
 admin.site.register(Wallet)
 admin.site.register(WalletTransaction)
-admin.site.register(Payment)
\ No newline at end of file
+admin.site.register(Payment)
+admin.site.register(IdempotencyKey)
+admin.site.register(ArchivedLedgerChunk)
+admin.site.register(WalletBalanceCheckpoint)
+admin.site.register(WalletDailyAggregate)
+admin.site.register(LedgerWatermark)
+admin.site.register(WalletStatement)
+admin.site.register(JournalEntry)
+admin.site.register(JournalPosting)
+admin.site.register(OutboxEvent)
+admin.site.register(AsyncTransfer)
+admin.site.register(WalletHold)
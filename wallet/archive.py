@@ -0,0 +1,255 @@
+# wallet/archive.py
+"""
+Cold archive of old ledger rows.
+
+``archive_month`` moves one calendar month of ``WalletTransaction`` rows
+out of the database into gzip-compressed, column-major chunk files under
+``WALLET_ARCHIVE_DIR``: one file per wallet shard
+(``wallet_id % WALLET_ARCHIVE_SHARDS``) and month. Each file is a series
+of independent gzip members of up to ``WALLET_ARCHIVE_CHUNK_ROWS`` rows,
+and every member is indexed by an ``ArchivedLedgerChunk`` row, so a reader
+seeks straight to the few chunks that can hold a wallet's rows.
+
+Archived rows keep their ids and timestamps. The history paginator and
+the export read them after the rows still in the database.
+"""
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import connection, transaction
+from . import partitions
+from .money import DEFAULT_CURRENCY, to_minor
+from .models import ArchivedLedgerChunk, Wallet, WalletTransaction
+
+ARCHIVE_FIELDS = ["id", "wallet_id", "transaction_type", "amount", "description", "created_at"]
+
+
+def shard_of(wallet_id) -> int:
+    return uuid.UUID(str(wallet_id)).int % settings.WALLET_ARCHIVE_SHARDS
+
+
+def _encode_chunk(rows) -> bytes:
+    columns = {field: [] for field in ARCHIVE_FIELDS}
+    for pk, wallet_id, transaction_type, amount, description, created_at in rows:
+        columns["id"].append(pk.hex)
+        columns["wallet_id"].append(wallet_id.hex)
+        columns["transaction_type"].append(transaction_type)
+        columns["amount"].append(amount)
+        columns["description"].append(description)
+        columns["created_at"].append(created_at.isoformat())
+    return gzip.compress(json.dumps(columns, separators=(",", ":")).encode())
+
+
+def _decode_chunk(data: bytes, wallet_id=None, currency=DEFAULT_CURRENCY) -> list[tuple]:
+    """
+    The rows of a chunk, only those of ``wallet_id`` if given. Chunks
+    written before migration 0016 hold decimal strings in major units; they
+    are converted with ``currency``, the wallet's, as 0015 did for the
+    rows still in the database.
+    """
+    columns = json.loads(gzip.decompress(data))
+    rows = zip(*(columns[field] for field in ARCHIVE_FIELDS))
+    if wallet_id is not None:
+        rows = (row for row in rows if row[1] == wallet_id.hex)
+    return [
+        (
+            uuid.UUID(pk),
+            uuid.UUID(row_wallet_id),
+            transaction_type,
+            amount if isinstance(amount, int) else to_minor(amount, currency),
+            description,
+            datetime.fromisoformat(created_at),
+        )
+        for pk, row_wallet_id, transaction_type, amount, description, created_at in rows
+    ]
+
+
+class _ShardFile:
+    """
+    Appends gzip chunks to one shard/month file and records their index
+    entries. Written under a temporary name and renamed once complete.
+    """
+
+    def __init__(self, month, shard, batch):
+        self.month = month
+        self.shard = shard
+        self.path = f"{month:%Y-%m}/shard-{shard:02d}-{batch}.json.gz"
+        self.full_path = Path(settings.WALLET_ARCHIVE_DIR) / self.path
+        self.full_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(f"{self.full_path}.tmp", "wb")
+        self.pending = []
+        self.chunks = []
+
+    def add(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= settings.WALLET_ARCHIVE_CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        data = _encode_chunk(self.pending)
+        self.chunks.append(
+            ArchivedLedgerChunk(
+                month=self.month.date(),
+                shard=self.shard,
+                path=self.path,
+                offset=self.file.tell(),
+                length=len(data),
+                row_count=len(self.pending),
+                first_wallet_id=self.pending[0][1],
+                last_wallet_id=self.pending[-1][1],
+                min_created_at=min(row[5] for row in self.pending),
+                max_created_at=max(row[5] for row in self.pending),
+            )
+        )
+        self.file.write(data)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(f"{self.full_path}.tmp", self.full_path)
+
+
+def _drop_rows(month, expected):
+    """
+    Remove an archived month from the ledger. A month with its own
+    partition is detached and dropped, which writes no per-row WAL and
+    leaves no dead tuples behind. Otherwise the rows are deleted.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for partition in partitions.list_partitions(cursor):
+                if partition.lower == month and partition.upper == partitions.add_months(month, 1):
+                    cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(partition.name)}")
+                    if cursor.fetchone()[0] != expected:
+                        break
+                    partitions.detach_partition(cursor, partition.name)
+                    cursor.execute(f"DROP TABLE {connection.ops.quote_name(partition.name)}")
+                    return
+
+    deleted, _ = WalletTransaction.objects.filter(
+        created_at__gte=month, created_at__lt=partitions.add_months(month, 1)
+    ).delete()
+    if deleted != expected:
+        raise RuntimeError(
+            f"{month:%Y-%m} changed while it was archived ({deleted} rows, expected {expected})."
+        )
+
+
+def archive_month(month: datetime) -> dict:
+    """
+    Archive every ledger row created in ``month`` (a UTC month start).
+    Files are written first; the index rows and the removal of the
+    database rows then commit together, so a crash leaves either the rows
+    in the database or the index pointing at complete files. Rows that
+    arrive in the month while it is archived make the removal fail and roll
+    back, leaving only unindexed files behind. Returns the row count and
+    compressed size.
+    """
+    batch = uuid.uuid4().hex[:8]
+    rows = (
+        WalletTransaction.objects.filter(
+            created_at__gte=month, created_at__lt=partitions.add_months(month, 1)
+        )
+        .order_by("wallet_id", "created_at", "id")
+        .values_list(*ARCHIVE_FIELDS, "counterparty_wallet__user__username")
+        .iterator(chunk_size=settings.WALLET_ARCHIVE_CHUNK_ROWS)
+    )
+
+    files = {}
+    count = 0
+    for *row, counterparty in rows:
+        # Archived rows keep the rendered description, not the counterparty.
+        row[4] = WalletTransaction.render_description(row[2], row[4], counterparty)
+        shard = shard_of(row[1])
+        if shard not in files:
+            files[shard] = _ShardFile(month, shard, batch)
+        files[shard].add(row)
+        count += 1
+    for shard_file in files.values():
+        shard_file.close()
+
+    chunks = [chunk for shard_file in files.values() for chunk in shard_file.chunks]
+    with transaction.atomic():
+        ArchivedLedgerChunk.objects.bulk_create(chunks)
+        _drop_rows(month, count)
+    return {"rows": count, "bytes": sum(chunk.length for chunk in chunks)}
+
+
+def _read_chunk(chunk, wallet_id, currency) -> list[tuple]:
+    with open(Path(settings.WALLET_ARCHIVE_DIR) / chunk.path, "rb") as f:
+        f.seek(chunk.offset)
+        return _decode_chunk(f.read(chunk.length), wallet_id, currency)
+
+
+def wallet_months(wallet_id, since=None, until=None, descending=False):
+    """
+    Yield the archived rows of one wallet month by month, each month
+    as a list of ``ARCHIVE_FIELDS`` tuples sorted by ``(created_at, id)``
+    (newest first when ``descending``). Only rows in ``[since, until)``
+    are returned.
+    """
+    wallet_id = uuid.UUID(str(wallet_id))
+    chunks = ArchivedLedgerChunk.objects.filter(
+        shard=shard_of(wallet_id),
+        first_wallet_id__lte=wallet_id,
+        last_wallet_id__gte=wallet_id,
+    )
+    if since is not None:
+        chunks = chunks.filter(max_created_at__gte=since)
+    if until is not None:
+        chunks = chunks.filter(min_created_at__lt=until)
+
+    by_month = {}
+    for chunk in chunks.order_by("month", "path", "offset"):
+        by_month.setdefault(chunk.month, []).append(chunk)
+    if not by_month:
+        return
+    currency = (
+        Wallet.objects.filter(id=wallet_id).values_list("currency", flat=True).first()
+        or DEFAULT_CURRENCY
+    )
+
+    for month in sorted(by_month, reverse=descending):
+        rows = [
+            row
+            for chunk in by_month[month]
+            for row in _read_chunk(chunk, wallet_id, currency)
+            if (since is None or row[5] >= since)
+            and (until is None or row[5] < until)
+        ]
+        rows.sort(key=lambda row: (row[5], row[0]), reverse=descending)
+        yield rows
+
+
+def history(
+    wallet_id, before=None, limit=10, since=None, until=None, match=None
+) -> list[WalletTransaction]:
+    """
+    Up to ``limit`` archived transactions of a wallet, newest first,
+    strictly older than the ``(created_at, id)`` position ``before``.
+    ``since``, ``until`` and the ``match`` predicate narrow the rows the
+    way the history filters narrow the database rows.
+    """
+    found = []
+    if before and (until is None or before[0] < until):
+        until = before[0] + timedelta(microseconds=1)
+    for rows in wallet_months(wallet_id, since=since, until=until, descending=True):
+        for row in rows:
+            if before and (row[5], row[0]) >= before:
+                continue
+            entry = WalletTransaction(**dict(zip(ARCHIVE_FIELDS, row)))
+            if match is not None and not match(entry):
+                continue
+            found.append(entry)
+            if len(found) == limit:
+                return found
+    return found
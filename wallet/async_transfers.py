@@ -0,0 +1,179 @@
+# wallet/async_transfers.py
+"""
+Transfers accepted now and executed later, in order per sender wallet.
+
+``submit`` only inserts an ``AsyncTransfer`` row and, once that commits,
+sends its id to one of ``WALLET_TRANSFER_QUEUES`` Celery queues, chosen
+by hashing the sender wallet id. Every transfer of a sender therefore
+lands on the same queue. Each queue is meant to be consumed by a single
+worker process running one task at a time, e.g. for queue 3:
+
+    celery -A project worker -Q wallet.transfers.3 -c 1 --prefetch-multiplier 1
+
+so a sender's transfers run one after another in submission order, and
+different senders run in parallel on different queues. Two workers never
+hold the same sender's row lock, which leaves receiver rows as the only
+locks workers can wait on.
+
+``execute`` runs ``WalletService.transfer_funds`` and records the outcome
+in the same transaction. A redelivered task finds the transfer no longer
+pending and does nothing, so a transfer is never applied twice. It never
+runs a transfer while an older one of the same sender is pending: it
+runs those first, oldest first, so a redelivered, retried or re-sent
+task cannot overtake its sender's earlier transfers. Errors other than a
+rejected transfer (``ValueError``) are retried in place, sleeping between
+attempts without giving up the queue; once ``RETRY_ATTEMPTS`` run out the
+transfer is recorded as failed.
+
+A transfer's ``queued_at`` is set once its task has been handed to the
+broker. One still unset ``WALLET_TRANSFER_REQUEUE_AFTER_SECONDS`` after
+the transfer was accepted had its publish fail or never run, and
+``requeue_stale`` (the ``requeue_async_transfers`` beat task) sends it.
+Tasks that were handed over are not re-sent: the broker redelivers them
+if their worker dies.
+"""
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import AsyncTransfer, Wallet
+from .services import WalletService, retry_on_conflict
+
+QUEUE_PREFIX = "wallet.transfers"
+RETRY_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def queue_name(wallet_id) -> str:
+    return f"{QUEUE_PREFIX}.{wallet_id.int % settings.WALLET_TRANSFER_QUEUES}"
+
+
+def submit(sender_wallet: Wallet, receiver_wallet_id, amount: int) -> AsyncTransfer:
+    """
+    Accept a transfer for later execution. Only checks what needs no
+    query; insufficient funds or a missing receiver fail it when it runs.
+    """
+    if sender_wallet.id == receiver_wallet_id:
+        raise ValueError("Cannot transfer funds to your own wallet.")
+    if amount <= 0:
+        raise ValueError("The transfer amount must be positive.")
+
+    transfer = AsyncTransfer.objects.create(
+        sender_wallet=sender_wallet, receiver_wallet_id=receiver_wallet_id, amount=amount
+    )
+    # robust: a failed publish must not fail the committed request;
+    # requeue_stale sends the task later.
+    transaction.on_commit(lambda: _send(transfer), robust=True)
+    return transfer
+
+
+def _send(transfer: AsyncTransfer) -> None:
+    from .tasks import execute_async_transfer
+
+    execute_async_transfer.apply_async(
+        args=[str(transfer.id)], queue=queue_name(transfer.sender_wallet_id)
+    )
+    AsyncTransfer.objects.filter(id=transfer.id, queued_at=None).update(
+        queued_at=timezone.now()
+    )
+
+
+def execute(transfer_id) -> str:
+    """
+    Run a pending transfer after the sender's older pending ones; returns
+    its final status.
+    """
+    transfer = AsyncTransfer.objects.only("sender_wallet_id").get(id=transfer_id)
+    while True:
+        oldest = (
+            AsyncTransfer.objects.filter(
+                sender_wallet_id=transfer.sender_wallet_id,
+                status=AsyncTransfer.PENDING,
+                id__lte=transfer.id,
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if oldest is None:
+            break
+        _run_with_retries(oldest)
+    return AsyncTransfer.objects.values_list("status", flat=True).get(id=transfer_id)
+
+
+def _run_with_retries(transfer_id) -> str:
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            return apply_transfer(transfer_id)
+        except Exception as exc:
+            if attempt == RETRY_ATTEMPTS:
+                return fail(transfer_id, exc)
+            delay = min(30, 2**attempt)
+            logger.warning(
+                "Async transfer %s failed (attempt %s/%s), retrying in %ss: %s",
+                transfer_id,
+                attempt,
+                RETRY_ATTEMPTS,
+                delay,
+                exc,
+            )
+            time.sleep(delay)
+
+
+@retry_on_conflict()
+def apply_transfer(transfer_id) -> str:
+    """Run one pending transfer; returns its final status."""
+    with transaction.atomic():
+        transfer = (
+            AsyncTransfer.objects.select_for_update(of=("self",))
+            .select_related("sender_wallet")
+            .get(id=transfer_id)
+        )
+        if transfer.status != AsyncTransfer.PENDING:
+            return transfer.status
+        try:
+            with transaction.atomic():
+                WalletService.transfer_funds(
+                    transfer.sender_wallet, transfer.receiver_wallet_id, transfer.amount
+                )
+        except ValueError as exc:
+            transfer.status = AsyncTransfer.FAILED
+            transfer.error = str(exc)
+        else:
+            transfer.status = AsyncTransfer.SUCCEEDED
+        transfer.completed_at = timezone.now()
+        transfer.save(update_fields=["status", "error", "completed_at"])
+    return transfer.status
+
+
+def fail(transfer_id, exc) -> str:
+    """Record a transfer that could not be run as failed, if still pending."""
+    AsyncTransfer.objects.filter(id=transfer_id, status=AsyncTransfer.PENDING).update(
+        status=AsyncTransfer.FAILED,
+        error=f"The transfer could not be executed: {exc}",
+        completed_at=timezone.now(),
+    )
+    return AsyncTransfer.objects.values_list("status", flat=True).get(id=transfer_id)
+
+
+def requeue_stale(batch_size=500) -> int:
+    """
+    Send the task of up to ``batch_size`` transfers never handed to the
+    broker, ``WALLET_TRANSFER_REQUEUE_AFTER_SECONDS`` after they were
+    accepted, oldest first. Returns the number of transfers sent.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.WALLET_TRANSFER_REQUEUE_AFTER_SECONDS)
+    with transaction.atomic():
+        transfers = list(
+            AsyncTransfer.objects.filter(
+                status=AsyncTransfer.PENDING, queued_at=None, created_at__lte=cutoff
+            )
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:batch_size]
+        )
+        for transfer in transfers:
+            transaction.on_commit(lambda transfer=transfer: _send(transfer), robust=True)
+    return len(transfers)
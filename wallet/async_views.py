@@ -0,0 +1,136 @@
+# wallet/async_views.py
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from . import payments
+from .gateways import get_async_zarinpal_client, httpx
+from .idempotency import IDEMPOTENCY_HEADER, REPLAY_HEADER, run_idempotently
+from .models import Payment, Wallet
+from .serializers import PaymentRequestSerializer, PaymentVerifySerializer
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of a JWT-authenticated DRF APIView.
+
+    DRF views are sync-only, so a gateway round trip would pin a worker
+    thread. These views run natively on ASGI: while a coroutine waits on
+    the gateway the event loop serves other requests.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API, same as DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+        try:
+            self.data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse(
+                {"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        auth = JWTAuthentication()
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+        if raw_token is None:
+            raise AuthenticationFailed("Authentication credentials were not provided.")
+        validated_token = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated_token)
+
+    @staticmethod
+    def to_json_response(response: Response) -> JsonResponse:
+        json_response = JsonResponse(response.data, status=response.status_code)
+        if response.has_header(REPLAY_HEADER):
+            json_response[REPLAY_HEADER] = response[REPLAY_HEADER]
+        return json_response
+
+
+class AsyncPaymentRequestView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        serializer = PaymentRequestSerializer(data=self.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        amount = serializer.validated_data["amount"]
+        description = serializer.validated_data.get("description", "Charge Wallet")
+        email = serializer.validated_data.get("email", request.user.email or "")
+        mobile = serializer.validated_data.get("mobile", request.user.phone_number or "")
+        gateway = get_async_zarinpal_client()
+
+        try:
+            result = await gateway.request_payment(amount, description, email, mobile)
+        except httpx.HTTPError as e:
+            return JsonResponse(
+                {"status": "error", "errors": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        if not (result.get("data") and result["data"].get("code") == 100):
+            return JsonResponse(
+                {"status": "error", "errors": result.get("errors", "Unknown error")},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        authority = result["data"]["authority"]
+        wallet = await Wallet.objects.aget(user=request.user)
+        await Payment.objects.acreate(
+            wallet=wallet, amount=amount, status=Payment.PENDING, authority=authority
+        )
+        return JsonResponse(
+            {
+                "status": "success",
+                "payment_url": gateway.start_pay_url(authority),
+                "authority": authority,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AsyncPaymentVerifyView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        serializer = PaymentVerifySerializer(data=self.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        authority = serializer.validated_data["authority"]
+        payment = await Payment.objects.filter(
+            authority=authority, wallet__user=request.user
+        ).afirst()
+        response = payments.known_outcome(payment)
+        if response is not None:
+            return self.to_json_response(response)
+
+        gateway = get_async_zarinpal_client()
+        try:
+            result = await gateway.verify_payment(payment.amount, authority)
+        except httpx.HTTPError as e:
+            return JsonResponse(
+                {"status": "error", "errors": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        # Only the short DB write leaves the event loop; the gateway call
+        # above did not hold a thread.
+        response = await sync_to_async(run_idempotently)(
+            request.user,
+            request.headers.get(IDEMPOTENCY_HEADER),
+            "payment_verify",
+            self.data,
+            lambda: payments.record_verification(authority, result),
+        )
+        return self.to_json_response(response)
@@ -0,0 +1,145 @@
+# wallet/balance_cache.py
+import json
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from . import metrics
+from .models import Wallet
+from .serializers import WalletSerializer
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:
+    RedisCache = None
+
+logger = logging.getLogger(__name__)
+
+# Entries are stored as "<wallet id>:<version>:<WalletSerializer JSON>", so the
+# compare-and-set below can read the version without decoding the payload.
+# A value is only replaced by a newer version of the same wallet; a different
+# wallet id (a reused user id) always wins.
+_STORE_IF_NEWER = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local wallet_id, version = string.match(current, '^([^:]*):(%d+):')
+    if wallet_id == ARGV[1] and tonumber(version) >= tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+# Serializes the compare-and-set for process-local backends (LocMemCache).
+_local_lock = threading.Lock()
+
+
+def _cache_key(user_id):
+    return f"wallet:detail:{user_id}"
+
+
+def _redis_client():
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if RedisCache is not None and isinstance(backend, RedisCache):
+        return backend.client.get_client(write=True)
+    return None
+
+
+def _load(user_id):
+    client = _redis_client()
+    if client is not None:
+        raw = client.get(cache.make_key(_cache_key(user_id)))
+        value = raw.decode() if raw is not None else None
+    else:
+        value = cache.get(_cache_key(user_id))
+    if value is None:
+        return None
+    return json.loads(value.split(":", 2)[2])
+
+
+def _store(wallet, data) -> bool:
+    """
+    Cache ``data`` for ``wallet`` unless a newer version is already cached.
+    """
+    value = f"{wallet.id}:{wallet.version}:{json.dumps(data, cls=DjangoJSONEncoder)}"
+    timeout = settings.WALLET_CACHE_TIMEOUT
+
+    client = _redis_client()
+    if client is not None:
+        stored = client.eval(
+            _STORE_IF_NEWER,
+            1,
+            cache.make_key(_cache_key(wallet.user_id)),
+            str(wallet.id),
+            wallet.version,
+            value,
+            timeout,
+        )
+        return bool(stored)
+
+    key = _cache_key(wallet.user_id)
+    with _local_lock:
+        current = cache.get(key)
+        if current is not None:
+            wallet_id, version, _ = current.split(":", 2)
+            if wallet_id == str(wallet.id) and int(version) >= wallet.version:
+                return False
+        cache.set(key, value, timeout)
+        return True
+
+
+def _store_quietly(wallet):
+    data = WalletSerializer(wallet).data
+    try:
+        _store(wallet, data)
+    except Exception as exc:
+        logger.warning("Could not cache wallet %s: %s", wallet.id, exc)
+    return data
+
+
+def get_wallet_data(user) -> dict:
+    """
+    ``WalletSerializer`` output for ``user``'s wallet, served from the cache
+    when possible. A miss reads the wallet once and fills the cache.
+    """
+    try:
+        data = _load(user.pk)
+    except Exception as exc:
+        logger.warning("Could not read cached wallet of user %s: %s", user.pk, exc)
+        data = None
+
+    if data is not None:
+        metrics.incr("wallet_cache.hits")
+        return data
+
+    metrics.incr("wallet_cache.misses")
+    wallet = Wallet.objects.select_related("user").get(user=user)
+    return _store_quietly(wallet)
+
+
+def refresh(wallet_ids):
+    """
+    Write the current state of the given wallets through to the cache.
+    """
+    for wallet in Wallet.objects.select_related("user").filter(id__in=wallet_ids):
+        _store_quietly(wallet)
+
+
+def refresh_on_commit(*wallet_ids):
+    """
+    Schedule ``refresh`` for when the current transaction commits, so the
+    cache never sees a balance that could still be rolled back. Every
+    balance UPDATE bumps ``Wallet.version``, so when two refreshes race, the
+    older snapshot cannot overwrite the newer one.
+    """
+    transaction.on_commit(lambda: refresh(wallet_ids), robust=True)
+
+
+def forget(user_id):
+    try:
+        cache.delete(_cache_key(user_id))
+    except Exception as exc:
+        logger.warning("Could not drop cached wallet of user %s: %s", user_id, exc)
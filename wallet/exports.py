@@ -0,0 +1,96 @@
+# wallet/exports.py
+import csv
+import itertools
+import json
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from . import archive
+from .money import format_minor
+from .models import WalletTransaction
+
+EXPORT_FIELDS = ["id", "transaction_type", "amount", "description", "created_at"]
+
+# Rows fetched per round trip of the server-side cursor.
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(wallet, start=None, end=None, transaction_type=None):
+    """
+    Yield a wallet's ledger as plain tuples, oldest first: archived months
+    first, then the database rows via a server-side cursor. Only
+    ``EXPORT_CHUNK_SIZE`` rows (or one archived month) are held in memory at
+    a time. ``start`` and ``end`` are inclusive dates. Amounts are formatted
+    in the wallet's currency.
+    """
+    since = _day_start(start) if start else None
+    until = _day_start(end + timedelta(days=1)) if end else None
+
+    queryset = WalletTransaction.objects.filter(wallet=wallet)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    if transaction_type:
+        queryset = queryset.filter(transaction_type=transaction_type)
+
+    archived = (
+        (pk, row_type, amount, description, created_at, None)
+        for rows in archive.wallet_months(wallet.id, since, until)
+        for pk, _, row_type, amount, description, created_at in rows
+        if not transaction_type or row_type == transaction_type
+    )
+    rows = itertools.chain(
+        archived,
+        queryset.order_by("created_at", "id")
+        .values_list(*EXPORT_FIELDS, "counterparty_wallet__user__username")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE),
+    )
+    return (
+        (
+            pk,
+            row_type,
+            format_minor(amount, wallet.currency),
+            WalletTransaction.render_description(row_type, description, counterparty),
+            created_at,
+        )
+        for pk, row_type, amount, description, created_at, counterparty in rows
+    )
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for pk, transaction_type, amount, description, created_at in rows:
+        yield writer.writerow(
+            [pk, transaction_type, amount, description or "", created_at.isoformat()]
+        )
+
+
+def iter_ndjson(rows):
+    for pk, transaction_type, amount, description, created_at in rows:
+        yield json.dumps(
+            {
+                "id": str(pk),
+                "transaction_type": transaction_type,
+                "amount": str(amount),
+                "description": description,
+                "created_at": created_at.isoformat(),
+            }
+        ) + "\n"
+
+
+RENDERERS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
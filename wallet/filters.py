@@ -0,0 +1,79 @@
+# wallet/filters.py
+from datetime import datetime, time, timedelta
+import django_filters
+from django.utils import timezone
+from .models import WalletTransaction
+from .money import DEFAULT_CURRENCY, to_minor
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class WalletTransactionFilter(django_filters.FilterSet):
+    """
+    Filters of a wallet's history. ``start`` and ``end`` are inclusive
+    dates; ``min_amount`` and ``max_amount`` are inclusive and in major
+    units of the wallet's currency. Each combination is served by an index
+    on ``wallet_id`` (see ``WalletTransaction.Meta.indexes``).
+
+    The criteria are applied by ``filter_queryset`` to database rows and by
+    ``matches`` to archived rows, so both parts of the history agree.
+    """
+
+    transaction_type = django_filters.ChoiceFilter(choices=WalletTransaction.TRANSACTION_TYPES)
+    start = django_filters.DateFilter()
+    end = django_filters.DateFilter()
+    min_amount = django_filters.NumberFilter()
+    max_amount = django_filters.NumberFilter()
+
+    class Meta:
+        model = WalletTransaction
+        fields = ["transaction_type", "start", "end", "min_amount", "max_amount"]
+
+    def is_valid(self):
+        if not super().is_valid():
+            return False
+        data = self.form.cleaned_data
+        currency = self.request.user.wallet.currency if self.request else DEFAULT_CURRENCY
+        start, end = data.get("start"), data.get("end")
+        criteria = {
+            "transaction_type": data.get("transaction_type") or None,
+            "since": _day_start(start) if start else None,
+            "until": _day_start(end + timedelta(days=1)) if end else None,
+        }
+        for name in ("min_amount", "max_amount"):
+            try:
+                criteria[name] = (
+                    to_minor(data[name], currency) if data.get(name) is not None else None
+                )
+            except ValueError as exc:
+                self.form.add_error(name, str(exc))
+        if start and end and start > end:
+            self.form.add_error(None, "start must not be after end.")
+        self.criteria = criteria
+        return not self.form.errors
+
+    def filter_queryset(self, queryset):
+        criteria = self.criteria
+        lookups = {
+            "transaction_type": criteria["transaction_type"],
+            "created_at__gte": criteria["since"],
+            "created_at__lt": criteria["until"],
+            "amount__gte": criteria["min_amount"],
+            "amount__lte": criteria["max_amount"],
+        }
+        return queryset.filter(
+            **{lookup: value for lookup, value in lookups.items() if value is not None}
+        )
+
+    def matches(self, row: WalletTransaction) -> bool:
+        """Whether an archived row passes the same criteria."""
+        criteria = self.criteria
+        return (
+            criteria["transaction_type"] in (None, row.transaction_type)
+            and (criteria["since"] is None or row.created_at >= criteria["since"])
+            and (criteria["until"] is None or row.created_at < criteria["until"])
+            and (criteria["min_amount"] is None or row.amount >= criteria["min_amount"])
+            and (criteria["max_amount"] is None or row.amount <= criteria["max_amount"])
+        )
@@ -0,0 +1,213 @@
+# wallet/gateways.py
+import asyncio
+import functools
+import logging
+import time
+import weakref
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class ZarinpalClient:
+    """
+    Thin client for the Zarinpal v4 payment API.
+
+    One instance keeps a pooled keep-alive ``requests.Session``, so payments
+    reuse TCP/TLS connections instead of handshaking on every call. Every
+    call is bounded by a (connect, read) timeout. Only ``verify_payment`` is
+    retried on connection errors and timeouts; asking for a new payment is
+    not idempotent and is never retried.
+    Failures surface as ``requests.RequestException``.
+    """
+
+    REQUEST_PATH = "/pg/v4/payment/request.json"
+    VERIFY_PATH = "/pg/v4/payment/verify.json"
+    STARTPAY_PATH = "/pg/StartPay/"
+
+    # Verify result codes: 100 = verified, 101 = already verified.
+    VERIFIED_CODES = (100, 101)
+    # Definitive verify failures: -51 = not paid, -54 = invalid or expired
+    # authority. Any other error (rate limit, merchant config, ...) may go
+    # away on a later attempt.
+    REJECTED_CODES = (-51, -54)
+
+    def __init__(
+        self,
+        merchant_id: str | None = None,
+        base_url: str | None = None,
+        callback_url: str | None = None,
+        timeout: tuple[float, float] | None = None,
+        verify_retries: int | None = None,
+        pool_size: int | None = None,
+    ) -> None:
+        self.merchant_id = merchant_id or settings.ZARINPAL_MERCHANT_ID
+        self.base_url = (base_url or settings.ZARINPAL_BASE_URL).rstrip("/")
+        self.callback_url = callback_url or settings.ZARINPAL_CALLBACK_URL
+        self.timeout = timeout or (
+            settings.ZARINPAL_CONNECT_TIMEOUT,
+            settings.ZARINPAL_READ_TIMEOUT,
+        )
+        self.verify_retries = (
+            settings.ZARINPAL_VERIFY_RETRIES if verify_retries is None else verify_retries
+        )
+        self.pool_size = pool_size or settings.ZARINPAL_POOL_SIZE
+        self.session = self._make_session()
+
+    def _make_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_size, max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _post(self, path: str, payload: dict) -> dict:
+        response = self.session.post(
+            f"{self.base_url}{path}", json=payload, timeout=self.timeout
+        )
+        return response.json()
+
+    def _request_payload(self, amount, description, email, mobile) -> dict:
+        return {
+            "merchant_id": self.merchant_id,
+            "amount": amount,
+            "description": description,
+            "callback_url": self.callback_url,
+            "metadata": {"email": email, "mobile": mobile},
+        }
+
+    def _verify_payload(self, amount, authority) -> dict:
+        return {
+            "merchant_id": self.merchant_id,
+            "amount": amount,
+            "authority": authority,
+        }
+
+    def _retry_delay(self, attempt, authority, exc):
+        logger.warning("Zarinpal verify for %s failed (%s), retrying", authority, exc)
+        return 0.2 * 2**attempt
+
+    def request_payment(
+        self, amount: int, description: str, email: str = "", mobile: str = ""
+    ) -> dict:
+        """
+        Ask Zarinpal for a new payment authority. Returns the decoded response,
+        e.g. ``{"data": {"code": 100, "authority": "S000..."}, "errors": []}``.
+        """
+        return self._post(
+            self.REQUEST_PATH,
+            self._request_payload(amount, description, email, mobile),
+        )
+
+    def verify_payment(self, amount: int, authority: str) -> dict:
+        """
+        Verify a payment. Verification is idempotent on Zarinpal's side, so
+        connection failures and timeouts are retried with a short backoff.
+        """
+        payload = self._verify_payload(amount, authority)
+        for attempt in range(self.verify_retries + 1):
+            try:
+                return self._post(self.VERIFY_PATH, payload)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if attempt == self.verify_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt, authority, exc))
+
+    def start_pay_url(self, authority: str) -> str:
+        return f"{self.base_url}{self.STARTPAY_PATH}{authority}"
+
+    @classmethod
+    def is_verified(cls, result: dict) -> bool:
+        data = result.get("data")
+        return bool(data) and data.get("code") in cls.VERIFIED_CODES
+
+    @classmethod
+    def is_rejected(cls, result: dict) -> bool:
+        errors = result.get("errors")
+        return isinstance(errors, dict) and errors.get("code") in cls.REJECTED_CODES
+
+
+class AsyncZarinpalClient(ZarinpalClient):
+    """
+    ``ZarinpalClient`` for async views, built on ``httpx.AsyncClient``.
+    A gateway round trip only suspends the coroutine, so one ASGI worker can
+    keep hundreds of payments in flight. Failures surface as
+    ``httpx.HTTPError``.
+    """
+
+    def _make_session(self):
+        if httpx is None:
+            raise ImproperlyConfigured("AsyncZarinpalClient requires httpx.")
+        connect, read = self.timeout
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+        )
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        response = await self.session.post(f"{self.base_url}{path}", json=payload)
+        try:
+            return response.json()
+        except ValueError as exc:
+            # e.g. an HTML error page from a proxy in front of the gateway
+            raise httpx.DecodingError(
+                f"Gateway replied {response.status_code} without JSON: {exc}",
+                request=response.request,
+            ) from exc
+
+    async def request_payment(
+        self, amount: int, description: str, email: str = "", mobile: str = ""
+    ) -> dict:
+        return await self._post(
+            self.REQUEST_PATH,
+            self._request_payload(amount, description, email, mobile),
+        )
+
+    async def verify_payment(self, amount: int, authority: str) -> dict:
+        payload = self._verify_payload(amount, authority)
+        for attempt in range(self.verify_retries + 1):
+            try:
+                return await self._post(self.VERIFY_PATH, payload)
+            except httpx.TransportError as exc:
+                if attempt == self.verify_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, authority, exc))
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+@functools.lru_cache(maxsize=None)
+def get_zarinpal_client() -> ZarinpalClient:
+    """
+    Process-wide client, so every payment path shares one connection pool.
+    """
+    return ZarinpalClient()
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_zarinpal_client() -> AsyncZarinpalClient:
+    """
+    Shared async client for the running event loop. httpx connections are
+    bound to the loop that opened them, so each loop gets its own pool.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncZarinpalClient()
+    return client
@@ -0,0 +1,152 @@
+# wallet/idempotency.py
+import functools
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from . import metrics
+from .models import IdempotencyKey
+from .services import retry_on_conflict
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+logger = logging.getLogger(__name__)
+
+# How long Redis remembers a completed key. Replays after that still work:
+# they fall through to the IdempotencyKey table, which is the source of
+# truth. While a request runs, its key only lives for
+# WALLET_IDEMPOTENCY_LOCK_SECONDS, so a crashed request does not block
+# retries for long.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cache_call(operation, *args):
+    """Run a cache operation; None if Redis is unavailable."""
+    try:
+        return operation(*args)
+    except Exception as exc:
+        logger.warning("Idempotency cache unavailable: %s", exc)
+        return None
+
+
+def _fingerprint(scope, data):
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{scope}\n{body}".encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored.request_hash != fingerprint:
+        return Response(
+            {
+                "error": "This Idempotency-Key was already used for a different request."
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    metrics.incr("idempotency.replays")
+    return Response(
+        stored.response_body,
+        status=stored.response_status,
+        headers={REPLAY_HEADER: "true"},
+    )
+
+
+@retry_on_conflict()
+def run_and_store(user, key, scope, fingerprint, func):
+    """Run ``func`` and store its response under the key, in one transaction."""
+    with transaction.atomic():
+        response = func()
+        if response.status_code < 500:
+            IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                scope=scope,
+                request_hash=fingerprint,
+                response_status=response.status_code,
+                response_body=response.data,
+            )
+        return response
+
+
+def run_idempotently(user, key, scope, data, func):
+    """
+    Run ``func()`` (which returns a DRF ``Response``) at most once per
+    ``(user, key)``.
+
+    The first call runs ``func`` and stores its response in the same
+    transaction as the wallet changes; any later call with that key gets the
+    stored response back without touching the wallet rows. A Redis
+    ``SET NX`` (``cache.add``) in front lets a new key go straight through
+    and stops concurrent duplicates before they reach the database. If Redis
+    is down, the unique ``(user, key)`` constraint alone keeps the key from
+    being applied twice. Without a key, ``func`` simply runs.
+    """
+    if not key:
+        return func()
+    if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+        return Response(
+            {"error": f"{IDEMPOTENCY_HEADER} is too long."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    fingerprint = _fingerprint(scope, data)
+    cache_key = f"wallet:idempotency:{user.pk}:{key}"
+
+    claimed = _cache_call(
+        cache.add, cache_key, fingerprint, settings.WALLET_IDEMPOTENCY_LOCK_SECONDS
+    )
+    if claimed is False:
+        stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if stored is not None:
+            return _replay(stored, fingerprint)
+        return Response(
+            {"error": "A request with this Idempotency-Key is in progress."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    try:
+        response = run_and_store(user, key, scope, fingerprint, func)
+    except IntegrityError:
+        # Redis forgot the key but the database did not.
+        stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if stored is None:
+            _cache_call(cache.delete, cache_key)
+            raise
+        return _replay(stored, fingerprint)
+    except Exception:
+        _cache_call(cache.delete, cache_key)
+        raise
+
+    if response.status_code >= 500:
+        # Nothing was stored, so let the client try again.
+        _cache_call(cache.delete, cache_key)
+    else:
+        _cache_call(cache.set, cache_key, fingerprint, CACHE_TIMEOUT)
+    return response
+
+
+def idempotent(scope):
+    """
+    Make a money-moving APIView handler safe to retry by honoring the
+    ``Idempotency-Key`` header (see ``run_idempotently``). Requests without
+    the header behave exactly as before.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            return run_idempotently(
+                request.user,
+                request.headers.get(IDEMPOTENCY_HEADER),
+                scope,
+                request.data,
+                lambda: handler(view, request, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,41 @@
+# wallet/ids.py
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    A time-ordered UUID (RFC 9562 version 7): 48 bits of Unix milliseconds,
+    a 12-bit counter and 62 random bits. Keys made one after another sort
+    in creation order, so B-tree inserts append to the rightmost leaf page
+    instead of splitting random ones. The counter keeps ids made within one
+    millisecond in this process ordered too. It starts at a random value
+    each millisecond and, when it wraps, borrows the next millisecond.
+    """
+    global _last_ms, _counter
+    random_bits = int.from_bytes(os.urandom(10), "big")
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Leave headroom so the counter rarely wraps within a millisecond.
+            _counter = (random_bits >> 62) & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms += 1
+                _counter = 0
+        value = (
+            (_last_ms & 0xFFFF_FFFF_FFFF) << 80
+            | 0x7 << 76
+            | _counter << 64
+            | 0b10 << 62
+            | random_bits & 0x3FFF_FFFF_FFFF_FFFF
+        )
+    return uuid.UUID(int=value)
@@ -0,0 +1,125 @@
+# wallet/journal.py
+"""
+Double-entry journal kept next to the single-sided ``WalletTransaction``
+ledger.
+
+Every money movement is a ``JournalEntry`` whose ``JournalPosting`` rows
+sum to zero. Debits are positive and credits negative. Wallets are
+liabilities of the platform, so a wallet's balance is the negated sum of
+its postings. The system accounts are:
+
+- ``GATEWAY_FLOAT``: money collected through the payment gateway. It is
+  debited by charges, so its sum is the float held.
+- ``SETTLEMENT``: payouts owed to the bank. It is credited by settlements.
+- ``PROMOTIONS``: credit the platform grants, such as the welcome bonus.
+- ``OPENING_BALANCES``: the balances wallets already had when the journal
+  was introduced (migration 0012). The journal only records movements
+  from then on; ``backfill_journal_openings`` posts each older wallet's
+  missing balance as one ``OPENING`` entry dated at the wallet's creation.
+
+``WalletService`` records each operation's entries with one
+``bulk_create`` of entries and one of postings, inside the transaction
+that moves the balances.
+"""
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import JournalEntry, JournalPosting
+
+GATEWAY_FLOAT = "GATEWAY_FLOAT"
+SETTLEMENT = "SETTLEMENT"
+PROMOTIONS = "PROMOTIONS"
+OPENING_BALANCES = "OPENING_BALANCES"
+
+SYSTEM_ACCOUNTS = (GATEWAY_FLOAT, SETTLEMENT, PROMOTIONS, OPENING_BALANCES)
+
+
+class Journal:
+    """Collects the entries of one operation and writes them together."""
+
+    def __init__(self):
+        self.entries = []
+        self.postings = []
+
+    def add(self, kind, description, postings, created_at=None) -> JournalEntry:
+        """
+        Add an entry. ``postings`` are ``(account, amount)`` or
+        ``(account, amount, counterparty_wallet_id)`` tuples, where
+        ``account`` is a wallet id or a system account name. The entry is
+        dated now unless ``created_at`` is given.
+        """
+        if sum(posting[1] for posting in postings) != 0:
+            raise ValueError(f"Unbalanced {kind} journal entry.")
+        entry = JournalEntry(
+            kind=kind, description=description, created_at=created_at or timezone.now()
+        )
+        self.entries.append(entry)
+        for account, amount, *counterparty in postings:
+            is_system = account in SYSTEM_ACCOUNTS
+            self.postings.append(
+                JournalPosting(
+                    entry=entry,
+                    wallet_id=None if is_system else account,
+                    system_account=account if is_system else None,
+                    counterparty_wallet_id=counterparty[0] if counterparty else None,
+                    amount=amount,
+                    created_at=entry.created_at,
+                )
+            )
+        return entry
+
+    def save(self):
+        JournalEntry.objects.bulk_create(self.entries)
+        JournalPosting.objects.bulk_create(self.postings)
+
+
+def charge(wallet_id, amount, description="Wallet charged", source=GATEWAY_FLOAT) -> Journal:
+    journal = Journal()
+    kind = "BONUS" if source == PROMOTIONS else "CHARGE"
+    journal.add(kind, description, [(source, amount), (wallet_id, -amount)])
+    return journal
+
+
+def settlement(wallet_id, amount) -> Journal:
+    journal = Journal()
+    journal.add("SETTLEMENT", "Settlement to bank", [(wallet_id, amount), (SETTLEMENT, -amount)])
+    return journal
+
+
+def add_opening(journal, wallet_id, amount, created_at) -> JournalEntry:
+    return journal.add(
+        "OPENING",
+        "Opening balance",
+        [(OPENING_BALANCES, amount), (wallet_id, -amount)],
+        created_at=created_at,
+    )
+
+
+def add_transfer(journal, sender_id, receiver_id, amount) -> JournalEntry:
+    return journal.add(
+        "TRANSFER",
+        "Wallet transfer",
+        [(sender_id, amount, receiver_id), (receiver_id, -amount, sender_id)],
+    )
+
+
+def wallet_balance(wallet_id) -> int:
+    total = JournalPosting.objects.filter(wallet_id=wallet_id).aggregate(total=Sum("amount"))
+    return -(total["total"] or 0)
+
+
+def system_balance(account) -> int:
+    """Debit balance of a system account, e.g. ``GATEWAY_FLOAT`` for the float held."""
+    total = JournalPosting.objects.filter(system_account=account).aggregate(total=Sum("amount"))
+    return total["total"] or 0
+
+
+def transfers_between(wallet_a, wallet_b):
+    """Transfer postings of either wallet with the other, newest first."""
+    return (
+        JournalPosting.objects.filter(
+            Q(wallet_id=wallet_a, counterparty_wallet_id=wallet_b)
+            | Q(wallet_id=wallet_b, counterparty_wallet_id=wallet_a)
+        )
+        .select_related("entry")
+        .order_by("-created_at")
+    )
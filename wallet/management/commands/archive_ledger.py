@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from wallet import archive, partitions, rollups
+from wallet.models import WalletTransaction
+
+
+class Command(BaseCommand):
+    """
+    Move ledger rows older than the retention window into the cold archive
+    (see wallet/archive.py), one month at a time:
+        python manage.py archive_ledger --older-than-months 12
+    Safe to re-run; each month commits on its own. A month is only archived
+    once reconcile_wallets has checkpointed every wallet with rows in it and
+    the daily aggregates are rolled up past it, since neither sees rows that
+    left the database.
+    """
+
+    help = "Archive ledger months older than the retention window to compressed files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-months",
+            type=int,
+            default=12,
+            help="Archive every month that ended at least this many months ago.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = partitions.add_months(
+            partitions.month_start(timezone.now()), -options["older_than_months"]
+        )
+        oldest = WalletTransaction.objects.filter(created_at__lt=cutoff).aggregate(
+            oldest=Min("created_at")
+        )["oldest"]
+        if oldest is None:
+            self.stdout.write("Nothing to archive.")
+            return
+
+        month = partitions.month_start(oldest)
+        while month < cutoff:
+            month_end = partitions.add_months(month, 1)
+            unchecked = (
+                WalletTransaction.objects.filter(created_at__gte=month, created_at__lt=month_end)
+                .exclude(wallet__balance_checkpoint__as_of__gte=month_end)
+                .exists()
+            )
+            if unchecked:
+                raise CommandError(
+                    f"{month:%Y-%m} has wallets without a balance checkpoint past it; "
+                    "run reconcile_wallets first."
+                )
+            mark = rollups.watermark()
+            if mark is None or mark < month_end:
+                raise CommandError(
+                    f"{month:%Y-%m} is not rolled up into the daily aggregates yet; "
+                    "run backfill_daily_aggregates first."
+                )
+            stats = archive.archive_month(month)
+            if stats["rows"]:
+                self.stdout.write(
+                    f"{month:%Y-%m}: archived {stats['rows']} rows into {stats['bytes']} bytes"
+                )
+            month = month_end
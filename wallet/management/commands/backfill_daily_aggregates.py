@@ -0,0 +1,39 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from wallet import rollups
+
+
+class Command(BaseCommand):
+    """
+    Roll the ledger history up into WalletDailyAggregate (see
+    wallet/rollups.py), one chunk of created_at time per transaction:
+        python manage.py backfill_daily_aggregates --chunk-hours 24
+    Starts where the rollup watermark stands (the oldest ledger day on a
+    first run) and stops at the Celery rollup's lag behind the clock, so
+    it can be interrupted and re-run at any time, also alongside beat.
+    """
+
+    help = "Roll ledger history up into per-wallet daily aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-hours",
+            type=int,
+            default=24,
+            help="Hours of ledger rows rolled up per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        until = rollups.settled_before()
+        window = timedelta(hours=options["chunk_hours"])
+        started = time.perf_counter()
+        rolled = 0
+        while (result := rollups.roll_up_window(until, window)) is not None:
+            rolled += result[0]
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{result[1]:%Y-%m-%d %H:%M}: {result[0]} rows")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Rolled up {rolled} rows in {elapsed:.2f}s; watermark at {rollups.watermark():%Y-%m-%d %H:%M:%S}."
+        )
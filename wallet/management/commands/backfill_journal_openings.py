@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from wallet import journal
+from wallet.models import JournalPosting, Wallet
+
+
+class Command(BaseCommand):
+    """
+    Give wallets that predate the journal (migration 0012) an opening
+    balance entry (see wallet/journal.py), so that their journal balance
+    matches Wallet.balance:
+        python manage.py backfill_journal_openings --chunk-size 1000
+    The missing amount is the balance minus what the wallet's postings
+    already account for, read with the wallets of a chunk locked, so it
+    can run alongside traffic. Each chunk is its own transaction; wallets
+    already in balance are skipped, so it is safe to interrupt and re-run.
+    Wallets whose postings exceed their balance are only reported.
+    """
+
+    help = "Post opening balance journal entries for wallets older than the journal."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Wallets locked and posted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        opened = overdrawn = 0
+        last = None
+        while True:
+            wallets = Wallet.objects.order_by("id")
+            if last is not None:
+                wallets = wallets.filter(id__gt=last)
+            ids = list(wallets.values_list("id", flat=True)[: options["chunk_size"]])
+            if not ids:
+                break
+            last = ids[-1]
+
+            with transaction.atomic():
+                locked = Wallet.objects.select_for_update().filter(id__in=ids).order_by("id")
+                locked = list(locked.only("id", "balance", "created_at"))
+                posted = dict(
+                    JournalPosting.objects.filter(wallet_id__in=ids)
+                    .values("wallet_id")
+                    .annotate(total=Sum("amount"))
+                    .values_list("wallet_id", "total")
+                )
+                entries = journal.Journal()
+                for wallet in locked:
+                    # Wallet postings are credits, so their sum is minus the balance.
+                    missing = wallet.balance + posted.get(wallet.id, 0)
+                    if missing > 0:
+                        journal.add_opening(entries, wallet.id, missing, wallet.created_at)
+                        opened += 1
+                    elif missing < 0:
+                        overdrawn += 1
+                        self.stderr.write(
+                            f"Wallet {wallet.id}: postings exceed the balance by {-missing}."
+                        )
+                entries.save()
+
+        self.stdout.write(
+            f"Posted {opened} opening balances; {overdrawn} wallets left for review."
+        )
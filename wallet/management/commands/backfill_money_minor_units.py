@@ -0,0 +1,82 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from wallet import money_backfill
+
+
+class Command(BaseCommand):
+    """
+    Fill the integer minor-unit copies of the decimal money columns added
+    by migration 0014 (see wallet/money_backfill.py), a chunk of rows per
+    transaction, while the service keeps running:
+        python manage.py migrate wallet 0014
+        python manage.py backfill_money_minor_units --chunk-size 5000
+        python manage.py migrate wallet
+    Safe to interrupt and re-run. Migration 0015 converts whatever is left
+    and stops if any amount is not a whole number of minor units, e.g. a
+    fraction of a rial. This command checks for those first and stops
+    before backfilling anything; list them with ``--check`` and round them
+    with ``--round-fractions`` (see ``money_backfill.round_fractional`` for
+    the rounding policy), then run ``reconcile_wallets``:
+        python manage.py backfill_money_minor_units --check
+        python manage.py backfill_money_minor_units --round-fractions
+    """
+
+    help = "Backfill integer minor-unit money columns before migration 0016."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows updated per transaction.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only list amounts that are not whole minor units.",
+        )
+        parser.add_argument(
+            "--round-fractions",
+            action="store_true",
+            help="Round amounts that are not whole minor units, then backfill.",
+        )
+
+    def handle(self, *args, **options):
+        if not money_backfill.pending(connection):
+            self.stdout.write("Money columns are already in minor units.")
+            return
+        if options["round_fractions"]:
+            with transaction.atomic():
+                rounded = money_backfill.round_fractional(connection, self.stdout.write)
+            self.stdout.write(
+                f"Rounded {rounded} amounts to whole minor units; "
+                "run reconcile_wallets once migrated."
+            )
+        fractional = money_backfill.fractional(connection)
+        if fractional:
+            raise CommandError(
+                "Amounts that are not whole minor units, which migration 0015 would "
+                "reject: "
+                + ", ".join(
+                    f"{column} ({count} rows, e.g. ids {', '.join(map(str, ids))})"
+                    for column, (count, ids) in fractional.items()
+                )
+                + ". Re-run with --round-fractions to round them."
+            )
+        if options["check"]:
+            self.stdout.write("Every amount is a whole number of minor units.")
+            return
+
+        log = self.stdout.write if options["verbosity"] > 1 else None
+        started = time.perf_counter()
+        updated = money_backfill.backfill(connection, options["chunk_size"], log)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Backfilled {updated} rows in {elapsed:.2f}s.")
+
+        mismatched = money_backfill.mismatches(connection)
+        if mismatched:
+            raise CommandError(
+                "Amounts that are not whole minor units: "
+                + ", ".join(f"{column} ({count} rows)" for column, count in mismatched.items())
+            )
@@ -0,0 +1,74 @@
+import re
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from wallet.models import Wallet, WalletTransaction
+
+# The descriptions transfers stored before counterparty_wallet existed.
+PATTERNS = {
+    "TRANSFER_OUT": re.compile(r"^Transferred to (.+)$"),
+    "TRANSFER_IN": re.compile(r"^Received from (.+)$"),
+}
+
+
+class Command(BaseCommand):
+    """
+    Point transfer rows written before migration 0017 at their
+    counterparty wallet, parsed from the username in the old description,
+    and clear the description, which is then rendered on read:
+        python manage.py backfill_transfer_counterparties --chunk-size 5000
+    Each chunk is its own transaction, so it is safe to interrupt and
+    re-run. Rows whose username no longer exists keep their description.
+    """
+
+    help = "Set counterparty_wallet on transfers from their old descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        pending = WalletTransaction.objects.filter(
+            transaction_type__in=list(PATTERNS),
+            counterparty_wallet__isnull=True,
+            description__isnull=False,
+        ).order_by("id")
+        updated = unmatched = 0
+        last = None
+        while True:
+            chunk = pending if last is None else pending.filter(id__gt=last)
+            rows = list(chunk.only("id", "transaction_type", "description")[: options["chunk_size"]])
+            if not rows:
+                break
+            last = rows[-1].id
+
+            usernames = {}
+            for row in rows:
+                match = PATTERNS[row.transaction_type].match(row.description)
+                if match:
+                    usernames[row.id] = match.group(1)
+            wallets = dict(
+                Wallet.objects.filter(user__username__in=set(usernames.values())).values_list(
+                    "user__username", "id"
+                )
+            )
+
+            changed = []
+            for row in rows:
+                wallet_id = wallets.get(usernames.get(row.id))
+                if wallet_id is None:
+                    unmatched += 1
+                    continue
+                row.counterparty_wallet_id = wallet_id
+                row.description = None
+                changed.append(row)
+            with transaction.atomic():
+                WalletTransaction.objects.bulk_update(
+                    changed, ["counterparty_wallet", "description"]
+                )
+            updated += len(changed)
+
+        self.stdout.write(f"Linked {updated} transfers; {unmatched} left with their description.")
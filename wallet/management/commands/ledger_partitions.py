@@ -0,0 +1,106 @@
+import argparse
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from wallet import partitions
+
+
+def parse_month(value):
+    try:
+        return partitions.month_start(
+            datetime.strptime(value, "%Y-%m").replace(tzinfo=dt_timezone.utc)
+        )
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a month as YYYY-MM, got {value!r}")
+
+
+class Command(BaseCommand):
+    """
+    Maintain the monthly partitions of the ledger (see wallet/partitions.py).
+    The ensure_ledger_partitions beat task already creates future months;
+    this command is for detaching old ones and for monitoring:
+        python manage.py ledger_partitions --detach-before 2025-01
+        python manage.py ledger_partitions --check 2
+    Detached partitions stay in the database as plain tables until they are
+    archived or dropped (--drop). --check creates nothing and fails when
+    fewer than the given number of future months have a partition.
+    """
+
+    help = "Pre-create future ledger partitions and detach old ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=None,
+            help="Months after the current one that must have a partition "
+            "(default: WALLET_LEDGER_PARTITIONS_AHEAD).",
+        )
+        parser.add_argument(
+            "--check",
+            type=int,
+            metavar="MONTHS",
+            help="Only fail if fewer than MONTHS future months have a partition.",
+        )
+        parser.add_argument(
+            "--detach-before",
+            type=parse_month,
+            metavar="YYYY-MM",
+            help="Detach every partition that ends on or before this month's start.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop partitions after detaching them instead of keeping the tables.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Ledger partitioning needs PostgreSQL.")
+
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError(
+                    f"{partitions.LEDGER_TABLE} is not partitioned; run migrate first."
+                )
+
+            if options["check"] is not None:
+                covered = partitions.months_ahead(cursor, timezone.now())
+                if covered < options["check"]:
+                    raise CommandError(
+                        f"Only {covered} future month(s) have a partition; "
+                        f"at least {options['check']} are required."
+                    )
+                self.stdout.write(f"{covered} future month(s) have a partition.")
+                return
+
+            ahead = options["ahead"]
+            if ahead is None:
+                ahead = settings.WALLET_LEDGER_PARTITIONS_AHEAD
+            for name in partitions.ensure_partitions(cursor, timezone.now(), ahead):
+                self.stdout.write(f"Created {name}")
+
+            cutoff = options["detach_before"]
+            if cutoff is not None and cutoff > partitions.month_start(timezone.now()):
+                raise CommandError("Only partitions of past months can be detached.")
+            if cutoff is not None:
+                # DETACH ... CONCURRENTLY only blocks writers to the partition
+                # itself, but it cannot run inside a transaction.
+                concurrently = (
+                    connection.pg_version >= 140000 and connection.get_autocommit()
+                )
+                for partition in partitions.list_partitions(cursor):
+                    if partition.upper is None or partition.upper > cutoff:
+                        continue
+                    partitions.detach_partition(cursor, partition.name, concurrently)
+                    if options["drop"]:
+                        cursor.execute(f"DROP TABLE {connection.ops.quote_name(partition.name)}")
+                        self.stdout.write(f"Dropped {partition.name}")
+                    else:
+                        self.stdout.write(f"Detached {partition.name}")
+
+            for partition in partitions.list_partitions(cursor):
+                lower = f"{partition.lower:%Y-%m-%d}" if partition.lower else "MINVALUE"
+                self.stdout.write(f"{partition.name:<45} {lower:>10} .. {partition.upper:%Y-%m-%d}")
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+
+def _setup_worker():
+    django.setup()
+
+
+def _reconcile_range(lower, upper, settled_before, chunk_size):
+    # Imported here so that worker processes started with "spawn" can
+    # unpickle this function before django.setup() has run.
+    from wallet import reconciliation
+
+    return reconciliation.reconcile_range(lower, upper, settled_before, chunk_size)
+
+
+class Command(BaseCommand):
+    """
+    Check every wallet balance against its ledger (see wallet/reconciliation.py)
+    and move the balance checkpoints forward:
+        python manage.py reconcile_wallets --workers 4
+    Wallet id ranges are spread over a pool of worker processes, each with
+    its own database connection. Fails if any wallet drifted.
+    """
+
+    help = "Compare wallet balances with their ledger and advance balance checkpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Worker processes; 1 reconciles in this process.",
+        )
+        parser.add_argument(
+            "--lag-seconds",
+            type=int,
+            default=300,
+            help="Only move checkpoints up to this long ago, past any transaction still in flight.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Wallets fetched per round trip from the server-side cursor.",
+        )
+
+    def handle(self, *args, **options):
+        from wallet import reconciliation
+
+        workers = max(options["workers"], 1)
+        settled_before = timezone.now() - timedelta(seconds=options["lag_seconds"])
+        # Several ranges per worker, so one slow range does not hold up the run.
+        ranges = reconciliation.wallet_range_bounds(workers * 4 if workers > 1 else 1)
+        jobs = [(lower, upper, settled_before, options["chunk_size"]) for lower, upper in ranges]
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = [_reconcile_range(*job) for job in jobs]
+        else:
+            # Forked workers must not share the parent's database sockets.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+                futures = [pool.submit(_reconcile_range, *job) for job in jobs]
+                results = [future.result() for future in as_completed(futures)]
+        elapsed = time.perf_counter() - started
+
+        checked = sum(result["checked"] for result in results)
+        drifted = sorted(
+            (row for result in results for row in result["drifted"]), key=lambda row: str(row[0])
+        )
+        for wallet_id, balance, ledger_balance in drifted:
+            self.stdout.write(
+                f"DRIFT {wallet_id}: balance {balance}, ledger {ledger_balance}, "
+                f"diff {balance - ledger_balance}"
+            )
+        self.stdout.write(
+            f"Checked {checked} wallets in {elapsed:.2f}s "
+            f"({checked / elapsed if elapsed else 0:.0f} wallets/sec), {len(drifted)} drifted."
+        )
+        if drifted:
+            raise CommandError(f"{len(drifted)} wallets drifted from their ledger.")
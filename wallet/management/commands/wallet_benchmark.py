@@ -0,0 +1,675 @@
+import asyncio
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+import requests
+from rest_framework import serializers
+from statistics import median, quantiles
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import override_settings
+from django.utils import timezone
+from accounts.models import User
+from wallet import (
+    archive,
+    balance_cache,
+    metrics,
+    partitions,
+    reconciliation,
+    rollups,
+    statements,
+)
+from wallet.gateways import AsyncZarinpalClient, ZarinpalClient
+from wallet.ids import uuid7
+from wallet.models import (
+    ArchivedLedgerChunk,
+    LedgerWatermark,
+    Wallet,
+    WalletDailyAggregate,
+    WalletTransaction,
+)
+from wallet.pagination import TransactionCursorPagination, keyset_after
+from wallet.money import Money
+from wallet.serializers import MoneyField, WalletSerializer
+from wallet.services import WalletService
+
+
+def _locked_charge(wallet_id, amount):
+    """The pre-F-expression charge path, kept here as a baseline."""
+    with transaction.atomic():
+        wallet = Wallet.objects.select_for_update().get(id=wallet_id)
+        wallet.balance += amount
+        wallet.save(update_fields=["balance", "updated_at"])
+        WalletTransaction.objects.create(
+            wallet=wallet,
+            transaction_type="CHARGE",
+            amount=amount,
+            description="Wallet charged",
+        )
+
+
+def _atomic_charge(wallet_id, amount):
+    WalletService.charge_wallet(Wallet(id=wallet_id), amount)
+
+
+def _locked_settle(wallet_id, amount):
+    """The pre-conditional-UPDATE settlement path, kept here as a baseline."""
+    with transaction.atomic():
+        wallet = Wallet.objects.select_for_update().get(id=wallet_id)
+        if wallet.balance < amount:
+            raise ValueError("Insufficient funds for settlement.")
+        wallet.balance -= amount
+        wallet.save(update_fields=["balance", "updated_at"])
+        WalletTransaction.objects.create(
+            wallet=wallet,
+            transaction_type="SETTLEMENT",
+            amount=amount,
+            description="Settlement to bank",
+        )
+
+
+def _locked_transfer(sender_id, receiver_id, amount):
+    """The pre-conditional-UPDATE transfer path, kept here as a baseline."""
+    with transaction.atomic():
+        sender = Wallet.objects.select_for_update().get(id=sender_id)
+        if sender.balance < amount:
+            raise ValueError("Insufficient funds.")
+        receiver = Wallet.objects.select_for_update().get(id=receiver_id)
+        sender.balance -= amount
+        receiver.balance += amount
+        sender.save(update_fields=["balance", "updated_at"])
+        receiver.save(update_fields=["balance", "updated_at"])
+        WalletTransaction.objects.create(
+            wallet=sender,
+            transaction_type="TRANSFER_OUT",
+            amount=amount,
+            counterparty_wallet=receiver,
+        )
+        WalletTransaction.objects.create(
+            wallet=receiver,
+            transaction_type="TRANSFER_IN",
+            amount=amount,
+            counterparty_wallet=sender,
+        )
+
+
+def _atomic_settle(wallet_id, amount):
+    WalletService.settle_funds(Wallet(id=wallet_id), amount)
+
+
+def _atomic_transfer(sender_id, receiver_id, amount):
+    sender = Wallet.objects.select_related("user").get(id=sender_id)
+    WalletService.transfer_funds(sender, receiver_id, amount)
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmarks for the hot WalletService paths under contention.
+    Run against a disposable PostgreSQL database, never production:
+        python manage.py wallet_benchmark charge --ops 2000 --workers 32
+    """
+
+    help = "Benchmark WalletService operations under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(self.scenarios()))
+        parser.add_argument("--ops", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=32)
+        parser.add_argument(
+            "--wallets",
+            type=int,
+            default=4,
+            help="Number of hot wallets the load is spread across.",
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=10_000_000,
+            help="Ledger rows to seed for the scenarios that need a large ledger.",
+        )
+        parser.add_argument(
+            "--gateway-url",
+            default="http://127.0.0.1:8765",
+            help="Base URL of a running zarinpal_stub for the gateway scenario.",
+        )
+
+    def scenarios(self):
+        return {
+            "charge": self.bench_charge,
+            "debit": self.bench_debit,
+            "pagination": self.bench_pagination,
+            "gateway": self.bench_gateway,
+            "async_gateway": self.bench_async_gateway,
+            "wallet_cache": self.bench_wallet_cache,
+            "archive": self.bench_archive,
+            "reconcile": self.bench_reconcile,
+            "rollup": self.bench_rollup,
+            "statement": self.bench_statement,
+            "uuid7": self.bench_uuid7,
+            "money": self.bench_money,
+        }
+
+    # Scenarios that never touch the database.
+    offline_scenarios = {"gateway", "async_gateway"}
+
+    def handle(self, *args, **options):
+        if (
+            options["scenario"] not in self.offline_scenarios
+            and connections["default"].vendor != "postgresql"
+        ):
+            raise CommandError("Benchmarks are only meaningful on PostgreSQL.")
+        self.ops = options["ops"]
+        self.workers = options["workers"]
+        self.wallets = options["wallets"]
+        self.scenarios()[options["scenario"]](**options)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def make_wallet(self, balance=0):
+        user = User.objects.create_user(username=f"bench-{uuid.uuid4().hex[:12]}")
+        Wallet.objects.filter(id=user.wallet.id).update(balance=balance)
+        self._bench_users.append(user.id)
+        return user.wallet
+
+    def run(self, label, func):
+        """
+        Call ``func(i)`` ``self.ops`` times from ``self.workers`` threads and
+        print throughput with p50/p99 latency in milliseconds.
+        Worker threads keep their DB connection between calls so that
+        connection setup does not drown out the statement cost.
+        """
+
+        def timed(i):
+            start = time.perf_counter()
+            func(i)
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            latencies = list(pool.map(timed, range(self.ops)))
+        self.report(label, latencies, time.perf_counter() - started)
+
+    def report(self, label, latencies, elapsed):
+        cuts = quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{label:<28} {self.ops / elapsed:>10.1f} ops/s"
+            f"   p50 {cuts[49] * 1000:>8.2f} ms   p99 {cuts[98] * 1000:>8.2f} ms"
+        )
+
+    def best_of(self, func, repeat=5):
+        """Median wall time of ``func()`` in milliseconds."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return median(timings) * 1000
+
+    def execute(self, *args, **options):
+        self._bench_users = []
+        try:
+            return super().execute(*args, **options)
+        finally:
+            User.objects.filter(id__in=self._bench_users).delete()
+
+    # ------------------------------------------------------------------
+    # Scenarios
+    # ------------------------------------------------------------------
+    def bench_charge(self, **options):
+        """Many parallel top-ups on a single hot wallet."""
+        amount = 1
+        for label, charge in (
+            ("select_for_update", _locked_charge),
+            ("F-expression", _atomic_charge),
+        ):
+            wallet = self.make_wallet()
+            self.run(label, lambda i, w=wallet.id: charge(w, amount))
+            wallet.refresh_from_db()
+            if wallet.balance != amount * self.ops:
+                raise CommandError(f"{label}: lost updates ({wallet.balance}).")
+
+    def bench_debit(self, **options):
+        """
+        Settlements and transfers funnelled through a few hot wallets,
+        comparing p50/p99 latency of the locked and conditional-UPDATE paths.
+        """
+        amount = 1
+        funding = amount * self.ops
+        sink = self.make_wallet()
+
+        for label, settle in (
+            ("settle select_for_update", _locked_settle),
+            ("settle conditional", _atomic_settle),
+        ):
+            hot = [self.make_wallet(funding).id for _ in range(self.wallets)]
+            self.run(label, lambda i, h=hot: settle(h[i % len(h)], amount))
+
+        for label, transfer in (
+            ("transfer select_for_update", _locked_transfer),
+            ("transfer conditional", _atomic_transfer),
+        ):
+            hot = [self.make_wallet(funding).id for _ in range(self.wallets)]
+            self.run(
+                label, lambda i, h=hot: transfer(h[i % len(h)], sink.id, amount)
+            )
+
+    def bench_pagination(self, rows, **options):
+        """
+        Seed one wallet with ``--rows`` ledger rows, then time fetching a page
+        at increasing depths with the keyset cursor and with OFFSET.
+        """
+        wallet = self.make_wallet()
+        table = connection.ops.quote_name(WalletTransaction._meta.db_table)
+        self.stdout.write(f"Seeding {rows} rows...")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (id, wallet_id, transaction_type, amount, created_at) "
+                "SELECT gen_random_uuid(), %s, 'CHARGE', 1, "
+                "now() - g * interval '1 millisecond' "
+                "FROM generate_series(1, %s) AS g",
+                [wallet.id, rows],
+            )
+            cursor.execute(f"ANALYZE {table}")
+
+        page_size = TransactionCursorPagination.page_size
+        history = WalletTransaction.objects.filter(wallet=wallet).order_by(
+            *TransactionCursorPagination.ordering
+        )
+        page = 1
+        while (page - 1) * page_size < rows:
+            offset = (page - 1) * page_size
+            if offset:
+                anchor = history[offset - 1]
+                keyset = keyset_after(history, anchor.created_at, anchor.id)
+            else:
+                keyset = history
+            keyset_ms = self.best_of(lambda: list(keyset[:page_size]))
+            offset_ms = self.best_of(lambda: list(history[offset : offset + page_size]))
+            self.stdout.write(
+                f"page {page:>10}   keyset {keyset_ms:>8.2f} ms   offset {offset_ms:>10.2f} ms"
+            )
+            page *= 10
+
+    def bench_gateway(self, gateway_url, **options):
+        """
+        Verify calls against a local zarinpal_stub: a fresh connection per
+        call (the old bare requests.post) versus the shared pooled client.
+        """
+        client = ZarinpalClient(base_url=gateway_url, pool_size=self.workers)
+        url = f"{client.base_url}{client.VERIFY_PATH}"
+
+        def bare_verify(i):
+            payload = {"merchant_id": client.merchant_id, "amount": 1000, "authority": str(i)}
+            requests.post(url, json=payload, timeout=client.timeout).json()
+
+        self.run("requests.post", bare_verify)
+        self.run("ZarinpalClient", lambda i: client.verify_payment(1000, str(i)))
+
+    def bench_async_gateway(self, gateway_url, **options):
+        """
+        Verify calls against a zarinpal_stub started with --latency-ms: the
+        sync client limited to --workers threads (a WSGI worker pool) versus
+        all --ops calls in flight at once on a single event loop.
+        """
+        client = ZarinpalClient(base_url=gateway_url, pool_size=self.workers)
+        self.run(
+            f"sync, {self.workers} threads",
+            lambda i: client.verify_payment(1000, str(i)),
+        )
+
+        async def verify_all():
+            async_client = AsyncZarinpalClient(base_url=gateway_url, pool_size=self.ops)
+            latencies = []
+
+            async def timed(i):
+                start = time.perf_counter()
+                await async_client.verify_payment(1000, str(i))
+                latencies.append(time.perf_counter() - start)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(timed(i) for i in range(self.ops)))
+            elapsed = time.perf_counter() - started
+            await async_client.aclose()
+            return latencies, elapsed
+
+        self.report("async, one event loop", *asyncio.run(verify_all()))
+
+    def bench_wallet_cache(self, **options):
+        """
+        Balance polls spread over --wallets wallets with one charge per 20
+        polls: serializing the wallet from the database on every poll versus
+        the write-through balance cache. Counts every query, including the
+        charges and their cache refreshes.
+        """
+        wallets = [self.make_wallet() for _ in range(self.wallets)]
+
+        def uncached(wallet):
+            # What WalletDetailView did before: request.user.wallet, serialized.
+            return WalletSerializer(
+                Wallet.objects.select_related("user").get(user_id=wallet.user_id)
+            ).data
+
+        def cached(wallet):
+            return balance_cache.get_wallet_data(wallet.user)
+
+        for label, poll in (("WalletSerializer", uncached), ("balance cache", cached)):
+            for wallet in wallets:
+                balance_cache.forget(wallet.user_id)
+            before = metrics.snapshot()
+            queries = 0
+
+            def count(execute, *args):
+                nonlocal queries
+                queries += 1
+                return execute(*args)
+
+            latencies = []
+            started = time.perf_counter()
+            with connection.execute_wrapper(count):
+                for i in range(self.ops):
+                    wallet = wallets[i % len(wallets)]
+                    if i % 20 == 0:
+                        WalletService.charge_wallet(wallet, 1)
+                    start = time.perf_counter()
+                    poll(wallet)
+                    latencies.append(time.perf_counter() - start)
+            self.report(label, latencies, time.perf_counter() - started)
+
+            after = metrics.snapshot()
+            hits = after["wallet_cache.hits"] - before["wallet_cache.hits"]
+            misses = after["wallet_cache.misses"] - before["wallet_cache.misses"]
+            hit_rate = hits / (hits + misses) if hits + misses else 0
+            self.stdout.write(
+                f"{'':<28} {queries:>10} queries   hit rate {hit_rate:.1%}"
+            )
+
+    def ledger_bytes(self):
+        """Heap + index + TOAST bytes of every attached ledger partition."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT coalesce(sum(pg_total_relation_size(inhrelid)), 0) "
+                "FROM pg_inherits WHERE inhparent = %s::regclass",
+                [partitions.LEDGER_TABLE],
+            )
+            return cursor.fetchone()[0]
+
+    def wal_bytes(self, func):
+        """WAL written while ``func()`` runs."""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_current_wal_lsn()")
+            start = cursor.fetchone()[0]
+            func()
+            cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", [start])
+            return int(cursor.fetchone()[0])
+
+    def seed_ledger(self, wallets, rows, start, days):
+        table = connection.ops.quote_name(partitions.LEDGER_TABLE)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (id, wallet_id, transaction_type, amount, created_at) "
+                "SELECT gen_random_uuid(), (%s::uuid[])[1 + g %% %s], 'CHARGE', 1, "
+                "%s + (g %% %s) * interval '1 day' + g * interval '1 microsecond' "
+                "FROM generate_series(1, %s) AS g",
+                [[str(w.id) for w in wallets], len(wallets), start, days, rows],
+            )
+            cursor.execute(f"ANALYZE {table}")
+
+    def bench_archive(self, rows, **options):
+        """
+        Seed ``--rows`` ledger rows over the last 24 months, archive everything
+        older than 12 months, and report the hot ledger size (after the
+        VACUUM FULL / pg_repack a one-off DELETE needs), the archive size and
+        the WAL written. Then compare removing an archived month by DELETE
+        against dropping its partition.
+        """
+        wallets = [self.make_wallet() for _ in range(self.wallets)]
+        this_month = partitions.month_start(timezone.now())
+        started = timezone.now()
+        with tempfile.TemporaryDirectory() as archive_dir, override_settings(
+            WALLET_ARCHIVE_DIR=archive_dir
+        ):
+            try:
+                self.stdout.write(f"Seeding {rows} rows over 24 months...")
+                self.seed_ledger(wallets, rows, partitions.add_months(this_month, -24), 24 * 30)
+                before = self.ledger_bytes()
+
+                cutoff = partitions.add_months(this_month, -12)
+                archived = {"rows": 0, "bytes": 0}
+
+                def archive_old_months():
+                    month = partitions.add_months(this_month, -24)
+                    while month < cutoff:
+                        for key, value in archive.archive_month(month).items():
+                            archived[key] += value
+                        month = partitions.add_months(month, 1)
+
+                delete_wal = self.wal_bytes(archive_old_months)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"VACUUM FULL {partitions.LEDGER_TABLE}_legacy")
+                after = self.ledger_bytes()
+                self.stdout.write(
+                    f"hot ledger      {before / 2**20:>10.1f} MiB -> {after / 2**20:.1f} MiB\n"
+                    f"archive files   {archived['bytes'] / 2**20:>10.1f} MiB for {archived['rows']} rows\n"
+                    f"archive by DELETE  {delete_wal / max(archived['rows'], 1):>7.1f} WAL bytes/row"
+                )
+
+                # Steady state: a month that has its own partition is dropped.
+                month = partitions.add_months(this_month, 1)
+                month_rows = max(rows // 24, 1)
+                self.seed_ledger(wallets, month_rows, month, 28)
+                drop_wal = self.wal_bytes(lambda: archive.archive_month(month))
+                self.stdout.write(
+                    f"archive by DROP    {drop_wal / month_rows:>7.1f} WAL bytes/row"
+                )
+            finally:
+                ArchivedLedgerChunk.objects.filter(created_at__gte=started).delete()
+                with connection.cursor() as cursor:
+                    partitions.ensure_partitions(cursor, timezone.now(), 3)
+
+    def bench_reconcile(self, rows, **options):
+        """
+        Seed ``--wallets`` wallets with ``--rows`` ledger rows over the last
+        60 days, then time reconcile_wallets with ``--workers`` processes:
+        a first pass that sums every row, and a second pass that only sums
+        the rows added after the checkpoints. Reconciles the whole database,
+        so run it on a disposable one.
+        """
+        wallets = [self.make_wallet() for _ in range(self.wallets)]
+        self.seed_ledger(wallets, rows, timezone.now() - timedelta(days=60), 59)
+        table = connection.ops.quote_name(partitions.LEDGER_TABLE)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Wallet._meta.db_table} SET balance = "
+                f"(SELECT sum(amount) FROM {table} WHERE wallet_id = {Wallet._meta.db_table}.id) "
+                "WHERE id = ANY(%s::uuid[])",
+                [[str(w.id) for w in wallets]],
+            )
+
+        for label in ("full pass", "incremental pass"):
+            if label == "incremental pass":
+                for wallet in wallets[:: max(len(wallets) // 100, 1)]:
+                    WalletService.charge_wallet(wallet, 1)
+            self.stdout.write(f"{label}:")
+            try:
+                call_command(
+                    "reconcile_wallets", workers=self.workers, lag_seconds=0, stdout=self.stdout
+                )
+            except CommandError as exc:
+                self.stdout.write(str(exc))
+
+    def bench_rollup(self, rows, **options):
+        """
+        Seed ``--rows`` ledger rows over the last year, time the backfill,
+        then compare a year of daily totals for one wallet read from the
+        aggregates against grouping its ledger rows. Rebuilds the rollup
+        from scratch, so run it on a disposable database.
+        """
+        LedgerWatermark.objects.filter(name=rollups.ROLLUP).delete()
+        WalletDailyAggregate.objects.all().delete()
+        wallets = [self.make_wallet() for _ in range(self.wallets)]
+        self.seed_ledger(wallets, rows, timezone.now() - timedelta(days=366), 365)
+        started = time.perf_counter()
+        rolled = rollups.roll_up()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"backfill             {rolled / elapsed:>10.0f} rows/s ({rolled} rows)")
+
+        wallet = wallets[0]
+        end = timezone.now().date()
+        start = end - timedelta(days=365)
+        scan = self.best_of(
+            lambda: rollups._day_totals(
+                WalletTransaction.objects.filter(wallet=wallet, created_at__date__gte=start)
+            )
+        )
+        read = self.best_of(lambda: rollups.daily_totals(wallet.id, start, end))
+        self.stdout.write(
+            f"year of daily totals: ledger scan {scan:.1f} ms, aggregates {read:.1f} ms"
+        )
+
+
+    def bench_statement(self, rows, **options):
+        """
+        Seed ``--rows`` ledger rows over the last year on one wallet, close
+        its months, and time a 12-month statement: rendered from scratch,
+        then served from stored statements and the cache. Rebuilds the
+        rollup, so run it on a disposable database.
+        """
+        LedgerWatermark.objects.filter(name=rollups.ROLLUP).delete()
+        WalletDailyAggregate.objects.all().delete()
+        wallet = self.make_wallet()
+        self.seed_ledger([wallet], rows, timezone.now() - timedelta(days=366), 365)
+        Wallet.objects.filter(id=wallet.id).update(
+            balance=WalletTransaction.objects.filter(wallet=wallet).aggregate(total=Sum("amount"))["total"]
+        )
+        reconciliation.reconcile_range(
+            wallet.id, uuid.UUID(int=wallet.id.int + 1), timezone.now()
+        )
+        rollups.roll_up()
+
+        end = partitions.month_start(timezone.now()).date()
+        start = partitions.add_months(end, -11).date()
+        started = time.perf_counter()
+        statements.monthly_statements(wallet.id, start, end)
+        cold = (time.perf_counter() - started) * 1000
+        warm = self.best_of(lambda: statements.monthly_statements(wallet.id, start, end))
+        self.stdout.write(
+            f"12-month statement ({rows} rows): first render {cold:.1f} ms, "
+            f"stored/cached {warm:.1f} ms"
+        )
+
+    def bench_uuid7(self, rows, **options):
+        """
+        Insert ``--rows`` ledger-shaped rows keyed by uuid4 and by uuid7 into
+        two scratch tables, in batches of 1000, and compare insert
+        throughput, WAL written and the final primary key index size.
+        """
+        batch = 1000
+        for label, make_id in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+            table = f"wallet_bench_{label}"
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE {table} (id uuid PRIMARY KEY, wallet_id uuid NOT NULL, "
+                    "amount bigint NOT NULL, created_at timestamptz NOT NULL)"
+                )
+                try:
+                    wallet_id = str(uuid.uuid4())
+
+                    def insert_all():
+                        for start in range(0, rows, batch):
+                            ids = [str(make_id()) for _ in range(min(batch, rows - start))]
+                            cursor.execute(
+                                f"INSERT INTO {table} SELECT id, %s, 1, now() "
+                                "FROM unnest(%s::uuid[]) AS id",
+                                [wallet_id, ids],
+                            )
+
+                    started = time.perf_counter()
+                    wal = self.wal_bytes(insert_all)
+                    elapsed = time.perf_counter() - started
+                    cursor.execute("SELECT pg_relation_size(%s)", [f"{table}_pkey"])
+                    index_bytes = cursor.fetchone()[0]
+                finally:
+                    cursor.execute(f"DROP TABLE {table}")
+            self.stdout.write(
+                f"{label}  {rows / elapsed:>10.0f} rows/s   WAL {wal / rows:>6.1f} bytes/row   "
+                f"pkey {index_bytes / 2**20:>8.1f} MiB"
+            )
+
+    def bench_money(self, rows, **options):
+        """
+        Decimal amounts against integer minor units. In the database:
+        ``--rows`` ledger-shaped rows in a NUMERIC(12, 2) and in a BIGINT
+        scratch table, compared on table size, a SUM over every row and
+        ``--ops`` balance increments. In Python: ``--ops`` amounts summed,
+        parsed from request strings and rendered, through DRF's
+        DecimalField and through MoneyField.
+        """
+        table = "wallet_bench_money"
+        for label, column, increment in (
+            ("numeric(12,2)", "numeric(12, 2)", Decimal("1.00")),
+            ("bigint", "bigint", 1),
+        ):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE {table} (id bigint PRIMARY KEY, wallet_id uuid NOT NULL, "
+                    f"amount {column} NOT NULL)"
+                )
+                try:
+                    cursor.execute(
+                        f"INSERT INTO {table} SELECT g, gen_random_uuid(), 1 + g %% 100000 "
+                        "FROM generate_series(1, %s) AS g",
+                        [rows],
+                    )
+                    cursor.execute(f"VACUUM ANALYZE {table}")
+                    cursor.execute("SELECT pg_table_size(%s)", [table])
+                    size = cursor.fetchone()[0]
+
+                    def total():
+                        cursor.execute(f"SELECT sum(amount) FROM {table}")
+                        cursor.fetchone()
+
+                    def increments():
+                        for i in range(self.ops):
+                            cursor.execute(
+                                f"UPDATE {table} SET amount = amount + %s WHERE id = %s",
+                                [increment, 1 + i % 1000],
+                            )
+
+                    scan = self.best_of(total)
+                    update = self.best_of(increments, repeat=3)
+                finally:
+                    cursor.execute(f"DROP TABLE {table}")
+            self.stdout.write(
+                f"{label:<14} table {size / 2**20:>8.1f} MiB   SUM {scan:>8.1f} ms   "
+                f"{self.ops / update * 1000:>8.0f} increments/s"
+            )
+
+        minor = [1 + i % 100000 for i in range(self.ops)]
+        for label, field, values, inputs in (
+            (
+                "DecimalField",
+                serializers.DecimalField(max_digits=12, decimal_places=2),
+                [Decimal(value).quantize(Decimal("0.01")) for value in minor],
+                [f"{value}.00" for value in minor],
+            ),
+            (
+                "MoneyField",
+                MoneyField(),
+                [Money(value) for value in minor],
+                [str(value) for value in minor],
+            ),
+        ):
+            amounts = [getattr(value, "minor", value) for value in values]
+            summed = self.best_of(lambda: sum(amounts))
+            parsed = self.best_of(lambda: [field.to_internal_value(value) for value in inputs])
+            rendered = self.best_of(lambda: [field.to_representation(value) for value in values])
+            self.stdout.write(
+                f"{label:<14} sum {summed:>8.2f} ms   parse {parsed:>8.2f} ms   "
+                f"render {rendered:>8.2f} ms   ({self.ops} amounts)"
+            )
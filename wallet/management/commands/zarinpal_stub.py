@@ -0,0 +1,89 @@
+import asyncio
+import json
+import uuid
+from django.core.management.base import BaseCommand
+from wallet.gateways import ZarinpalClient
+
+
+def stub_response(path: str, payload: dict) -> dict | None:
+    """Canned success payloads for the Zarinpal request/verify endpoints."""
+    if path == ZarinpalClient.REQUEST_PATH:
+        data = {
+            "code": 100,
+            "message": "Success",
+            "authority": f"S{uuid.uuid4().hex:0>35}",
+            "fee_type": "Merchant",
+            "fee": 0,
+        }
+    elif path == ZarinpalClient.VERIFY_PATH:
+        data = {
+            "code": 100,
+            "message": "Verified",
+            "ref_id": abs(hash(payload.get("authority"))) % 10**8,
+            "card_pan": "999999******9999",
+            "fee_type": "Merchant",
+            "fee": 0,
+        }
+    else:
+        return None
+    return {"data": data, "errors": []}
+
+
+class Command(BaseCommand):
+    """
+    Local stand-in for the Zarinpal API, for latency benchmarks:
+        python manage.py zarinpal_stub --port 8765 --latency-ms 1500
+        ZARINPAL_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+    Built on asyncio so injected latency costs no thread and hundreds of
+    concurrent keep-alive connections can wait at once.
+    """
+
+    help = "Run a local Zarinpal stub gateway with injected latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency-ms", type=float, default=0)
+
+    def handle(self, *args, **options):
+        self.latency = options["latency_ms"] / 1000
+        self.stdout.write(
+            f"Zarinpal stub on http://{options['host']}:{options['port']} "
+            f"({options['latency_ms']} ms latency)"
+        )
+        try:
+            asyncio.run(self.serve(options["host"], options["port"]))
+        except KeyboardInterrupt:
+            pass
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 keep-alive loop: one JSON POST per request."""
+        try:
+            while request_line := await reader.readline():
+                path = request_line.decode().split(" ")[1]
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                await asyncio.sleep(self.latency)
+                payload = stub_response(path, json.loads(body or b"{}"))
+                status = "200 OK" if payload is not None else "404 Not Found"
+                content = json.dumps(payload or {"errors": ["Not found"]}).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n\r\n".encode()
+                    + content
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
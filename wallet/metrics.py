@@ -0,0 +1,50 @@
+# wallet/metrics.py
+import logging
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "wallet:metrics:"
+
+# Every counter the wallet app records. Keeping the list here lets
+# ``snapshot()`` read all of them with a single cache round trip. The
+# ``<func>.conflict_*`` counters of ``retry_on_conflict`` are added by
+# ``register`` when a function is decorated.
+METRIC_NAMES = [
+    "idempotency.replays",
+    "wallet_cache.hits",
+    "wallet_cache.misses",
+]
+
+
+def register(*names: str) -> None:
+    """Add counters to ``METRIC_NAMES``; names already known are ignored."""
+    for name in names:
+        if name not in METRIC_NAMES:
+            METRIC_NAMES.append(name)
+
+
+def incr(name: str, delta: int = 1) -> None:
+    """
+    Increment a counter shared by all worker processes (stored in the
+    default Redis cache). Failures are logged and swallowed: metrics must
+    never break a money-moving request.
+    """
+    key = f"{KEY_PREFIX}{name}"
+    try:
+        # The counter almost always exists, so incr() alone is one round trip.
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, timeout=None):
+                cache.incr(key, delta)
+    except Exception as exc:
+        logger.warning("Could not record metric %s: %s", name, exc)
+
+
+def snapshot() -> dict:
+    """
+    Return the current value of every known counter.
+    """
+    values = cache.get_many([f"{KEY_PREFIX}{name}" for name in METRIC_NAMES])
+    return {name: values.get(f"{KEY_PREFIX}{name}", 0) for name in METRIC_NAMES}
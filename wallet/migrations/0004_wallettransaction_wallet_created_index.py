@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0003_payment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', '-created_at', '-id'], name='wallet_tx_wallet_created_idx'),
+        ),
+    ]
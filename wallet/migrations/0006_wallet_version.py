@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,139 @@
+import re
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TABLE = "wallet_wallettransaction"
+LEGACY = f"{TABLE}_legacy"
+
+# Months pre-created after the legacy partition; `ledger_partitions` keeps
+# extending this afterwards.
+MONTHS_AHEAD = 3
+
+
+def _next_month(value):
+    index = value.year * 12 + value.month
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _indexes_and_foreign_keys(cursor, table):
+    """
+    (name, CREATE INDEX statement) for every non-constraint index and
+    (name, definition) for every foreign key of ``table``.
+    """
+    cursor.execute(
+        """
+        SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = %s::regclass
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint WHERE conindid = pg_index.indexrelid
+          )
+        """,
+        [table],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _recreate(schema_editor, source, target, indexes, foreign_keys):
+    for name, definition in indexes:
+        schema_editor.execute(
+            re.sub(rf" ON (ONLY )?(\w+\.)?{source} ", f" ON {target} ", definition, count=1)
+        )
+    for name, definition in foreign_keys:
+        schema_editor.execute(f"ALTER TABLE {target} ADD CONSTRAINT {name} {definition}")
+
+
+def partition_ledger(apps, schema_editor):
+    """
+    Turn the ledger into a table range-partitioned by created_at month.
+
+    The existing table is attached as the first partition rather than
+    copied. Its secondary indexes match the new parent's and are adopted as
+    they are. The attach builds the (id, created_at) key and runs one
+    validation scan.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        schema_editor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, LEGACY)
+
+        # The partition gets the parent's (id, created_at) key on attach; its
+        # own key on id alone would be a second primary key.
+        schema_editor.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {TABLE}_pkey")
+        # Free the index/constraint names for the partitioned parent.
+        for name, _ in indexes:
+            schema_editor.execute(f"ALTER INDEX {name} RENAME TO {('legacy_' + name)[:63]}")
+        for name, _ in foreign_keys:
+            schema_editor.execute(
+                f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {name} TO {('legacy_' + name)[:63]}"
+            )
+
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        # A partitioned table's primary key must contain the partition key.
+        schema_editor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)"
+        )
+        _recreate(schema_editor, LEGACY, TABLE, indexes, foreign_keys)
+
+        boundary = _next_month(datetime.now(timezone.utc))
+        schema_editor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+        )
+        for _ in range(MONTHS_AHEAD):
+            upper = _next_month(boundary)
+            schema_editor.execute(
+                f"CREATE TABLE {TABLE}_p{boundary:%Y_%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{boundary.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+            boundary = upper
+
+
+def unpartition_ledger(apps, schema_editor):
+    """
+    Copy every attached partition back into one plain table. Detached
+    partitions are left alone.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, TABLE)
+        plain = f"{TABLE}_plain"
+        schema_editor.execute(
+            f"CREATE TABLE {plain} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        schema_editor.execute(f"INSERT INTO {plain} SELECT * FROM {TABLE}")
+        schema_editor.execute(f"DROP TABLE {TABLE}")
+        schema_editor.execute(f"ALTER TABLE {plain} RENAME TO {TABLE}")
+        schema_editor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id)"
+        )
+        _recreate(schema_editor, TABLE, TABLE, indexes, foreign_keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0006_wallet_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_ledger, unpartition_ledger),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0007_partition_wallettransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLedgerChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('path', models.CharField(max_length=255)),
+                ('offset', models.PositiveBigIntegerField()),
+                ('length', models.PositiveBigIntegerField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('first_wallet_id', models.UUIDField()),
+                ('last_wallet_id', models.UUIDField()),
+                ('min_created_at', models.DateTimeField()),
+                ('max_created_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['shard', 'first_wallet_id', 'last_wallet_id'], name='wallet_archive_shard_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0008_archivedledgerchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('as_of', models.DateTimeField()),
+                ('last_transaction_id', models.UUIDField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoint', to='wallet.wallet')),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# The rollup reads the ledger by created_at alone. Rows arrive roughly in
+# created_at order, so a BRIN index finds a time window for a few pages.
+def create_created_at_brin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX wallet_tx_created_brin ON wallet_wallettransaction "
+            "USING brin (created_at)"
+        )
+
+
+def drop_created_at_brin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS wallet_tx_created_brin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0009_walletbalancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WalletDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('charged', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('transferred_in', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('transferred_out', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('settled', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_aggregates', to='wallet.wallet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'day'), name='wallet_daily_aggregate_uniq')],
+            },
+        ),
+        migrations.RunPython(create_created_at_brin, drop_created_at_brin),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0010_daily_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('document', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='wallet.wallet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'month'), name='wallet_statement_month_uniq')],
+            },
+        ),
+    ]
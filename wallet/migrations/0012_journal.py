@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:52
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0011_walletstatement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('CHARGE', 'Charge'), ('TRANSFER', 'Transfer'), ('SETTLEMENT', 'Settlement'), ('BONUS', 'Bonus')], max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JournalPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system_account', models.CharField(blank=True, choices=[('GATEWAY_FLOAT', 'Gateway float'), ('SETTLEMENT', 'Settlement clearing'), ('PROMOTIONS', 'Promotions')], max_length=20, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField()),
+                ('counterparty_wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wallet.wallet')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='wallet.journalentry')),
+                ('wallet', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='wallet.wallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', 'counterparty_wallet', '-created_at'], name='wallet_posting_pair_idx'), models.Index(condition=models.Q(('system_account__isnull', False)), fields=['system_account', 'created_at'], include=('amount',), name='wallet_posting_system_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('system_account__isnull', True), ('wallet__isnull', False)), models.Q(('system_account__isnull', False), ('wallet__isnull', True)), _connector='OR'), name='wallet_posting_one_account')],
+            },
+        ),
+    ]
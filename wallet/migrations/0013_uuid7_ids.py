@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:54
+
+import wallet.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0012_journal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='id',
+            field=models.UUIDField(default=wallet.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='id',
+            field=models.UUIDField(default=wallet.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:10
+
+from django.db import migrations, models
+from wallet import money_backfill
+
+
+# First step of the switch to integer minor units; see
+# wallet/money_backfill.py. Adding nullable columns only changes the
+# catalog, and the triggers keep them in step with every later write.
+def create_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        money_backfill.create_sync_triggers(schema_editor)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        money_backfill.drop_sync_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0013_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='balance_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='amount_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletbalancecheckpoint',
+            name='balance_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletdailyaggregate',
+            name='charged_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletdailyaggregate',
+            name='transferred_in_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletdailyaggregate',
+            name='transferred_out_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletdailyaggregate',
+            name='settled_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletstatement',
+            name='opening_balance_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='walletstatement',
+            name='closing_balance_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='journalposting',
+            name='amount_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(create_sync_triggers, drop_sync_triggers),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:10
+
+from django.db import migrations
+from wallet import money_backfill
+
+NOT_NULL_CHECKS = [
+    (table, f"{table}_{column}_minor_nn", f"{column}_minor")
+    for table, _, columns in money_backfill.MONEY_COLUMNS
+    for column in columns
+]
+
+
+def backfill(apps, schema_editor):
+    """
+    Convert whatever ``backfill_money_minor_units`` has not, then refuse to
+    go on if any amount has no exact integer value in minor units.
+    """
+    connection = schema_editor.connection
+    money_backfill.backfill(connection)
+    mismatched = money_backfill.mismatches(connection)
+    if mismatched:
+        raise RuntimeError(
+            "Amounts that are not whole minor units: "
+            + ", ".join(f"{column} ({count} rows)" for column, count in mismatched.items())
+        )
+
+
+# Validated CHECK constraints let 0016 set the columns NOT NULL without
+# scanning the tables under an exclusive lock. VALIDATE only blocks DDL.
+def add_not_null_checks(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, name, column in NOT_NULL_CHECKS:
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({column} IS NOT NULL) NOT VALID"
+        )
+        schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def drop_not_null_checks(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, name, _ in NOT_NULL_CHECKS:
+        schema_editor.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+
+
+# Replaces wallet_posting_system_idx, whose included amount column goes
+# away in 0016; built without blocking postings.
+def create_posting_system_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS wallet_posting_system_minor_idx "
+            "ON wallet_journalposting (system_account, created_at) INCLUDE (amount_minor) "
+            "WHERE system_account IS NOT NULL"
+        )
+
+
+def drop_posting_system_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS wallet_posting_system_minor_idx")
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill chunk and each DDL statement commits on its own.
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0014_money_minor_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.RunPython(add_not_null_checks, drop_not_null_checks),
+        migrations.RunPython(create_posting_system_index, drop_posting_system_index),
+    ]
@@ -0,0 +1,210 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:10
+
+import django.core.validators
+from django.db import migrations, models
+from wallet import money_backfill
+
+SYSTEM_INDEX = models.Index(
+    condition=models.Q(('system_account__isnull', False)),
+    fields=['system_account', 'created_at'],
+    include=['amount'],
+    name='wallet_posting_system_idx',
+)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        money_backfill.drop_sync_triggers(schema_editor)
+
+
+def drop_not_null_checks(apps, schema_editor):
+    # Redundant once the columns are NOT NULL; see 0015.
+    if schema_editor.connection.vendor == "postgresql":
+        for table, _, columns in money_backfill.MONEY_COLUMNS:
+            for column in columns:
+                schema_editor.execute(
+                    f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_minor_nn"
+                )
+
+
+def add_posting_system_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        # Built concurrently by 0015.
+        schema_editor.execute(
+            "ALTER INDEX wallet_posting_system_minor_idx RENAME TO wallet_posting_system_idx"
+        )
+    else:
+        schema_editor.add_index(apps.get_model("wallet", "JournalPosting"), SYSTEM_INDEX)
+
+
+class Migration(migrations.Migration):
+    """
+    Swap the decimal money columns for their integer minor-unit copies,
+    in one transaction. Dropping and renaming columns only changes the
+    catalog, and 0015's validated checks spare the NOT NULL scans. There
+    is no way back: the decimal columns are gone.
+    """
+
+    dependencies = [
+        ('wallet', '0015_backfill_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sync_triggers),
+        migrations.RemoveIndex(
+            model_name='journalposting',
+            name='wallet_posting_system_idx',
+        ),
+        migrations.RemoveField(
+            model_name='wallet',
+            name='balance',
+        ),
+        migrations.RemoveField(
+            model_name='wallettransaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='walletbalancecheckpoint',
+            name='balance',
+        ),
+        migrations.RemoveField(
+            model_name='walletdailyaggregate',
+            name='charged',
+        ),
+        migrations.RemoveField(
+            model_name='walletdailyaggregate',
+            name='transferred_in',
+        ),
+        migrations.RemoveField(
+            model_name='walletdailyaggregate',
+            name='transferred_out',
+        ),
+        migrations.RemoveField(
+            model_name='walletdailyaggregate',
+            name='settled',
+        ),
+        migrations.RemoveField(
+            model_name='walletstatement',
+            name='opening_balance',
+        ),
+        migrations.RemoveField(
+            model_name='walletstatement',
+            name='closing_balance',
+        ),
+        migrations.RemoveField(
+            model_name='journalposting',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='wallet',
+            old_name='balance_minor',
+            new_name='balance',
+        ),
+        migrations.RenameField(
+            model_name='wallettransaction',
+            old_name='amount_minor',
+            new_name='amount',
+        ),
+        migrations.RenameField(
+            model_name='walletbalancecheckpoint',
+            old_name='balance_minor',
+            new_name='balance',
+        ),
+        migrations.RenameField(
+            model_name='walletdailyaggregate',
+            old_name='charged_minor',
+            new_name='charged',
+        ),
+        migrations.RenameField(
+            model_name='walletdailyaggregate',
+            old_name='transferred_in_minor',
+            new_name='transferred_in',
+        ),
+        migrations.RenameField(
+            model_name='walletdailyaggregate',
+            old_name='transferred_out_minor',
+            new_name='transferred_out',
+        ),
+        migrations.RenameField(
+            model_name='walletdailyaggregate',
+            old_name='settled_minor',
+            new_name='settled',
+        ),
+        migrations.RenameField(
+            model_name='walletstatement',
+            old_name='opening_balance_minor',
+            new_name='opening_balance',
+        ),
+        migrations.RenameField(
+            model_name='walletstatement',
+            old_name='closing_balance_minor',
+            new_name='closing_balance',
+        ),
+        migrations.RenameField(
+            model_name='journalposting',
+            old_name='amount_minor',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=models.BigIntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='walletbalancecheckpoint',
+            name='balance',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyaggregate',
+            name='charged',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyaggregate',
+            name='transferred_in',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyaggregate',
+            name='transferred_out',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletdailyaggregate',
+            name='settled',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletstatement',
+            name='opening_balance',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='walletstatement',
+            name='closing_balance',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='journalposting',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='amount',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.RunPython(drop_not_null_checks),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_posting_system_index)],
+            state_operations=[
+                migrations.AddIndex(model_name='journalposting', index=SYSTEM_INDEX),
+            ],
+        ),
+    ]
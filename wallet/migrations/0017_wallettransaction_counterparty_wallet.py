@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from wallet import partitions
+
+COUNTERPARTY_INDEX = models.Index(
+    fields=['counterparty_wallet', '-created_at'],
+    name='wallet_tx_counterparty_idx',
+)
+
+
+def add_counterparty_index(apps, schema_editor):
+    """
+    PostgreSQL cannot build an index on a partitioned table concurrently.
+    Create it on the parent only, which is instant and leaves it invalid,
+    then build each partition's index concurrently and attach it; the
+    parent index becomes valid with the last attach. New partitions get
+    it from the parent.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.add_index(apps.get_model("wallet", "WalletTransaction"), COUNTERPARTY_INDEX)
+        return
+    columns = "(counterparty_wallet_id, created_at DESC)"
+    with schema_editor.connection.cursor() as cursor:
+        if not partitions.is_partitioned(cursor):
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY {COUNTERPARTY_INDEX.name} "
+                f"ON {partitions.LEDGER_TABLE} {columns}"
+            )
+            return
+        schema_editor.execute(
+            f"CREATE INDEX {COUNTERPARTY_INDEX.name} ON ONLY {partitions.LEDGER_TABLE} {columns}"
+        )
+        for partition in partitions.list_partitions(cursor):
+            name = f"{partition.name}_counterparty_idx"
+            schema_editor.execute(f"CREATE INDEX CONCURRENTLY {name} ON {partition.name} {columns}")
+            schema_editor.execute(f"ALTER INDEX {COUNTERPARTY_INDEX.name} ATTACH PARTITION {name}")
+
+
+def drop_counterparty_index(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {COUNTERPARTY_INDEX.name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0016_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='counterparty_wallet',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wallet.wallet'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_counterparty_index, drop_counterparty_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='wallettransaction', index=COUNTERPARTY_INDEX),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:10
+
+from django.db import migrations, models
+from wallet import partitions
+
+FILTER_INDEXES = [
+    (
+        models.Index(
+            fields=['wallet', 'transaction_type', '-created_at', '-id'],
+            name='wallet_tx_wallet_type_idx',
+        ),
+        '(wallet_id, transaction_type, created_at DESC, id DESC)',
+        'type_idx',
+    ),
+    (
+        models.Index(fields=['wallet', 'amount'], name='wallet_tx_wallet_amount_idx'),
+        '(wallet_id, amount)',
+        'amount_idx',
+    ),
+]
+
+
+def add_filter_indexes(apps, schema_editor):
+    model = apps.get_model("wallet", "WalletTransaction")
+    for index, columns, suffix in FILTER_INDEXES:
+        if schema_editor.connection.vendor != "postgresql":
+            schema_editor.add_index(model, index)
+            continue
+        with schema_editor.connection.cursor() as cursor:
+            partitions.create_ledger_index(cursor, index.name, columns, suffix)
+
+
+def drop_filter_indexes(apps, schema_editor):
+    for index, _, _ in FILTER_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index.name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0017_wallettransaction_counterparty_wallet'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_filter_indexes, drop_filter_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='wallettransaction', index=index)
+                for index, _, _ in FILTER_INDEXES
+            ],
+        ),
+    ]
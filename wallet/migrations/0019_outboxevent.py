@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:26
+
+import django.core.serializers.json
+import wallet.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0018_wallettransaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.UUIDField(default=wallet.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=50)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:28
+
+import django.db.models.deletion
+import wallet.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0019_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsyncTransfer',
+            fields=[
+                ('id', models.UUIDField(default=wallet.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('receiver_wallet_id', models.UUIDField()),
+                ('amount', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('sender_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='async_transfers', to='wallet.wallet')),
+            ],
+        ),
+    ]
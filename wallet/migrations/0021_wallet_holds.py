@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:30
+
+import django.db.models.deletion
+import wallet.ids
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0020_asynctransfer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletHold',
+            fields=[
+                ('id', models.UUIDField(default=wallet.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('CAPTURED', 'Captured'), ('RELEASED', 'Released'), ('EXPIRED', 'Expired')], default='ACTIVE', max_length=10)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='held',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='wallet',
+            constraint=models.CheckConstraint(condition=models.Q(('held__gte', 0), ('held__lte', models.F('balance'))), name='wallet_held_within_balance'),
+        ),
+        migrations.AddField(
+            model_name='wallethold',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='wallet.wallet'),
+        ),
+        migrations.AddIndex(
+            model_name='wallethold',
+            index=models.Index(condition=models.Q(('status', 'ACTIVE')), fields=['expires_at'], name='wallet_hold_active_expiry_idx'),
+        ),
+    ]
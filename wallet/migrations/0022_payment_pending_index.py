@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+PENDING_INDEX = models.Index(
+    condition=models.Q(('status', 'pending')),
+    fields=['updated_at'],
+    name='wallet_payment_pending_idx',
+)
+
+
+def add_pending_index(apps, schema_editor):
+    model = apps.get_model("wallet", "Payment")
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.add_index(model, PENDING_INDEX)
+        return
+    # Payments keep arriving while the index builds.
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY {PENDING_INDEX.name} "
+        f"ON {model._meta.db_table} (updated_at) WHERE status = 'pending'"
+    )
+
+
+def drop_pending_index(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {PENDING_INDEX.name}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('wallet', '0021_wallet_holds'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_pending_index, drop_pending_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='payment', index=PENDING_INDEX),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0022_payment_pending_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asynctransfer',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='asynctransfer',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['queued_at'], name='wallet_async_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0023_async_transfer_requeue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asynctransfer',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0024_async_transfer_queued_at_nullable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='journalentry',
+            name='kind',
+            field=models.CharField(choices=[('CHARGE', 'Charge'), ('TRANSFER', 'Transfer'), ('SETTLEMENT', 'Settlement'), ('BONUS', 'Bonus'), ('OPENING', 'Opening balance')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='journalposting',
+            name='system_account',
+            field=models.CharField(blank=True, choices=[('GATEWAY_FLOAT', 'Gateway float'), ('SETTLEMENT', 'Settlement clearing'), ('PROMOTIONS', 'Promotions'), ('OPENING_BALANCES', 'Opening balances')], max_length=20, null=True),
+        ),
+    ]
@@ -1,58 +1,494 @@
 # wallet/models.py
 import uuid
-from decimal import Decimal
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from accounts.models import User
+from .ids import uuid7
 
 
 class Wallet(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="wallet")
-    balance = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
-        default=Decimal("0.00"),
-        validators=[MinValueValidator(Decimal("0.00"))],
-    )
+    # Every amount in the wallet app is an integer of the wallet currency's
+    # minor unit; see wallet/money.py.
+    balance = models.BigIntegerField(default=0, validators=[MinValueValidator(0)])
+    # Sum of the wallet's active holds (WalletHold), reserved out of balance.
+    held = models.BigIntegerField(default=0, editable=False)
     currency = models.CharField(max_length=3, default="IRR")
+    # Bumped by every balance UPDATE; orders cached snapshots of the wallet.
+    version = models.PositiveBigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(held__gte=0, held__lte=models.F("balance")),
+                name="wallet_held_within_balance",
+            ),
+        ]
+
     def __str__(self):
         return f"Wallet for {self.user.username}"
 
+    @property
+    def available_balance(self) -> int:
+        """What debits, transfers and new holds may still spend."""
+        return self.balance - self.held
+
 
 class WalletTransaction(models.Model):
+    # On PostgreSQL the table is range-partitioned by created_at month; see
+    # wallet/partitions.py.
     TRANSACTION_TYPES = [
         ("CHARGE", "Charge"),
         ("TRANSFER_OUT", "Transfer Out"),
         ("TRANSFER_IN", "Transfer In"),
         ("SETTLEMENT", "Settlement"),
     ]
+    # Types that add to the balance; every other type subtracts from it.
+    CREDIT_TYPES = ("CHARGE", "TRANSFER_IN")
+    # Transfer rows store no description; it is rendered from the
+    # counterparty's username when read.
+    TRANSFER_DESCRIPTIONS = {
+        "TRANSFER_OUT": "Transferred to {}",
+        "TRANSFER_IN": "Received from {}",
+    }
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Time-ordered, so inserts append to the primary key index; rows from
+    # before migration 0013 keep their random uuid4 ids.
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     wallet = models.ForeignKey(
         Wallet, on_delete=models.CASCADE, related_name="transactions"
     )
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.BigIntegerField()
     description = models.TextField(blank=True, null=True)
+    # The other side of a transfer. Served by wallet_tx_counterparty_idx.
+    counterparty_wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_index=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Serves keyset pagination of a wallet's history, newest first.
+            models.Index(
+                fields=["wallet", "-created_at", "-id"],
+                name="wallet_tx_wallet_created_idx",
+            ),
+            models.Index(
+                fields=["counterparty_wallet", "-created_at"],
+                name="wallet_tx_counterparty_idx",
+            ),
+            # Serve the history filters (wallet/filters.py): a type filter
+            # keeps the history order, an amount range reads only its rows.
+            models.Index(
+                fields=["wallet", "transaction_type", "-created_at", "-id"],
+                name="wallet_tx_wallet_type_idx",
+            ),
+            models.Index(fields=["wallet", "amount"], name="wallet_tx_wallet_amount_idx"),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} {self.wallet.currency}"
 
+    @classmethod
+    def render_description(cls, transaction_type, description, counterparty_username):
+        if description or counterparty_username is None:
+            return description
+        return cls.TRANSFER_DESCRIPTIONS[transaction_type].format(counterparty_username)
+
+    @property
+    def display_description(self):
+        """
+        The stored description, or the transfer description. Load the
+        ledger with ``select_related("counterparty_wallet__user")``, or
+        every transfer row costs two queries.
+        """
+        counterparty = self.counterparty_wallet
+        return self.render_description(
+            self.transaction_type,
+            self.description,
+            counterparty.user.username if counterparty else None,
+        )
+
+
 class Payment(models.Model):
+    PENDING = "pending"
+    PAID = "paid"
+    FAILED = "failed"
+
     wallet = models.ForeignKey(Wallet, on_delete=models.DO_NOTHING)
-    amount = models.PositiveIntegerField()
+    amount = models.PositiveBigIntegerField()
     status = models.CharField(max_length=10)
     authority = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every status change, and by the pending-payment sweeper each
+    # time it claims the payment (see wallet/payments.py).
     updated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper's scan; settled payments drop out of the index.
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(status="pending"),
+                name="wallet_payment_pending_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"payment {self.authority} - {self.amount}"
-    
\ No newline at end of file
+
+
+class WalletBalanceCheckpoint(models.Model):
+    """
+    The ledger balance of a wallet as of ``as_of``: the signed sum of every
+    transaction created before that instant, ``last_transaction_id`` being
+    the newest of them. ``reconcile_wallets`` only sums transactions from
+    ``as_of`` on, and moves the checkpoint forward after each clean run.
+    """
+
+    wallet = models.OneToOneField(
+        Wallet, on_delete=models.CASCADE, related_name="balance_checkpoint"
+    )
+    balance = models.BigIntegerField()
+    as_of = models.DateTimeField()
+    last_transaction_id = models.UUIDField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.wallet_id}: {self.balance} as of {self.as_of:%Y-%m-%d %H:%M}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a money-moving request sent with an ``Idempotency-Key``
+    header. The unique (user, key) constraint is the source of truth; the row
+    is written in the same transaction as the wallet changes it describes.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=50)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="wallet_idempotency_user_key_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} -> {self.response_status}"
+
+
+class ArchivedLedgerChunk(models.Model):
+    """
+    Index entry for one compressed chunk of archived ledger rows (see
+    wallet/archive.py). The chunk is the gzip member at ``offset`` in
+    ``path``. It holds rows of one month from wallets of one shard, sorted
+    by wallet, so a wallet's archived history is found without opening
+    unrelated files.
+    """
+
+    month = models.DateField()
+    shard = models.PositiveSmallIntegerField()
+    path = models.CharField(max_length=255)
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveBigIntegerField()
+    row_count = models.PositiveIntegerField()
+    first_wallet_id = models.UUIDField()
+    last_wallet_id = models.UUIDField()
+    min_created_at = models.DateTimeField()
+    max_created_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["shard", "first_wallet_id", "last_wallet_id"],
+                name="wallet_archive_shard_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.path}@{self.offset} ({self.row_count} rows)"
+
+
+class WalletDailyAggregate(models.Model):
+    """
+    Per-wallet totals of one UTC day, by transaction type. Rows are rolled
+    up from the ledger incrementally (see wallet/rollups.py) and stay after
+    the ledger rows themselves are archived.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="daily_aggregates"
+    )
+    day = models.DateField()
+    charged = models.BigIntegerField(default=0)
+    transferred_in = models.BigIntegerField(default=0)
+    transferred_out = models.BigIntegerField(default=0)
+    settled = models.BigIntegerField(default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "day"], name="wallet_daily_aggregate_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} {self.day}: {self.transaction_count} transactions"
+
+
+class LedgerWatermark(models.Model):
+    """
+    How far a ledger consumer has read: every row created before
+    ``position`` has been processed.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position:%Y-%m-%d %H:%M:%S}"
+
+
+class WalletStatement(models.Model):
+    """
+    The statement of a closed month, written once and never changed (see
+    wallet/statements.py). ``document`` is the rendered statement, line
+    items included.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="statements"
+    )
+    month = models.DateField()
+    opening_balance = models.BigIntegerField()
+    closing_balance = models.BigIntegerField()
+    document = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "month"], name="wallet_statement_month_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} {self.month:%Y-%m}: {self.opening_balance} -> {self.closing_balance}"
+
+
+class JournalEntry(models.Model):
+    """
+    One balanced money movement in the double-entry journal (see
+    wallet/journal.py). Its postings sum to zero.
+    """
+
+    KINDS = [
+        ("CHARGE", "Charge"),
+        ("TRANSFER", "Transfer"),
+        ("SETTLEMENT", "Settlement"),
+        ("BONUS", "Bonus"),
+        ("OPENING", "Opening balance"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    description = models.TextField(blank=True)
+    # Not auto_now_add: Journal sets it so the postings carry the same time,
+    # and opening balances are dated back to the wallet's creation.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} {self.id}"
+
+
+class JournalPosting(models.Model):
+    """
+    One side of a journal entry: a signed amount on either a wallet or a
+    system account (debits positive, credits negative). Transfer postings
+    name the wallet on the other side in ``counterparty_wallet``.
+    """
+
+    SYSTEM_ACCOUNTS = [
+        ("GATEWAY_FLOAT", "Gateway float"),
+        ("SETTLEMENT", "Settlement clearing"),
+        ("PROMOTIONS", "Promotions"),
+        ("OPENING_BALANCES", "Opening balances"),
+    ]
+
+    entry = models.ForeignKey(
+        JournalEntry, on_delete=models.CASCADE, related_name="postings"
+    )
+    # Served by wallet_posting_pair_idx, which leads with the wallet.
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="postings",
+        db_index=False,
+    )
+    system_account = models.CharField(
+        max_length=20, choices=SYSTEM_ACCOUNTS, null=True, blank=True
+    )
+    counterparty_wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    amount = models.BigIntegerField()
+    # Copied from the entry, so the indexes below can range over it.
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(wallet__isnull=False, system_account__isnull=True)
+                | models.Q(wallet__isnull=True, system_account__isnull=False),
+                name="wallet_posting_one_account",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["wallet", "counterparty_wallet", "-created_at"],
+                name="wallet_posting_pair_idx",
+            ),
+            models.Index(
+                fields=["system_account", "created_at"],
+                include=["amount"],
+                condition=models.Q(system_account__isnull=False),
+                name="wallet_posting_system_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id or self.system_account} {self.amount}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A wallet event waiting to be published (see wallet/outbox.py). Written
+    in the transaction of the change it describes and deleted once
+    published, so the table only holds the undelivered backlog.
+    """
+
+    # Time-ordered, so the dispatcher drains events in creation order.
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} {self.id}"
+
+
+class AsyncTransfer(models.Model):
+    """
+    A transfer accepted by the API and executed later by a transfer queue
+    worker (see wallet/async_transfers.py). ``id`` is the transfer id
+    clients poll.
+    """
+
+    PENDING = "PENDING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    sender_wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="async_transfers"
+    )
+    # Not a foreign key: a missing receiver fails the transfer when it runs.
+    receiver_wallet_id = models.UUIDField()
+    amount = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When its task was handed to the broker; requeue_stale sends pending
+    # transfers whose publish was lost.
+    queued_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["queued_at"],
+                name="wallet_async_pending_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.status}"
+
+
+class WalletHold(models.Model):
+    """
+    Funds reserved on a wallet while an external system (a bank payout, a
+    merchant) is called; see ``WalletService.hold``. An active hold counts
+    in ``Wallet.held``. It ends captured, released or, once past
+    ``expires_at``, expired by the ``expire_wallet_holds`` task.
+    """
+
+    ACTIVE = "ACTIVE"
+    CAPTURED = "CAPTURED"
+    RELEASED = "RELEASED"
+    EXPIRED = "EXPIRED"
+    STATUSES = [
+        (ACTIVE, "Active"),
+        (CAPTURED, "Captured"),
+        (RELEASED, "Released"),
+        (EXPIRED, "Expired"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="holds")
+    amount = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=ACTIVE)
+    # The caller's id of the external operation, e.g. a payout id.
+    reference = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper's scan; ended holds drop out of the index.
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="ACTIVE"),
+                name="wallet_hold_active_expiry_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} hold of {self.amount} on {self.wallet_id}"
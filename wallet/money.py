@@ -0,0 +1,98 @@
+# wallet/money.py
+"""
+Money as 64-bit integers of a currency's minor unit.
+
+Every amount column in the wallet app is a ``BigIntegerField`` of minor
+units: rials for IRR, which has no minor unit in use, or cents for a
+currency with an exponent of 2. Services and the database only add and
+compare integers. Amounts are converted from and to decimal strings at
+the edges, in the serializers, exports and statements.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+DEFAULT_CURRENCY = "IRR"
+
+# Decimal places of each currency's minor unit.
+EXPONENTS = {
+    "IRR": 0,
+    "USD": 2,
+    "EUR": 2,
+}
+
+# Largest magnitude a BIGINT column holds.
+MAX_MINOR_UNITS = 2**63 - 1
+
+
+def exponent(currency: str) -> int:
+    try:
+        return EXPONENTS[currency]
+    except KeyError:
+        raise ValueError(f"Unknown currency {currency!r}.")
+
+
+@dataclass(frozen=True)
+class Money:
+    minor: int
+    currency: str = DEFAULT_CURRENCY
+
+    @classmethod
+    def parse(cls, value, currency: str = DEFAULT_CURRENCY) -> "Money":
+        """
+        ``value`` in major units (a Decimal, int or numeric string). Raises
+        ValueError if it has more decimal places than the currency allows.
+        """
+        try:
+            amount = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"{value!r} is not a number.")
+        minor = amount.scaleb(exponent(currency))
+        if not minor.is_finite() or minor != minor.to_integral_value():
+            raise ValueError(f"{value} has more decimal places than {currency} allows.")
+        if abs(minor) > MAX_MINOR_UNITS:
+            raise ValueError(f"{value} is out of range.")
+        return cls(int(minor), currency)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.minor).scaleb(-exponent(self.currency))
+
+    def __str__(self):
+        places = exponent(self.currency)
+        if not places:
+            return str(self.minor)
+        major, minor = divmod(abs(self.minor), 10**places)
+        sign = "-" if self.minor < 0 else ""
+        return f"{sign}{major}.{minor:0{places}d}"
+
+    def _check(self, other):
+        if not isinstance(other, Money) or other.currency != self.currency:
+            raise TypeError(f"Cannot combine {self.currency} with {other!r}.")
+
+    def __add__(self, other):
+        self._check(other)
+        return Money(self.minor + other.minor, self.currency)
+
+    def __sub__(self, other):
+        self._check(other)
+        return Money(self.minor - other.minor, self.currency)
+
+    def __neg__(self):
+        return Money(-self.minor, self.currency)
+
+    def __lt__(self, other):
+        self._check(other)
+        return self.minor < other.minor
+
+    def __le__(self, other):
+        self._check(other)
+        return self.minor <= other.minor
+
+
+def format_minor(minor: int, currency: str = DEFAULT_CURRENCY) -> str:
+    """Decimal string of an amount stored in minor units."""
+    return str(Money(minor, currency))
+
+
+def to_minor(value, currency: str = DEFAULT_CURRENCY) -> int:
+    """Minor units of a major-unit amount; see ``Money.parse``."""
+    return Money.parse(value, currency).minor
@@ -0,0 +1,226 @@
+# wallet/money_backfill.py
+"""
+Online conversion of the decimal money columns to integer minor units
+(see wallet/money.py).
+
+Migration 0014 adds a nullable ``<column>_minor`` BIGINT next to every
+decimal money column. On PostgreSQL it also adds a trigger per table that
+fills ``<column>_minor`` on every INSERT and UPDATE, so rows written while
+the conversion runs stay in step. ``backfill_money_minor_units`` then
+fills the existing rows in short keyset-ordered chunks, each its own
+transaction. Migration 0015 repeats the pass for rows still missing and
+checks that every amount converted exactly. Migration 0016 drops the
+triggers and the decimal columns and renames the minor columns in their
+place.
+
+A row's currency is its wallet's. A system account posting has no
+wallet and takes the currency of the wallet posted in the same entry.
+
+The decimal columns had two decimal places whatever the currency, so an
+IRR amount can hold a fraction of a rial that no integer can. 0015 stops
+on such rows. ``fractional`` lists them beforehand and ``round_fractional``
+applies the rounding policy: each such amount is rounded on its own to the
+nearest minor unit, halves away from zero (PostgreSQL ``ROUND``). A wallet
+whose balance or ledger rows were rounded may then differ from the sum of
+its ledger by under one minor unit per rounded row; ``reconcile_wallets``
+reports those wallets.
+"""
+from .money import DEFAULT_CURRENCY, EXPONENTS
+
+# (table, currency source, decimal columns). The currency source is the
+# row's own currency column, its wallet, or its journal entry's wallet.
+MONEY_COLUMNS = [
+    ("wallet_wallet", "currency", ["balance"]),
+    ("wallet_wallettransaction", "wallet_id", ["amount"]),
+    ("wallet_walletbalancecheckpoint", "wallet_id", ["balance"]),
+    (
+        "wallet_walletdailyaggregate",
+        "wallet_id",
+        ["charged", "transferred_in", "transferred_out", "settled"],
+    ),
+    ("wallet_walletstatement", "wallet_id", ["opening_balance", "closing_balance"]),
+    ("wallet_journalposting", "entry_id", ["amount"]),
+]
+
+
+def scale_sql(row: str, source: str) -> str:
+    """
+    SQL for the factor from major to minor units of a row's currency;
+    ``row`` is the table name, or ``NEW`` inside a trigger.
+    """
+    if source == "currency":
+        currency = f"{row}.currency"
+    else:
+        wallet = f"{row}.wallet_id"
+        if source == "entry_id":
+            wallet = (
+                f"COALESCE({wallet}, (SELECT sibling.wallet_id FROM wallet_journalposting sibling "
+                f"WHERE sibling.entry_id = {row}.entry_id AND sibling.wallet_id IS NOT NULL LIMIT 1))"
+            )
+        currency = f"(SELECT currency FROM wallet_wallet WHERE wallet_wallet.id = {wallet})"
+    cases = " ".join(
+        f"WHEN '{code}' THEN {10**places}"
+        for code, places in EXPONENTS.items()
+        if places != EXPONENTS[DEFAULT_CURRENCY]
+    )
+    default = 10 ** EXPONENTS[DEFAULT_CURRENCY]
+    return f"(CASE {currency} {cases} ELSE {default} END)" if cases else str(default)
+
+
+def create_sync_triggers(schema_editor):
+    for table, source, columns in MONEY_COLUMNS:
+        assignments = "\n".join(
+            f"    NEW.{column}_minor := NEW.{column} * {scale_sql('NEW', source)};"
+            for column in columns
+        )
+        schema_editor.execute(
+            f"""
+            CREATE FUNCTION {table}_sync_minor() RETURNS trigger AS $$
+            BEGIN
+            {assignments}
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_sync_minor BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_sync_minor()"
+        )
+
+
+def drop_sync_triggers(schema_editor):
+    for table, _, _ in MONEY_COLUMNS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_sync_minor ON {table}")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_sync_minor()")
+
+
+def pending(connection) -> bool:
+    """Whether the decimal columns are still there to convert."""
+    with connection.cursor() as cursor:
+        columns = {
+            column.name
+            for column in connection.introspection.get_table_description(cursor, "wallet_wallet")
+        }
+    return "balance_minor" in columns
+
+
+def backfill(connection, chunk_size=5000, log=None) -> int:
+    """
+    Fill every missing or stale ``<column>_minor`` value, ``chunk_size``
+    rows per UPDATE in primary-key order. Stale values come from a trigger
+    that could not see the currency yet: a system posting inserted before
+    the wallet posting of its entry. Each chunk commits on its own unless
+    the caller holds a transaction. Returns the number of rows updated.
+    """
+    total = 0
+    for table, source, columns in MONEY_COLUMNS:
+        converted = {
+            column: f"ROUND({column} * {scale_sql(table, source)})" for column in columns
+        }
+        missing = " OR ".join(
+            f"{column}_minor IS NULL OR {column}_minor <> {value}"
+            for column, value in converted.items()
+        )
+        assignments = ", ".join(
+            f"{column}_minor = {value}" for column, value in converted.items()
+        )
+        last = None
+        while True:
+            with connection.cursor() as cursor:
+                after = "" if last is None else "AND id > %s"
+                cursor.execute(
+                    f"SELECT id FROM {table} WHERE ({missing}) {after} ORDER BY id LIMIT %s",
+                    ([] if last is None else [last]) + [chunk_size],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                lower = "" if last is None else "id > %s AND"
+                cursor.execute(
+                    f"UPDATE {table} SET {assignments} WHERE {lower} id <= %s AND ({missing})",
+                    ([] if last is None else [last]) + [ids[-1]],
+                )
+                total += cursor.rowcount
+            last = ids[-1]
+            if log:
+                log(f"{table}: up to {last}")
+    return total
+
+
+def mismatches(connection) -> dict:
+    """
+    ``{"table.column": count}`` of rows whose minor value is missing or is
+    not exactly the decimal amount, e.g. a fraction of a rial.
+    """
+    found = {}
+    with connection.cursor() as cursor:
+        for table, source, columns in MONEY_COLUMNS:
+            for column in columns:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE {column}_minor IS NULL "
+                    f"OR {column}_minor <> {column} * {scale_sql(table, source)}"
+                )
+                count = cursor.fetchone()[0]
+                if count:
+                    found[f"{table}.{column}"] = count
+    return found
+
+
+def _fraction_sql(table, source, column) -> str:
+    scaled = f"{column} * {scale_sql(table, source)}"
+    return f"{scaled} <> ROUND({scaled})"
+
+
+def fractional(connection, sample=5) -> dict:
+    """
+    ``{"table.column": (count, [id, ...])}`` of decimal amounts that are
+    not a whole number of minor units, with up to ``sample`` row ids each.
+    Nothing is changed.
+    """
+    found = {}
+    with connection.cursor() as cursor:
+        for table, source, columns in MONEY_COLUMNS:
+            for column in columns:
+                condition = _fraction_sql(table, source, column)
+                cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}")
+                count = cursor.fetchone()[0]
+                if count:
+                    cursor.execute(
+                        f"SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT %s",
+                        [sample],
+                    )
+                    found[f"{table}.{column}"] = (count, [row[0] for row in cursor.fetchall()])
+    return found
+
+
+def round_fractional(connection, log=None) -> int:
+    """
+    Round every decimal amount that is not a whole number of minor units
+    to the nearest one, halves away from zero. ``log`` gets one line per
+    changed value with its old and new amount. On PostgreSQL the 0014
+    triggers refresh the minor columns of the rounded rows. Returns the
+    number of values changed.
+    """
+    total = 0
+    with connection.cursor() as cursor:
+        for table, source, columns in MONEY_COLUMNS:
+            for column in columns:
+                scale = scale_sql(table, source)
+                condition = _fraction_sql(table, source, column)
+                cursor.execute(
+                    f"SELECT id, {column}, ROUND({column} * {scale}) / {scale} "
+                    f"FROM {table} WHERE {condition} ORDER BY id"
+                )
+                changed = cursor.fetchall()
+                if not changed:
+                    continue
+                cursor.execute(
+                    f"UPDATE {table} SET {column} = ROUND({column} * {scale}) / {scale} "
+                    f"WHERE {condition}"
+                )
+                total += cursor.rowcount
+                if log:
+                    for pk, old, new in changed:
+                        log(f"{table}.{column} {pk}: {old} -> {new.normalize():f}")
+    return total
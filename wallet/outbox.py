@@ -0,0 +1,90 @@
+# wallet/outbox.py
+"""
+Transactional outbox of wallet events.
+
+``WalletService`` adds an ``OutboxEvent`` row in the same transaction as
+each balance change, so an event exists if and only if its change
+committed. The request path only pays for that INSERT. The
+``dispatch_outbox`` Celery task (scheduled by beat) drains the table in
+batches: it locks a batch with ``SELECT ... FOR UPDATE SKIP LOCKED``,
+publishes each event to the ``WALLET_EVENTS_EXCHANGE`` topic exchange on
+the Celery broker with the topic as routing key, and deletes the batch in
+the same transaction. Concurrent dispatchers skip each other's rows, so
+an event is published by one dispatcher only and never again once its
+deletion commits. If a dispatcher dies after publishing but before
+committing, the batch is published again; every message carries the
+event ``id`` (also its ``message_id``) for consumers to drop duplicates.
+
+Events are published in ``id`` order, which is the order they were
+written, not necessarily the order their transactions committed.
+"""
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from kombu import Exchange
+from .models import OutboxEvent
+
+CHARGED = "wallet.charged"
+TRANSFERRED = "wallet.transferred"
+SETTLED = "wallet.settled"
+HOLD_PLACED = "wallet.hold_placed"
+HOLD_CAPTURED = "wallet.hold_captured"
+HOLD_RELEASED = "wallet.hold_released"
+HOLD_EXPIRED = "wallet.hold_expired"
+
+
+def new_event(topic: str, **payload) -> OutboxEvent:
+    """An unsaved event; amounts in the payload are minor units."""
+    return OutboxEvent(topic=topic, payload=payload)
+
+
+def emit(*events: OutboxEvent) -> None:
+    """Write events; call inside the transaction of the change they describe."""
+    OutboxEvent.objects.bulk_create(events)
+
+
+def message(event: OutboxEvent) -> dict:
+    return {
+        "id": str(event.id),
+        "topic": event.topic,
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+def publish(events: list[OutboxEvent]) -> None:
+    exchange = Exchange(settings.WALLET_EVENTS_EXCHANGE, type="topic", durable=True)
+    with current_app.producer_or_acquire() as producer:
+        for event in events:
+            producer.publish(
+                message(event),
+                exchange=exchange,
+                routing_key=event.topic,
+                declare=[exchange],
+                serializer="json",
+                message_id=str(event.id),
+            )
+
+
+def dispatch(batch_size=500, max_batches=20) -> int:
+    """
+    Publish and delete up to ``max_batches`` batches of pending events,
+    oldest first. A batch that fails to publish is rolled back and retried
+    by the next run. Returns the number of events published.
+    """
+    published = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True).order_by("id")[
+                    :batch_size
+                ]
+            )
+            if not events:
+                break
+            publish(events)
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        published += len(events)
+        if len(events) < batch_size:
+            break
+    return published
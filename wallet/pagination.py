@@ -0,0 +1,121 @@
+# wallet/pagination.py
+import base64
+import binascii
+import uuid
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def keyset_after(queryset, created_at, pk):
+    """
+    Restrict a newest-first ledger queryset to rows strictly after the
+    ``(created_at, id)`` position, so the index is entered at the cursor
+    instead of skipping OFFSET rows. The redundant ``created_at <=`` bound
+    gives the planner an index range start that the OR alone does not.
+    """
+    return queryset.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+        created_at__lte=created_at,
+    )
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Keyset pagination over ``(created_at, id)``, newest first.
+    The opaque cursor encodes the last row of the previous page, so page N
+    costs the same index range scan as page 1.
+
+    Each page is first read from a ``recent_window`` ending at the cursor.
+    That gives PostgreSQL constant created_at bounds, so the monthly ledger
+    partitions outside the window are pruned at plan time. Only when the
+    window holds less than a page is the rest read from older rows. After
+    that, a view with an ``archived_history(before, limit)`` method
+    continues the page from the cold archive.
+    """
+
+    ordering = ("-created_at", "-id")
+    recent_window = timedelta(days=31)
+    page_size = 10
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = keyset_after(queryset, *position)
+            window_start = position[0] - self.recent_window
+        else:
+            window_start = timezone.now() - self.recent_window
+
+        limit = self.page_size + 1
+        rows = list(queryset.filter(created_at__gte=window_start)[:limit])
+        if len(rows) < limit:
+            rows += queryset.filter(created_at__lt=window_start)[: limit - len(rows)]
+        archived_history = getattr(view, "archived_history", None)
+        if len(rows) < limit and archived_history is not None:
+            # Archived rows are all older than the ones still in the database.
+            before = (rows[-1].created_at, rows[-1].id) if rows else position
+            rows += archived_history(before, limit - len(rows))
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(last.created_at, last.id)
+        )
+
+    @staticmethod
+    def encode_cursor(created_at, pk):
+        raw = f"{created_at.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            created_at, pk = raw.decode().split("|", 1)
+            created_at, pk = parse_datetime(created_at), uuid.UUID(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
@@ -0,0 +1,199 @@
+# wallet/partitions.py
+"""
+Monthly range partitions of the PostgreSQL ledger table.
+
+``wallet_wallettransaction`` is partitioned by ``created_at`` (migration
+0007). The oldest partition, ``wallet_wallettransaction_legacy``, is the
+pre-partitioning table attached as is and covers everything up to the
+month the migration ran. After that each month ``YYYY-MM`` has its own
+partition, ``wallet_wallettransaction_pYYYY_MM``, covering
+``[YYYY-MM-01, next month)`` in UTC. The database primary key becomes
+``(id, created_at)``, because PostgreSQL requires the partition key in it.
+Django still treats ``id`` as the key, and ids are generated UUIDs.
+There is no default partition, so future months must exist before rows
+arrive for them. The ``ensure_ledger_partitions`` beat task keeps
+``WALLET_LEDGER_PARTITIONS_AHEAD`` months ahead and logs an error when
+fewer than ``WALLET_LEDGER_PARTITIONS_MIN_AHEAD`` are left;
+``ledger_partitions --check`` fails in the same case, for monitoring.
+"""
+import logging
+import re
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import WalletTransaction
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TABLE = WalletTransaction._meta.db_table
+
+Partition = namedtuple("Partition", ["name", "lower", "upper"])
+
+_BOUND_RE = re.compile(r"FROM \((?P<lower>[^)]*)\) TO \((?P<upper>[^)]*)\)")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{LEDGER_TABLE}_p{month:%Y_%m}"
+
+
+def _parse_bound(value):
+    value = value.strip()
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def is_partitioned(cursor) -> bool:
+    cursor.execute(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [LEDGER_TABLE]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(cursor) -> list[Partition]:
+    """
+    Attached partitions, oldest first. ``lower`` is None for the legacy
+    partition, which starts at MINVALUE.
+    """
+    cursor.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [LEDGER_TABLE],
+    )
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = _BOUND_RE.search(bound)
+        partitions.append(
+            Partition(name, _parse_bound(match["lower"]), _parse_bound(match["upper"]))
+        )
+    return sorted(partitions, key=lambda p: (p.lower is not None, p.lower))
+
+
+def create_partition(cursor, month: datetime) -> str:
+    # DDL takes no bind parameters; the bounds are generated, never user input.
+    name = partition_name(month)
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(name)} "
+        f"PARTITION OF {connection.ops.quote_name(LEDGER_TABLE)} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+    return name
+
+
+def _covers(existing, month: datetime) -> bool:
+    return any(
+        (p.lower is None or p.lower <= month) and p.upper is not None and month < p.upper
+        for p in existing
+    )
+
+
+def ensure_partitions(cursor, now: datetime, ahead: int) -> list[str]:
+    """
+    Create the monthly partitions from ``now``'s month through ``ahead``
+    months later, skipping months an existing partition already covers.
+    Returns the names of the partitions created.
+    """
+    existing = list_partitions(cursor)
+    created = []
+    first = month_start(now)
+    for offset in range(ahead + 1):
+        month = add_months(first, offset)
+        if not _covers(existing, month):
+            created.append(create_partition(cursor, month))
+    return created
+
+
+def months_ahead(cursor, now: datetime) -> int:
+    """
+    The number of months after ``now``'s month that have a partition,
+    counted up to the first month without one.
+    """
+    existing = list_partitions(cursor)
+    month = add_months(month_start(now), 1)
+    count = 0
+    while _covers(existing, month):
+        count += 1
+        month = add_months(month, 1)
+    return count
+
+
+def maintain(ahead: int = None, minimum: int = None):
+    """
+    Create the partitions of the next ``ahead`` months and return
+    ``{"created": [...], "months_ahead": n}``, or None when the ledger is
+    not partitioned. Logs an error if fewer than ``minimum`` future
+    months are covered afterwards, e.g. because the DDL keeps failing.
+    """
+    ahead = settings.WALLET_LEDGER_PARTITIONS_AHEAD if ahead is None else ahead
+    minimum = settings.WALLET_LEDGER_PARTITIONS_MIN_AHEAD if minimum is None else minimum
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return None
+        now = timezone.now()
+        created = ensure_partitions(cursor, now, ahead)
+        covered = months_ahead(cursor, now)
+    if covered < minimum:
+        logger.error(
+            "Only %d future month(s) of %s have a partition; at least %d are required.",
+            covered,
+            LEDGER_TABLE,
+            minimum,
+        )
+    return {"created": created, "months_ahead": covered}
+
+
+def detach_partition(cursor, name: str, concurrently: bool = False) -> None:
+    """
+    Detach ``name`` from the ledger; the table and its rows stay in place.
+    ``concurrently`` (PostgreSQL 14+, outside a transaction) avoids an
+    ACCESS EXCLUSIVE lock on the parent.
+    """
+    cursor.execute(
+        f"ALTER TABLE {connection.ops.quote_name(LEDGER_TABLE)} "
+        f"DETACH PARTITION {connection.ops.quote_name(name)}"
+        f"{' CONCURRENTLY' if concurrently else ''}"
+    )
+
+
+def create_ledger_index(cursor, name: str, columns: str, suffix: str) -> None:
+    """
+    Build index ``name`` on ``columns`` (SQL, e.g. ``"(wallet_id, created_at
+    DESC)"``) without blocking writes; call it outside a transaction.
+    PostgreSQL cannot build an index on a partitioned table concurrently,
+    so it is created on the parent only, which is instant and leaves it
+    invalid. Each partition's index, ``<partition>_<suffix>``, is then
+    built concurrently and attached; the parent index becomes valid with
+    the last attach. New partitions get it from the parent.
+    """
+    quote = connection.ops.quote_name
+    if not is_partitioned(cursor):
+        cursor.execute(
+            f"CREATE INDEX CONCURRENTLY {quote(name)} ON {quote(LEDGER_TABLE)} {columns}"
+        )
+        return
+    cursor.execute(f"CREATE INDEX {quote(name)} ON ONLY {quote(LEDGER_TABLE)} {columns}")
+    for partition in list_partitions(cursor):
+        child = f"{partition.name}_{suffix}"
+        cursor.execute(
+            f"CREATE INDEX CONCURRENTLY {quote(child)} ON {quote(partition.name)} {columns}"
+        )
+        cursor.execute(f"ALTER INDEX {quote(name)} ATTACH PARTITION {quote(child)}")
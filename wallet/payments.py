@@ -0,0 +1,161 @@
+# wallet/payments.py
+"""
+Verification of gateway payments: the verify views' outcome handling and
+the sweeper that resolves payments whose verify callback never arrived.
+
+Both credit through ``WalletService.credit_verified_payment``, which uses
+the amount stored on the ``Payment``, never one sent by the client.
+
+A ``Payment`` stays pending when the user closes the browser before
+``PaymentVerifyView`` runs. ``sweep_pending`` (the ``sweep_pending_payments``
+beat task) picks up payments pending for ``WALLET_PAYMENT_SWEEP_AFTER_SECONDS``
+and asks Zarinpal about each:
+
+- verified: the wallet is credited by ``WalletService.credit_verified_payment``,
+  which does nothing if the callback got there first;
+- rejected as unpaid or expired: the payment is marked failed;
+- any other reply or a gateway error: it stays pending and is tried again
+  a sweep interval later.
+
+Payments are claimed a batch at a time with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, which moves their ``updated_at`` forward, so overlapping sweeps
+never verify the same payment. The gateway calls then run outside any
+transaction, ``WALLET_PAYMENT_SWEEP_WORKERS`` at a time on a thread pool;
+the database work stays on the calling thread, one short transaction per
+payment.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .gateways import ZarinpalClient, get_zarinpal_client
+from .models import Payment
+from .services import WalletService
+
+logger = logging.getLogger(__name__)
+
+
+def _verified(authority) -> Response:
+    return Response(
+        {
+            "status": "success",
+            "message": "Transaction created successfully",
+            "authority": authority,
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+def known_outcome(payment) -> Response | None:
+    """
+    The verify response of a payment that needs no gateway call: a missing
+    payment, or one already paid or failed. A repeated verify of a paid
+    payment is answered here without a lock or a gateway round trip.
+    None if the payment is pending.
+    """
+    if payment is None:
+        return Response(
+            {"status": "error", "errors": "Payment not found."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    if payment.status == Payment.PAID:
+        return _verified(payment.authority)
+    if payment.status == Payment.FAILED:
+        return Response(
+            {"status": "error", "errors": "Payment failed."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def record_verification(authority, result) -> Response:
+    """Credit a payment the gateway verified; ``result`` is its verify response."""
+    if not ZarinpalClient.is_verified(result):
+        return Response(
+            {"status": "error", "errors": result.get("errors", "Unknown error")},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    WalletService.credit_verified_payment(authority)
+    return _verified(authority)
+
+
+def _stale(now):
+    cutoff = now - timedelta(seconds=settings.WALLET_PAYMENT_SWEEP_AFTER_SECONDS)
+    return Payment.objects.filter(status=Payment.PENDING, updated_at__lte=cutoff)
+
+
+def claim(batch_size) -> list[Payment]:
+    """Lease up to ``batch_size`` stale pending payments, oldest first."""
+    now = timezone.now()
+    with transaction.atomic():
+        payments = list(
+            _stale(now).select_for_update(skip_locked=True).order_by("updated_at")[:batch_size]
+        )
+        Payment.objects.filter(id__in=[payment.id for payment in payments]).update(
+            updated_at=now
+        )
+    return payments
+
+
+def _verify(payment):
+    try:
+        return get_zarinpal_client().verify_payment(payment.amount, payment.authority)
+    except requests.RequestException as exc:
+        logger.warning("Sweeper could not verify payment %s: %s", payment.authority, exc)
+        return None
+
+
+def sweep_pending(batch_size=100, max_batches=10, workers=None) -> dict:
+    """
+    Resolve up to ``max_batches`` batches of stale pending payments.
+    Returns the counts of ``paid``, ``failed`` and ``errors`` (left
+    pending, including replies that are not a definitive rejection), the
+    throughput in payments per second and the ``backlog`` of stale
+    payments still pending.
+    """
+    workers = workers or settings.WALLET_PAYMENT_SWEEP_WORKERS
+    stats = {"paid": 0, "failed": 0, "errors": 0}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(max_batches):
+            payments = claim(batch_size)
+            for payment, result in zip(payments, pool.map(_verify, payments)):
+                if result is None:
+                    stats["errors"] += 1
+                elif ZarinpalClient.is_verified(result):
+                    WalletService.credit_verified_payment(payment.authority)
+                    stats["paid"] += 1
+                elif ZarinpalClient.is_rejected(result):
+                    Payment.objects.filter(id=payment.id, status=Payment.PENDING).update(
+                        status=Payment.FAILED, updated_at=timezone.now()
+                    )
+                    stats["failed"] += 1
+                else:
+                    logger.warning(
+                        "Sweeper got no verdict for payment %s: %s",
+                        payment.authority,
+                        result.get("errors"),
+                    )
+                    stats["errors"] += 1
+            if len(payments) < batch_size:
+                break
+    elapsed = time.perf_counter() - started
+    checked = sum(stats.values())
+    stats["per_second"] = round(checked / elapsed, 1) if elapsed else 0.0
+    stats["backlog"] = _stale(timezone.now()).count()
+    logger.info(
+        "Payment sweep: %s paid, %s failed, %s errors in %.2fs (%.1f/s), %s still pending",
+        stats["paid"],
+        stats["failed"],
+        stats["errors"],
+        elapsed,
+        stats["per_second"],
+        stats["backlog"],
+    )
+    return stats
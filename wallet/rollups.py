@@ -0,0 +1,184 @@
+# wallet/rollups.py
+"""
+Incremental per-wallet daily totals (``WalletDailyAggregate``).
+
+The rollup reads the ledger in ``created_at`` windows behind a high-water
+mark (``LedgerWatermark`` named ``ROLLUP``): each window's rows are summed
+per wallet and UTC day, added to the aggregate rows, and the mark moves to
+the window's end in the same transaction, so every row is counted exactly
+once. The mark trails the clock by ``WALLET_ROLLUP_LAG_SECONDS`` so that
+rows whose transaction commits a little after their ``created_at`` are not
+skipped.
+
+``daily_totals`` reads the aggregates and adds the few rows past the mark
+from the ledger, so it costs O(days) rather than O(transactions).
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Min, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import LedgerWatermark, WalletDailyAggregate, WalletTransaction
+
+ROLLUP = "wallet_daily_aggregates"
+
+# Aggregate column for each transaction type.
+TYPE_COLUMNS = {
+    "CHARGE": "charged",
+    "TRANSFER_IN": "transferred_in",
+    "TRANSFER_OUT": "transferred_out",
+    "SETTLEMENT": "settled",
+}
+COLUMNS = [*TYPE_COLUMNS.values(), "transaction_count"]
+
+
+def settled_before() -> datetime:
+    return timezone.now() - timedelta(seconds=settings.WALLET_ROLLUP_LAG_SECONDS)
+
+
+def watermark():
+    """The instant every earlier ledger row is rolled up to, or None."""
+    return (
+        LedgerWatermark.objects.filter(name=ROLLUP).values_list("position", flat=True).first()
+    )
+
+
+def _day_totals(rows) -> list[dict]:
+    """Sum ``rows`` (a WalletTransaction queryset) per wallet and UTC day."""
+    sums = {
+        column: Sum(
+            Case(
+                When(transaction_type=transaction_type, then=F("amount")),
+                default=Value(0),
+                output_field=BigIntegerField(),
+            )
+        )
+        for transaction_type, column in TYPE_COLUMNS.items()
+    }
+    return list(
+        rows.order_by()
+        .annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values("wallet_id", "day")
+        .annotate(transaction_count=Count("id"), **sums)
+    )
+
+
+def _add_totals(totals):
+    """Add ``totals`` onto the aggregate rows, creating missing ones."""
+    if not totals:
+        return
+    table = connection.ops.quote_name(WalletDailyAggregate._meta.db_table)
+    fields = [WalletDailyAggregate._meta.get_field(name) for name in ["wallet", "day", *COLUMNS]]
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    updates = ", ".join(
+        f"{name} = {table}.{name} + excluded.{name}"
+        for name in (connection.ops.quote_name(column) for column in COLUMNS)
+    )
+    # bulk_create(update_conflicts=True) can only overwrite; ON CONFLICT with
+    # an increment reads as the same statement on PostgreSQL and SQLite.
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"ON CONFLICT (wallet_id, day) DO UPDATE SET {updates}"
+    )
+    params = [
+        [
+            field.get_db_prep_save(row[field.attname], connection)
+            for field in fields
+        ]
+        for row in totals
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def roll_up_window(until: datetime, window: timedelta = timedelta(days=1)):
+    """
+    Roll up the ledger rows in ``[mark, min(mark + window, until))`` and
+    advance the mark. Returns ``(rows, new_mark)``, or None when the mark
+    has already reached ``until``. A mark that does not exist yet starts at
+    the day of the oldest ledger row.
+    """
+    if watermark() is None:
+        oldest = WalletTransaction.objects.aggregate(oldest=Min("created_at"))["oldest"]
+        start = (
+            datetime.combine(oldest.astimezone(dt_timezone.utc).date(), time(), dt_timezone.utc)
+            if oldest
+            else until
+        )
+        LedgerWatermark.objects.get_or_create(name=ROLLUP, defaults={"position": start})
+
+    with transaction.atomic():
+        # The row lock keeps concurrent rollups from adding a window twice.
+        mark = LedgerWatermark.objects.select_for_update().get(name=ROLLUP)
+        if mark.position >= until:
+            return None
+        end = min(mark.position + window, until)
+        rows = WalletTransaction.objects.filter(created_at__gte=mark.position, created_at__lt=end)
+        totals = _day_totals(rows)
+        if not totals:
+            # Jump over gaps in the ledger instead of stepping through them.
+            following = (
+                WalletTransaction.objects.filter(created_at__gte=end, created_at__lt=until)
+                .aggregate(following=Min("created_at"))["following"]
+            )
+            end = following or until
+        _add_totals(totals)
+        mark.position = end
+        mark.save(update_fields=["position", "updated_at"])
+    return sum(row["transaction_count"] for row in totals), end
+
+
+def roll_up(until=None, window=timedelta(days=1), max_windows=None) -> int:
+    """
+    Roll up windows until the mark reaches ``until`` (default: now minus
+    the lag) or ``max_windows`` windows are done. Returns the row count.
+    """
+    until = until or settled_before()
+    rolled = 0
+    windows = 0
+    while max_windows is None or windows < max_windows:
+        result = roll_up_window(until, window)
+        if result is None:
+            break
+        rolled += result[0]
+        windows += 1
+    return rolled
+
+
+def daily_totals(wallet_id, start, end) -> list[WalletDailyAggregate]:
+    """
+    Totals of a wallet for each UTC day from ``start`` to ``end``
+    (inclusive dates) that has transactions, oldest first. Rows past the
+    watermark are summed from the ledger and merged in.
+    """
+    while True:
+        mark = watermark()
+        days = defaultdict(dict)
+        for aggregate in WalletDailyAggregate.objects.filter(
+            wallet_id=wallet_id, day__gte=start, day__lte=end
+        ):
+            days[aggregate.day] = {column: getattr(aggregate, column) for column in COLUMNS}
+
+        live = WalletTransaction.objects.filter(
+            wallet_id=wallet_id,
+            created_at__gte=datetime.combine(start, time(), dt_timezone.utc),
+            created_at__lt=datetime.combine(end + timedelta(days=1), time(), dt_timezone.utc),
+        )
+        if mark is not None:
+            live = live.filter(created_at__gte=mark)
+        for row in _day_totals(live):
+            totals = days[row["day"]]
+            for column in COLUMNS:
+                totals[column] = totals.get(column, 0) + row[column]
+
+        # A rollup that committed in between would count its window twice
+        # or not at all; read again.
+        if watermark() == mark:
+            break
+
+    return [
+        WalletDailyAggregate(wallet_id=wallet_id, day=day, **totals)
+        for day, totals in sorted(days.items())
+    ]
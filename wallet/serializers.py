@@ -1,40 +1,142 @@
 # wallet/serializers.py
+from django.utils import timezone
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Wallet, WalletTransaction
+from .models import AsyncTransfer, Wallet, WalletTransaction
+from .money import DEFAULT_CURRENCY, Money
+from .partitions import add_months
+
+
+class MoneyField(serializers.Field):
+    """
+    An amount stored as an integer of minor units (see wallet/money.py),
+    written and read as a decimal string in major units, e.g. "50000" for
+    IRR or "12.50" for USD. The currency is the instance's own ``currency``
+    on output, else the ``currency`` of the serializer context, else IRR.
+    Input with more decimal places than the currency has is rejected.
+    """
+
+    def __init__(self, min_value=None, **kwargs):
+        self.min_value = min_value
+        super().__init__(**kwargs)
+
+    def _currency(self, instance=None):
+        return getattr(instance, "currency", None) or self.context.get(
+            "currency", DEFAULT_CURRENCY
+        )
+
+    def get_attribute(self, instance):
+        return Money(super().get_attribute(instance), self._currency(instance))
+
+    def to_representation(self, value):
+        return str(value)
+
+    def to_internal_value(self, data):
+        try:
+            value = Money.parse(data, self._currency())
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        if self.min_value is not None and value.to_decimal() < self.min_value:
+            raise serializers.ValidationError(
+                f"Ensure this value is greater than or equal to {self.min_value}."
+            )
+        return value.minor
 
 
 class WalletSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField()
+    balance = MoneyField(read_only=True)
+    held = MoneyField(read_only=True)
+    available_balance = MoneyField(read_only=True)
 
     class Meta:
         model = Wallet
-        fields = ["id", "user", "balance", "currency", "updated_at"]
+        fields = ["id", "user", "balance", "held", "available_balance", "currency", "updated_at"]
 
 
 class WalletTransactionSerializer(serializers.ModelSerializer):
+    """Expects rows loaded with ``select_related("counterparty_wallet__user")``."""
+
+    amount = MoneyField(read_only=True)
+    description = serializers.CharField(source="display_description", read_only=True)
+
     class Meta:
         model = WalletTransaction
-        fields = ["id", "transaction_type", "amount", "description", "created_at"]
+        fields = [
+            "id",
+            "transaction_type",
+            "amount",
+            "description",
+            "counterparty_wallet",
+            "created_at",
+        ]
 
 
-class ChargeWalletSerializer(serializers.Serializer):
-    amount = serializers.DecimalField(
-        max_digits=12, decimal_places=2, min_value=Decimal("1.00")
+class TransactionExportSerializer(serializers.Serializer):
+    export_format = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    transaction_type = serializers.ChoiceField(
+        choices=WalletTransaction.TRANSACTION_TYPES, required=False
     )
 
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end.")
+        return attrs
+
+
+class StatementSerializer(serializers.Serializer):
+    MAX_MONTHS = 12
+
+    start = serializers.DateField(input_formats=["%Y-%m"], required=False)
+    end = serializers.DateField(input_formats=["%Y-%m"], required=False)
+
+    def validate(self, attrs):
+        end = attrs.get("end") or timezone.now().date().replace(day=1)
+        start = attrs.get("start") or add_months(end, 1 - self.MAX_MONTHS).date()
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        if add_months(start, self.MAX_MONTHS).date() <= end:
+            raise serializers.ValidationError(
+                f"A statement covers at most {self.MAX_MONTHS} months."
+            )
+        return {"start": start, "end": end}
+
+
+class ChargeWalletSerializer(serializers.Serializer):
+    amount = MoneyField(min_value=Decimal("1"))
+
 
 class TransferSerializer(serializers.Serializer):
     receiver_wallet_id = serializers.UUIDField()
-    amount = serializers.DecimalField(
-        max_digits=12, decimal_places=2, min_value=Decimal("1.00")
-    )
+    amount = MoneyField(min_value=Decimal("1"))
+
+
+class AsyncTransferSerializer(serializers.ModelSerializer):
+    amount = MoneyField(read_only=True)
+
+    class Meta:
+        model = AsyncTransfer
+        fields = [
+            "id",
+            "status",
+            "receiver_wallet_id",
+            "amount",
+            "error",
+            "created_at",
+            "completed_at",
+        ]
+
+
+class BatchTransferSerializer(serializers.Serializer):
+    transfers = TransferSerializer(many=True, allow_empty=False, max_length=1000)
+    # By default one failing item rejects the whole batch.
+    allow_partial = serializers.BooleanField(default=False)
 
 
 class SettlementSerializer(serializers.Serializer):
-    amount = serializers.DecimalField(
-        max_digits=12, decimal_places=2, min_value=Decimal("1.00")
-    )
+    amount = MoneyField(min_value=Decimal("1"))
 class PaymentRequestSerializer(serializers.Serializer):
     amount = serializers.IntegerField()
     description = serializers.CharField()
@@ -42,5 +144,4 @@ class PaymentRequestSerializer(serializers.Serializer):
     mobile = serializers.CharField()
 
 class PaymentVerifySerializer(serializers.Serializer):
-    amount = serializers.IntegerField()
     authority = serializers.CharField()
\ No newline at end of file
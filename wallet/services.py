@@ -1,211 +1,520 @@
 # wallet/services.py
-from decimal import Decimal
-from django.db import transaction
-from .models import Wallet, WalletTransaction, Payment
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
+import functools
+import logging
+import random
+import time
+from datetime import timedelta
 from django.conf import settings
-from .models import Payment
-import requests
+from django.db import OperationalError, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.utils import timezone
+from . import balance_cache, journal, metrics, outbox
+from .models import Payment, Wallet, WalletHold, WalletTransaction
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL SQLSTATEs that mean "run the whole transaction again".
+RETRYABLE_SQLSTATES = {
+    "40P01",  # deadlock_detected
+    "40001",  # serialization_failure
+}
+
+
+def is_retryable_conflict(exc: OperationalError) -> bool:
+    cause = exc.__cause__
+    sqlstate = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    return sqlstate in RETRYABLE_SQLSTATES
+
+
+def retry_on_conflict(attempts: int = 3, base_delay: float = 0.05, max_delay: float = 1.0):
+    """
+    Retry a transactional service method when PostgreSQL aborts it with a
+    deadlock or serialization failure, sleeping with full jitter between tries.
+    Retries are skipped inside an outer atomic block, because that
+    transaction is already aborted and only its owner can restart it.
+    Retry counts are recorded as ``<func>.conflict_retries`` /
+    ``<func>.conflict_failures`` metrics.
+    """
+
+    def decorator(func):
+        metrics.register(
+            f"{func.__name__}.conflict_retries", f"{func.__name__}.conflict_failures"
+        )
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if (
+                        not is_retryable_conflict(exc)
+                        or transaction.get_connection().in_atomic_block
+                    ):
+                        raise
+                    if attempt == attempts:
+                        metrics.incr(f"{func.__name__}.conflict_failures")
+                        raise
+                    metrics.incr(f"{func.__name__}.conflict_retries")
+                    delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+                    logger.warning(
+                        "%s hit a transaction conflict (attempt %s/%s), retrying in %.3fs",
+                        func.__name__,
+                        attempt,
+                        attempts,
+                        delay,
+                    )
+                    time.sleep(delay)
+
+        return wrapper
+
+    return decorator
+
+
+def transfer_event(sender: Wallet, receiver: Wallet, amount: int):
+    return outbox.new_event(
+        outbox.TRANSFERRED,
+        sender_wallet_id=sender.id,
+        receiver_wallet_id=receiver.id,
+        amount=amount,
+        currency=sender.currency,
+    )
+
+
+def hold_event(topic: str, hold: WalletHold, currency: str):
+    return outbox.new_event(
+        topic,
+        hold_id=hold.id,
+        wallet_id=hold.wallet_id,
+        amount=hold.amount,
+        currency=currency,
+        reference=hold.reference,
+    )
+
 
 class WalletService:
     @staticmethod
-    def charge_wallet(wallet: Wallet, amount: Decimal) -> Wallet:
+    def credit_balance(wallet_id, amount: int) -> bool:
+        """
+        Atomically add ``amount`` to a wallet with a single UPDATE.
+        The increment happens in the database, so concurrent credits never
+        lose updates and no SELECT ... FOR UPDATE is needed.
+        Returns False if the wallet does not exist. Like every balance
+        change, it bumps ``Wallet.version`` and writes the wallet through to
+        the balance cache once the transaction commits.
+        """
+        updated = Wallet.objects.filter(id=wallet_id).update(
+            balance=F("balance") + amount,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            balance_cache.refresh_on_commit(wallet_id)
+        return updated == 1
+
+    @staticmethod
+    def debit_balance(wallet_id, amount: int) -> bool:
+        """
+        Atomically subtract ``amount`` from a wallet with a single conditional
+        UPDATE (``... WHERE balance - held >= amount``), so active holds stay
+        covered. The row lock is only held by that one statement; zero
+        affected rows means insufficient funds.
+        """
+        updated = Wallet.objects.filter(id=wallet_id, balance__gte=F("held") + amount).update(
+            balance=F("balance") - amount,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            balance_cache.refresh_on_commit(wallet_id)
+        return updated == 1
+
+    @staticmethod
+    def charge_wallet(wallet: Wallet, amount: int) -> Wallet:
         if amount <= 0:
             raise ValueError("The charge amount must be positive.")
 
-        wallet.balance += amount
-        wallet.save(update_fields=["balance", "updated_at"])
+        with transaction.atomic():
+            if not WalletService.credit_balance(wallet.id, amount):
+                raise ValueError("Wallet not found.")
 
-        WalletTransaction.objects.create(
-            wallet=wallet,
-            transaction_type="CHARGE",
-            amount=amount,
-            description="Wallet charged",
-        )
+            WalletTransaction.objects.create(
+                wallet=wallet,
+                transaction_type="CHARGE",
+                amount=amount,
+                description="Wallet charged",
+            )
+            journal.charge(wallet.id, amount).save()
+            outbox.emit(
+                outbox.new_event(
+                    outbox.CHARGED, wallet_id=wallet.id, amount=amount, currency=wallet.currency
+                )
+            )
+            wallet.refresh_from_db(fields=["balance", "updated_at"])
 
         return wallet
 
     @staticmethod
-    def transfer_funds(sender_wallet: Wallet, receiver_wallet_id: str, amount: Decimal):
+    def credit_verified_payment(authority: str) -> bool:
+        """
+        Credit the wallet of a payment the gateway has verified, once. The
+        ``Payment`` row is locked by its unique ``authority`` and moved from
+        pending to paid in the transaction that credits its stored amount,
+        so a second call finds it paid and changes nothing. Returns whether
+        this call credited the wallet.
+        """
+        with transaction.atomic():
+            try:
+                payment = (
+                    Payment.objects.select_for_update(of=("self",))
+                    .select_related("wallet")
+                    .get(authority=authority)
+                )
+            except Payment.DoesNotExist:
+                raise ValueError("Payment not found.")
+            if payment.status != Payment.PENDING:
+                return False
+
+            WalletService.credit_balance(payment.wallet_id, payment.amount)
+            WalletTransaction.objects.create(
+                wallet_id=payment.wallet_id,
+                transaction_type="CHARGE",
+                amount=payment.amount,
+                description=f"Payment verified with authority {authority}",
+            )
+            journal.charge(payment.wallet_id, payment.amount).save()
+            outbox.emit(
+                outbox.new_event(
+                    outbox.CHARGED,
+                    wallet_id=payment.wallet_id,
+                    amount=payment.amount,
+                    currency=payment.wallet.currency,
+                    authority=authority,
+                )
+            )
+            payment.status = Payment.PAID
+            payment.updated_at = timezone.now()
+            payment.save(update_fields=["status", "updated_at"])
+        return True
+
+    @staticmethod
+    @retry_on_conflict()
+    def transfer_funds(sender_wallet: Wallet, receiver_wallet_id: str, amount: int):
+        receiver_wallet_id = Wallet._meta.pk.to_python(receiver_wallet_id)
         if sender_wallet.id == receiver_wallet_id:
             raise ValueError("Cannot transfer funds to your own wallet.")
         if amount <= 0:
             raise ValueError("The transfer amount must be positive.")
 
         with transaction.atomic():
-            sender = Wallet.objects.select_for_update().get(id=sender_wallet.id)
+            # Lock both rows in one statement, always in primary-key order, so
+            # two opposite transfers can never wait on each other.
+            wallets = {
+                wallet.id: wallet
+                for wallet in Wallet.objects.select_for_update()
+                .filter(id__in=[sender_wallet.id, receiver_wallet_id])
+                .order_by("id")
+            }
+            sender = wallets[sender_wallet.id]
+            receiver = wallets.get(receiver_wallet_id)
 
-            if sender.balance < amount:
+            if not WalletService.debit_balance(sender.id, amount):
                 raise ValueError("Insufficient funds.")
-
-            try:
-                receiver = Wallet.objects.select_for_update().get(id=receiver_wallet_id)
-            except Wallet.DoesNotExist:
+            if receiver is None:
                 raise ValueError("Receiver's wallet not found.")
 
-            sender.balance -= amount
-            receiver.balance += amount
+            WalletService.credit_balance(receiver.id, amount)
 
-            sender.save(update_fields=["balance", "updated_at"])
-            receiver.save(update_fields=["balance", "updated_at"])
-
-            WalletTransaction.objects.create(
-                wallet=sender,
-                transaction_type="TRANSFER_OUT",
-                amount=amount,
-                description=f"Transferred to {receiver.user.username}",
-            )
-            WalletTransaction.objects.create(
-                wallet=receiver,
-                transaction_type="TRANSFER_IN",
-                amount=amount,
-                description=f"Received from {sender.user.username}",
+            WalletTransaction.objects.bulk_create(
+                [
+                    WalletTransaction(
+                        wallet=sender,
+                        transaction_type="TRANSFER_OUT",
+                        amount=amount,
+                        counterparty_wallet=receiver,
+                    ),
+                    WalletTransaction(
+                        wallet=receiver,
+                        transaction_type="TRANSFER_IN",
+                        amount=amount,
+                        counterparty_wallet=sender,
+                    ),
+                ]
             )
+            entries = journal.Journal()
+            journal.add_transfer(entries, sender.id, receiver.id, amount)
+            entries.save()
+            outbox.emit(transfer_event(sender, receiver, amount))
 
     @staticmethod
-    def settle_funds(wallet: Wallet, amount: Decimal) -> Wallet:
+    @retry_on_conflict()
+    def transfer_many(
+        sender_wallet: Wallet, transfers: list[dict], allow_partial: bool = False
+    ) -> list[dict]:
+        """
+        Execute many transfers from one wallet in a single transaction.
+        All affected wallets are locked once, in primary-key order; every
+        item is then checked in order against the locked balance, the net
+        balance changes are written with one UPDATE and every ledger row
+        with one bulk_create.
+
+        The batch is all or nothing: if any item cannot be applied, nothing
+        is written, the failing items report their error and the others
+        report ``"skipped"``. With ``allow_partial`` the items that can be
+        applied are, and only the failing ones are reported.
+        Each transfer is a dict with ``receiver_wallet_id`` and ``amount``;
+        the result list has one ``{"index", "status", ...}`` dict per item.
+        """
+        items = [
+            (Wallet._meta.pk.to_python(item["receiver_wallet_id"]), item["amount"])
+            for item in transfers
+        ]
+
+        with transaction.atomic():
+            wallets = {
+                wallet.id: wallet
+                for wallet in Wallet.objects.select_for_update()
+                .filter(id__in={sender_wallet.id, *(rid for rid, _ in items)})
+                .order_by("id")
+            }
+            sender = wallets[sender_wallet.id]
+
+            available = sender.available_balance
+            deltas = {}
+            ledger = []
+            entries = journal.Journal()
+            events = []
+            results = []
+            for index, (receiver_id, amount) in enumerate(items):
+                receiver = wallets.get(receiver_id)
+                if receiver_id == sender.id:
+                    error = "Cannot transfer funds to your own wallet."
+                elif amount <= 0:
+                    error = "The transfer amount must be positive."
+                elif receiver is None:
+                    error = "Receiver's wallet not found."
+                elif available < amount:
+                    error = "Insufficient funds."
+                else:
+                    error = None
+
+                if error:
+                    results.append({"index": index, "status": "error", "error": error})
+                    continue
+
+                available -= amount
+                deltas[sender.id] = deltas.get(sender.id, 0) - amount
+                deltas[receiver.id] = deltas.get(receiver.id, 0) + amount
+                ledger += [
+                    WalletTransaction(
+                        wallet=sender,
+                        transaction_type="TRANSFER_OUT",
+                        amount=amount,
+                        counterparty_wallet=receiver,
+                    ),
+                    WalletTransaction(
+                        wallet=receiver,
+                        transaction_type="TRANSFER_IN",
+                        amount=amount,
+                        counterparty_wallet=sender,
+                    ),
+                ]
+                journal.add_transfer(entries, sender.id, receiver.id, amount)
+                events.append(transfer_event(sender, receiver, amount))
+                results.append({"index": index, "status": "success"})
+
+            if not allow_partial and any(item["status"] == "error" for item in results):
+                for item in results:
+                    if item["status"] == "success":
+                        item["status"] = "skipped"
+                return results
+
+            if deltas:
+                net_change = Case(
+                    *[
+                        When(id=wallet_id, then=Value(delta))
+                        for wallet_id, delta in deltas.items()
+                    ],
+                    output_field=BigIntegerField(),
+                )
+                Wallet.objects.filter(id__in=deltas).update(
+                    balance=F("balance") + net_change,
+                    version=F("version") + 1,
+                    updated_at=timezone.now(),
+                )
+                WalletTransaction.objects.bulk_create(ledger)
+                entries.save()
+                outbox.emit(*events)
+                balance_cache.refresh_on_commit(*deltas)
+
+        return results
+
+    @staticmethod
+    def settle_funds(wallet: Wallet, amount: int) -> Wallet:
         if amount <= 0:
             raise ValueError("The settlement amount must be positive.")
 
         with transaction.atomic():
-            wallet_to_settle = Wallet.objects.select_for_update().get(id=wallet.id)
-
-            if wallet_to_settle.balance < amount:
+            if not WalletService.debit_balance(wallet.id, amount):
                 raise ValueError("Insufficient funds for settlement.")
 
-            wallet_to_settle.balance -= amount
-            wallet_to_settle.save(update_fields=["balance", "updated_at"])
-
             WalletTransaction.objects.create(
-                wallet=wallet_to_settle,
+                wallet=wallet,
                 transaction_type="SETTLEMENT",
                 amount=amount,
                 description="Settlement to bank",
             )
+            journal.settlement(wallet.id, amount).save()
+            outbox.emit(
+                outbox.new_event(
+                    outbox.SETTLED, wallet_id=wallet.id, amount=amount, currency=wallet.currency
+                )
+            )
+            wallet.refresh_from_db(fields=["balance", "updated_at"])
 
-        return wallet_to_settle
-
-
-
-
+        return wallet
 
+    @staticmethod
+    def hold(wallet: Wallet, amount: int, reference: str = "", ttl=None) -> WalletHold:
+        """
+        Reserve ``amount`` of a wallet's available balance before calling an
+        external system, then ``capture`` or ``release`` the hold. Each step
+        is its own short transaction, so no row lock is held while the
+        external call runs. The reservation is one conditional UPDATE of
+        ``Wallet.held``, like ``debit_balance``. A hold not ended within
+        ``ttl`` seconds (``WALLET_HOLD_TTL_SECONDS`` by default) is expired
+        by the sweeper.
+        """
+        if amount <= 0:
+            raise ValueError("The hold amount must be positive.")
+        ttl = settings.WALLET_HOLD_TTL_SECONDS if ttl is None else ttl
+        now = timezone.now()
 
-# Zarinpal settings
-ZARINPAL_MERCHANT_ID = '11111122222233333344444455555566666'
-ZP_API_REQUEST = "https://sandbox.zarinpal.com/pg/v4/payment/request.json"
-ZP_API_VERIFY = "https://sandbox.zarinpal.com/pg/v4/payment/verify.json"
-ZP_API_STARTPAY = "https://sandbox.zarinpal.com/pg/StartPay/"
-ZARINPAL_CALLBACK_URL = 'http://yourdomain.com/payment/verify/'
+        with transaction.atomic():
+            updated = Wallet.objects.filter(id=wallet.id, balance__gte=F("held") + amount).update(
+                held=F("held") + amount,
+                version=F("version") + 1,
+                updated_at=now,
+            )
+            if not updated:
+                raise ValueError("Insufficient funds.")
+            hold = WalletHold.objects.create(
+                wallet=wallet,
+                amount=amount,
+                reference=reference,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+            outbox.emit(hold_event(outbox.HOLD_PLACED, hold, wallet.currency))
+            balance_cache.refresh_on_commit(wallet.id)
+        return hold
 
+    @staticmethod
+    def _end_hold(hold_id, status: str) -> WalletHold:
+        """Lock an active, unexpired hold and mark it ``status``."""
+        now = timezone.now()
+        try:
+            hold = WalletHold.objects.select_for_update(of=("self",)).select_related(
+                "wallet"
+            ).get(id=hold_id)
+        except WalletHold.DoesNotExist:
+            raise ValueError("Hold not found.")
+        if hold.status != WalletHold.ACTIVE:
+            raise ValueError(f"The hold is already {hold.status.lower()}.")
+        if hold.expires_at <= now:
+            raise ValueError("The hold has expired.")
+        hold.status = status
+        hold.completed_at = now
+        hold.save(update_fields=["status", "completed_at"])
+        return hold
 
-class PaymentRequestView(APIView):
-    def post(self, request):
-        serializer = PaymentRequestSerializer(data=request.data)
-        if serializer.is_valid():
-            amount = serializer.validated_data['amount']
-            description = serializer.validated_data['description']
-            email = serializer.validated_data.get('email', '')
-            mobile = serializer.validated_data.get('mobile', '')
+    @staticmethod
+    def capture(hold_id) -> WalletHold:
+        """
+        Take the held funds: debit the balance and the hold together and
+        record the settlement in the ledger and the journal.
+        """
+        with transaction.atomic():
+            hold = WalletService._end_hold(hold_id, WalletHold.CAPTURED)
+            Wallet.objects.filter(id=hold.wallet_id).update(
+                balance=F("balance") - hold.amount,
+                held=F("held") - hold.amount,
+                version=F("version") + 1,
+                updated_at=hold.completed_at,
+            )
+            WalletTransaction.objects.create(
+                wallet_id=hold.wallet_id,
+                transaction_type="SETTLEMENT",
+                amount=hold.amount,
+                description="Settlement to bank",
+            )
+            journal.settlement(hold.wallet_id, hold.amount).save()
+            outbox.emit(hold_event(outbox.HOLD_CAPTURED, hold, hold.wallet.currency))
+            balance_cache.refresh_on_commit(hold.wallet_id)
+        return hold
 
-            payload = {
-                "merchant_id": ZARINPAL_MERCHANT_ID,
-                "amount": amount,
-                "callback_url": ZARINPAL_CALLBACK_URL,
-                "description": description,
-                "metadata": {"email": email, "mobile": mobile}
-            }
+    @staticmethod
+    def release(hold_id) -> WalletHold:
+        """Give the held funds back to the available balance."""
+        with transaction.atomic():
+            hold = WalletService._end_hold(hold_id, WalletHold.RELEASED)
+            Wallet.objects.filter(id=hold.wallet_id).update(
+                held=F("held") - hold.amount,
+                version=F("version") + 1,
+                updated_at=hold.completed_at,
+            )
+            outbox.emit(hold_event(outbox.HOLD_RELEASED, hold, hold.wallet.currency))
+            balance_cache.refresh_on_commit(hold.wallet_id)
+        return hold
 
-            try:
-                response = requests.post(ZP_API_REQUEST, json=payload)
-                
-                result = response.json()
-                print(result)
-                if result['data']:
-                    authority = result['data']['authority']
-                    payment = Payment.objects.create(
-                        wallet=request.wallet.id,
-                        amount=amount,
-                        description=description,
-                        email=email,
-                        mobile=mobile,
-                        authority=authority,
-                        status='pending'
-                    )
-                    payment_url = f"{ZP_API_STARTPAY}{authority}"
-                    return Response({
-                        "status": "success",
-                        "payment_url": payment_url
-                    }, status=status.HTTP_200_OK)
-                else:
-                    return Response({
-                        "status": "error",
-                        "errors": result['errors']
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            except requests.RequestException as e:
-                return Response({
-                    "status": "error",
-                    "errors": str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-class PaymentVerifyView(APIView):
-    def get(self, request):
-        authority = request.query_params.get('Authority')
-        payment_status = request.query_params.get('Status')
-
-        if not authority or not payment_status:
-            return Response({
-                "status": "error",
-                "errors": "Authority or Status parameters didnt given"
-            }, status=status.HTTP_400_BAD_REQUEST)
+    @staticmethod
+    def expire_holds(batch_size=500, max_batches=20) -> int:
+        """
+        Expire up to ``max_batches`` batches of active holds past their
+        ``expires_at``, one short transaction per batch. Holds being
+        captured or released right now are skipped (``SKIP LOCKED``).
+        Returns the number of holds expired.
+        """
+        expired = 0
+        for _ in range(max_batches):
+            count = WalletService._expire_batch(batch_size)
+            expired += count
+            if count < batch_size:
+                break
+        return expired
 
-        try:
-            payment = Payment.objects.get(authority=authority)
-        except Payment.DoesNotExist:
-            return Response({
-                "status": "error",
-                "errors": "payment not found"
-            }, status=status.HTTP_404_NOT_FOUND)
-
-        if payment_status == 'OK':
-            payload = {
-                "merchant_id": ZARINPAL_MERCHANT_ID,
-                "amount": payment.amount,
-                "authority": authority
-            }
-            try:
-                response = requests.post(ZP_API_VERIFY, json=payload)
-                result = response.json()
-
-                if result['data']['code'] == 100:
-                    payment.status = 'success'
-                    payment.save()
-                    serializer = PaymentVerifySerializer(payment)
-                    return Response({
-                        "status": "success",
-                        "data": serializer.data,
-                        "ref_id": result['data']['ref_id']
-                    }, status=status.HTTP_200_OK)
-                else:
-                    payment.status = 'failed'
-                    payment.save()
-                    return Response({
-                        "status": "error",
-                        "errors": result['errors']
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            except requests.RequestException as e:
-                payment.status = 'failed'
-                payment.save()
-                return Response({
-                    "status": "error",
-                    "errors": str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        else:
-            payment.status = 'canceled'
-            payment.save()
-            return Response({
-                "status": "error",
-                "errors": "payment canceled"},
-                status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    @staticmethod
+    @retry_on_conflict()
+    def _expire_batch(batch_size) -> int:
+        now = timezone.now()
+        with transaction.atomic():
+            holds = list(
+                WalletHold.objects.select_for_update(skip_locked=True, of=("self",))
+                .select_related("wallet")
+                .filter(status=WalletHold.ACTIVE, expires_at__lte=now)
+                .order_by("expires_at")[:batch_size]
+            )
+            if not holds:
+                return 0
+            WalletHold.objects.filter(id__in=[hold.id for hold in holds]).update(
+                status=WalletHold.EXPIRED, completed_at=now
+            )
+            released = {}
+            for hold in holds:
+                released[hold.wallet_id] = released.get(hold.wallet_id, 0) + hold.amount
+            Wallet.objects.filter(id__in=released).update(
+                held=F("held")
+                - Case(
+                    *[
+                        When(id=wallet_id, then=Value(amount))
+                        for wallet_id, amount in released.items()
+                    ],
+                    output_field=BigIntegerField(),
+                ),
+                version=F("version") + 1,
+                updated_at=now,
+            )
+            outbox.emit(
+                *(hold_event(outbox.HOLD_EXPIRED, hold, hold.wallet.currency) for hold in holds)
+            )
+            balance_cache.refresh_on_commit(*released)
+        return len(holds)
@@ -1,9 +1,9 @@
 # wallet/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from accounts.models import User
+from . import balance_cache, journal
 from .models import Wallet, WalletTransaction
-from decimal import Decimal
 
 
 @receiver(post_save, sender=User)
@@ -11,13 +11,25 @@ def create_user_wallet(sender, instance, created, **kwargs):
     if created:
         # create wallet with initial balance
         wallet = Wallet.objects.create(
-            user=instance, balance=Decimal("50000.00")  # initial free credit
+            user=instance, balance=50000  # initial free credit
         )
 
         # log welcome transaction
         WalletTransaction.objects.create(
             wallet=wallet,
             transaction_type="CHARGE",
-            amount=Decimal("50000.00"),
+            amount=50000,
             description="Welcome bonus credit",
         )
+        journal.charge(
+            wallet.id,
+            50000,
+            "Welcome bonus credit",
+            source=journal.PROMOTIONS,
+        ).save()
+
+
+@receiver(post_delete, sender=Wallet)
+def forget_cached_wallet(sender, instance, **kwargs):
+    # The cache is keyed by user id; do not let a reused id see this wallet.
+    balance_cache.forget(instance.user_id)
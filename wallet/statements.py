@@ -0,0 +1,167 @@
+# wallet/statements.py
+"""
+Monthly wallet statements: opening and closing balance, totals by
+transaction type and the month's line items.
+
+A month is closed once the daily aggregate rollup and the wallet's
+balance checkpoint (``reconcile_wallets``) have both passed its end. A
+closed month's statement is rendered once, stored as a ``WalletStatement``
+row that is never changed, and cached without expiry. Other months are
+computed on each request. Balances and totals come from the daily
+aggregates, so only the line items read the ledger, and only once per
+closed month.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.db.models import Sum
+from . import archive, partitions, rollups
+from .money import DEFAULT_CURRENCY, format_minor, to_minor
+from .models import (
+    WalletBalanceCheckpoint,
+    WalletDailyAggregate,
+    WalletStatement,
+    WalletTransaction,
+)
+from .serializers import WalletTransactionSerializer
+
+
+def _cache_key(wallet_id, month: date):
+    return f"wallet:statement:{wallet_id}:{month:%Y-%m}"
+
+
+def _net(totals) -> int:
+    return (
+        totals["charged"]
+        + totals["transferred_in"]
+        - totals["transferred_out"]
+        - totals["settled"]
+    )
+
+
+def _month_end(month: date) -> datetime:
+    return partitions.add_months(month, 1)
+
+
+def closed_before(wallet_id):
+    """Months ending at or before this instant are closed; None if none are."""
+    mark = rollups.watermark()
+    checked = (
+        WalletBalanceCheckpoint.objects.filter(wallet_id=wallet_id)
+        .values_list("as_of", flat=True)
+        .first()
+    )
+    if mark is None or checked is None:
+        return None
+    return min(mark, checked)
+
+
+def opening_balance(wallet_id, month: date) -> int:
+    """The wallet's balance at the start of ``month``, from the aggregates."""
+    sums = WalletDailyAggregate.objects.filter(wallet_id=wallet_id, day__lt=month).aggregate(
+        **{column: Sum(column) for column in rollups.TYPE_COLUMNS.values()}
+    )
+    return _net({column: value or 0 for column, value in sums.items()})
+
+
+def _lines(wallet_id, month: date, currency: str) -> list[dict]:
+    since = datetime.combine(month, time(), dt_timezone.utc)
+    until = _month_end(month)
+    rows = [
+        WalletTransaction(**dict(zip(archive.ARCHIVE_FIELDS, row)))
+        for rows in archive.wallet_months(wallet_id, since=since, until=until)
+        for row in rows
+    ]
+    rows += (
+        WalletTransaction.objects.filter(
+            wallet_id=wallet_id, created_at__gte=since, created_at__lt=until
+        )
+        .select_related("counterparty_wallet__user")
+        .order_by("created_at", "id")
+    )
+    lines = WalletTransactionSerializer(rows, many=True, context={"currency": currency})
+    return [dict(line) for line in lines.data]
+
+
+def render(wallet_id, month: date, opening: int, closed: bool, currency=DEFAULT_CURRENCY) -> dict:
+    totals = {column: 0 for column in rollups.TYPE_COLUMNS.values()}
+    count = 0
+    for day in rollups.daily_totals(wallet_id, month, _month_end(month).date() - timedelta(days=1)):
+        for column in totals:
+            totals[column] += getattr(day, column)
+        count += day.transaction_count
+    return {
+        "month": f"{month:%Y-%m}",
+        "closed": closed,
+        "opening_balance": format_minor(opening, currency),
+        "closing_balance": format_minor(opening + _net(totals), currency),
+        "totals": {
+            transaction_type: format_minor(totals[column], currency)
+            for transaction_type, column in rollups.TYPE_COLUMNS.items()
+        },
+        "transaction_count": count,
+        "lines": _lines(wallet_id, month, currency),
+    }
+
+
+def monthly_statements(
+    wallet_id, first: date, last: date, currency=DEFAULT_CURRENCY
+) -> list[dict]:
+    """
+    Statements for each month from ``first`` to ``last`` (month starts),
+    oldest first, in the wallet's ``currency``. Closed months come from the
+    cache, then from ``WalletStatement``, and are rendered and stored only
+    if missing.
+    """
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = partitions.add_months(month, 1).date()
+
+    cutoff = closed_before(wallet_id)
+    closed = [month for month in months if cutoff is not None and _month_end(month) <= cutoff]
+    documents = cache.get_many([_cache_key(wallet_id, month) for month in closed])
+    missing = [month for month in closed if _cache_key(wallet_id, month) not in documents]
+    if missing:
+        stored = {
+            _cache_key(wallet_id, statement.month): statement.document
+            for statement in WalletStatement.objects.filter(wallet_id=wallet_id, month__in=missing)
+        }
+        cache.set_many(stored, timeout=None)
+        documents.update(stored)
+
+    statements = []
+    created = []
+    previous = None
+    for month in months:
+        key = _cache_key(wallet_id, month)
+        document = documents.get(key)
+        if document is None:
+            opening = (
+                to_minor(previous["closing_balance"], currency)
+                if previous is not None
+                else opening_balance(wallet_id, month)
+            )
+            document = render(wallet_id, month, opening, month in closed, currency)
+            if month in closed:
+                created.append(
+                    WalletStatement(
+                        wallet_id=wallet_id,
+                        month=month,
+                        opening_balance=to_minor(document["opening_balance"], currency),
+                        closing_balance=to_minor(document["closing_balance"], currency),
+                        document=document,
+                    )
+                )
+                documents[key] = document
+        statements.append(document)
+        previous = document
+
+    if created:
+        # A concurrent request may have stored the same month; both rendered
+        # the same immutable data, so the first row wins.
+        WalletStatement.objects.bulk_create(created, ignore_conflicts=True)
+        cache.set_many(
+            {_cache_key(wallet_id, s.month): s.document for s in created}, timeout=None
+        )
+    return statements
@@ -0,0 +1,76 @@
+# wallet/tasks.py
+from celery import shared_task
+from celery.exceptions import Reject
+from . import async_transfers, outbox, partitions, payments, rollups
+from .services import WalletService
+
+
+@shared_task
+def roll_up_daily_aggregates(max_windows=24):
+    """
+    Fold new ledger rows into WalletDailyAggregate; scheduled by Celery beat
+    (CELERY_BEAT_SCHEDULE). ``max_windows`` bounds one run, so a large
+    backlog is worked off over several runs or by backfill_daily_aggregates.
+    """
+    return rollups.roll_up(max_windows=max_windows)
+
+
+@shared_task
+def dispatch_outbox(batch_size=500, max_batches=20):
+    """
+    Publish pending wallet events (see wallet/outbox.py); scheduled by
+    Celery beat. Runs that overlap skip each other's locked rows.
+    """
+    return outbox.dispatch(batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def execute_async_transfer(transfer_id):
+    """
+    Run one accepted transfer. Sent to the sender's transfer queue by
+    ``async_transfers.submit``; see there for how the queues are consumed
+    and how errors are retried. If even recording the outcome fails (the
+    database is gone), the message goes back to the broker, as it does
+    when the worker dies.
+    """
+    try:
+        return async_transfers.execute(transfer_id)
+    except Exception as exc:
+        raise Reject(exc, requeue=True)
+
+
+@shared_task
+def requeue_async_transfers(batch_size=500):
+    """
+    Send the task of transfers whose publish was lost (see
+    wallet/async_transfers.py); scheduled by Celery beat.
+    """
+    return async_transfers.requeue_stale(batch_size=batch_size)
+
+
+@shared_task
+def expire_wallet_holds(batch_size=500, max_batches=20):
+    """
+    Expire holds past their ``expires_at`` and return their funds to the
+    available balance; scheduled by Celery beat.
+    """
+    return WalletService.expire_holds(batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task
+def sweep_pending_payments(batch_size=100, max_batches=10):
+    """
+    Verify payments left pending and credit or fail them (see
+    wallet/payments.py); scheduled by Celery beat. Returns the sweep's
+    counts, throughput and remaining backlog.
+    """
+    return payments.sweep_pending(batch_size=batch_size, max_batches=max_batches)
+
+
+@shared_task
+def ensure_ledger_partitions():
+    """
+    Create the ledger partitions of the coming months and log an error if
+    too few exist (see wallet/partitions.py); scheduled by Celery beat.
+    """
+    return partitions.maintain()
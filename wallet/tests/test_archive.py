@@ -0,0 +1,229 @@
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import archive, partitions
+from wallet.models import ArchivedLedgerChunk, Wallet, WalletTransaction
+
+
+def add_transaction(wallet, created_at, transaction_type="CHARGE"):
+    tx = WalletTransaction.objects.create(
+        wallet=wallet, transaction_type=transaction_type, amount=1
+    )
+    WalletTransaction.objects.filter(id=tx.id).update(created_at=created_at)
+    change = 1 if transaction_type in WalletTransaction.CREDIT_TYPES else -1
+    Wallet.objects.filter(id=wallet.id).update(balance=F("balance") + change)
+    return tx
+
+
+def archive_ledger():
+    call_command("reconcile_wallets", workers=1, lag_seconds=0, stdout=StringIO())
+    call_command("backfill_daily_aggregates", stdout=StringIO())
+    call_command("archive_ledger", older_than_months=12, stdout=StringIO())
+
+
+class ArchiveTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings_override = override_settings(
+            WALLET_ARCHIVE_DIR=self.archive_dir, WALLET_ARCHIVE_CHUNK_ROWS=4
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class LedgerArchiveTests(ArchiveTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.other = User.objects.create_user(username="user2", password="password123")
+        self.wallet = self.user.wallet
+        now = timezone.now()
+        for days in range(400, 700, 25):
+            add_transaction(self.wallet, now - timedelta(days=days))
+            add_transaction(self.other.wallet, now - timedelta(days=days))
+        add_transaction(self.wallet, now - timedelta(days=500), "SETTLEMENT")
+        self.client.force_authenticate(user=self.user)
+
+    def ledger_ids(self):
+        return [
+            str(pk)
+            for pk in WalletTransaction.objects.filter(wallet=self.wallet)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        ]
+
+    def walk_history(self):
+        url = reverse("wallet:wallet_transactions") + "?page_size=5"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen += [tx["id"] for tx in response.json()["results"]]
+            url = response.json()["next"]
+        return seen
+
+    def test_old_months_move_to_indexed_files(self):
+        archive_ledger()
+
+        cutoff = partitions.add_months(partitions.month_start(timezone.now()), -12)
+        self.assertFalse(WalletTransaction.objects.filter(created_at__lt=cutoff).exists())
+        self.assertEqual(
+            sum(ArchivedLedgerChunk.objects.values_list("row_count", flat=True)), 25
+        )
+        # Two welcome bonuses are recent and stay in the database.
+        self.assertEqual(WalletTransaction.objects.count(), 2)
+        # Balances still reconcile against the checkpoints.
+        call_command("reconcile_wallets", workers=1, lag_seconds=0, stdout=StringIO())
+
+        archive_ledger()
+        self.assertEqual(
+            sum(ArchivedLedgerChunk.objects.values_list("row_count", flat=True)), 25
+        )
+
+    def test_months_without_checkpoints_are_not_archived(self):
+        with self.assertRaisesMessage(CommandError, "run reconcile_wallets first"):
+            call_command("archive_ledger", older_than_months=12, stdout=StringIO())
+
+        self.assertFalse(ArchivedLedgerChunk.objects.exists())
+
+    def test_history_continues_into_the_archive(self):
+        expected = self.ledger_ids()
+        archive_ledger()
+
+        self.assertEqual(self.walk_history(), expected)
+        self.assertEqual(len(expected), 14)
+
+    def test_history_filters_apply_to_archived_rows(self):
+        archive_ledger()
+
+        end = (timezone.now() - timedelta(days=450)).date()
+        response = self.client.get(
+            reverse("wallet:wallet_transactions"), {"transaction_type": "SETTLEMENT", "end": end}
+        )
+        self.assertEqual(
+            [tx["transaction_type"] for tx in response.data["results"]], ["SETTLEMENT"]
+        )
+
+    def test_export_includes_archived_rows(self):
+        archive_ledger()
+
+        response = self.client.get(reverse("wallet:wallet_transactions_export"))
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 14)
+        self.assertEqual(rows[-1]["description"], "Welcome bonus credit")
+        self.assertEqual(rows, sorted(rows, key=lambda row: row["created_at"]))
+
+        start = (timezone.now() - timedelta(days=510)).date()
+        end = (timezone.now() - timedelta(days=490)).date()
+        response = self.client.get(
+            reverse("wallet:wallet_transactions_export"),
+            {"start": start, "end": end, "transaction_type": "SETTLEMENT"},
+        )
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row["transaction_type"] for row in rows], ["SETTLEMENT"])
+
+    def test_month_changed_while_archiving_is_rolled_back(self):
+        month = partitions.month_start(timezone.now() - timedelta(days=400))
+        before = WalletTransaction.objects.count()
+        close = archive._ShardFile.close
+
+        def close_after_late_write(shard_file):
+            add_transaction(self.wallet, month + timedelta(hours=1))
+            close(shard_file)
+
+        with mock.patch.object(archive._ShardFile, "close", close_after_late_write):
+            with self.assertRaises(RuntimeError):
+                archive.archive_month(month)
+
+        self.assertFalse(ArchivedLedgerChunk.objects.exists())
+        self.assertGreater(WalletTransaction.objects.count(), before)
+
+
+class LegacyChunkTests(ArchiveTestMixin, APITestCase):
+    def test_decimal_amounts_use_the_wallet_currency(self):
+        user = User.objects.create_user(username="user1", password="password123")
+        other = User.objects.create_user(username="user2", password="password123")
+        Wallet.objects.filter(id=user.wallet.id).update(currency="USD")
+        created_at = datetime(2024, 1, 10, tzinfo=dt_timezone.utc)
+        # A chunk written before amounts became minor units; rows of an
+        # IRR wallet share it.
+        rows = [
+            (user.wallet.id, "12.50"),
+            (user.wallet.id, "12.00"),
+            (other.wallet.id, "1000.00"),
+        ]
+        columns = {
+            "id": [uuid.uuid4().hex for _ in rows],
+            "wallet_id": [wallet_id.hex for wallet_id, _ in rows],
+            "transaction_type": ["CHARGE"] * len(rows),
+            "amount": [amount for _, amount in rows],
+            "description": [""] * len(rows),
+            "created_at": [(created_at + timedelta(hours=i)).isoformat() for i in range(3)],
+        }
+        data = gzip.compress(json.dumps(columns).encode())
+        path = Path(self.archive_dir) / "2024-01" / "legacy.json.gz"
+        path.parent.mkdir()
+        path.write_bytes(data)
+        for wallet_id in (user.wallet.id, other.wallet.id):
+            ArchivedLedgerChunk.objects.create(
+                month=created_at.date().replace(day=1),
+                shard=archive.shard_of(wallet_id),
+                path="2024-01/legacy.json.gz",
+                offset=0,
+                length=len(data),
+                row_count=len(rows),
+                first_wallet_id=wallet_id,
+                last_wallet_id=wallet_id,
+                min_created_at=created_at,
+                max_created_at=created_at + timedelta(hours=2),
+            )
+
+        self.assertEqual([tx.amount for tx in archive.history(user.wallet.id)], [1200, 1250])
+        self.assertEqual([tx.amount for tx in archive.history(other.wallet.id)], [1000])
+
+        self.client.force_authenticate(user=User.objects.get(id=user.id))
+        response = self.client.get(reverse("wallet:wallet_transactions_export"))
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row["amount"] for row in rows[:2]], ["12.50", "12.00"])
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Ledger partitioning needs PostgreSQL."
+)
+class PartitionArchiveTests(ArchiveTestMixin, TransactionTestCase):
+    def tearDown(self):
+        # Recreate the dropped partition for the tests that follow.
+        with connection.cursor() as cursor:
+            partitions.ensure_partitions(cursor, timezone.now(), 3)
+
+    def test_month_with_its_own_partition_is_dropped(self):
+        user = User.objects.create_user(username="user1", password="password123")
+        month = partitions.add_months(partitions.month_start(timezone.now()), 1)
+        add_transaction(user.wallet, month + timedelta(days=2))
+
+        stats = archive.archive_month(month)
+
+        self.assertEqual(stats["rows"], 1)
+        with connection.cursor() as cursor:
+            names = [p.name for p in partitions.list_partitions(cursor)]
+        self.assertNotIn(partitions.partition_name(month), names)
+        self.assertEqual(len(archive.history(user.wallet.id, limit=5)), 1)
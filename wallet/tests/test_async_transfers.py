@@ -0,0 +1,146 @@
+from datetime import timedelta
+from unittest import mock
+from celery.exceptions import Reject
+from django.db import OperationalError
+from django.test import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import async_transfers
+from wallet.models import AsyncTransfer, Wallet
+from wallet.services import WalletService
+from wallet.tasks import execute_async_transfer, requeue_async_transfers
+
+
+class AsyncTransferTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username="user1", password="password123")
+        self.receiver = User.objects.create_user(username="user2", password="password123")
+        self.url = reverse("wallet:wallet_transfer_async")
+        self.client.force_authenticate(user=self.sender)
+
+    def submit(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url,
+                {"receiver_wallet_id": str(self.receiver.wallet.id), "amount": amount},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], AsyncTransfer.PENDING)
+        return response.data["id"]
+
+    def status_of(self, transfer_id):
+        url = reverse("wallet:wallet_transfer_async_status", args=[transfer_id])
+        return self.client.get(url)
+
+    def test_transfer_is_accepted_then_executed(self):
+        transfer_id = self.submit("1000")
+
+        response = self.status_of(transfer_id)
+        self.assertEqual(response.data["status"], AsyncTransfer.SUCCEEDED)
+        self.assertEqual(response.data["amount"], "1000")
+        self.assertEqual(Wallet.objects.get(id=self.receiver.wallet.id).balance, 51000)
+
+        # A redelivered task does not apply the transfer again.
+        self.assertEqual(async_transfers.execute(transfer_id), AsyncTransfer.SUCCEEDED)
+        self.assertEqual(Wallet.objects.get(id=self.sender.wallet.id).balance, 49000)
+
+    def test_failure_is_reported_by_status(self):
+        transfer_id = self.submit("60000")
+
+        response = self.status_of(transfer_id)
+        self.assertEqual(response.data["status"], AsyncTransfer.FAILED)
+        self.assertEqual(response.data["error"], "Insufficient funds.")
+
+        self.client.force_authenticate(user=self.receiver)
+        self.assertEqual(self.status_of(transfer_id).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(WALLET_TRANSFER_QUEUES=4)
+    def test_a_sender_always_uses_the_same_queue(self):
+        with mock.patch("wallet.tasks.execute_async_transfer.apply_async") as apply_async:
+            for _ in range(3):
+                self.submit("1")
+        queues = {call.kwargs["queue"] for call in apply_async.call_args_list}
+        self.assertEqual(queues, {async_transfers.queue_name(self.sender.wallet.id)})
+        self.assertRegex(queues.pop(), r"^wallet\.transfers\.[0-3]$")
+        self.assertEqual(AsyncTransfer.objects.filter(status=AsyncTransfer.PENDING).count(), 3)
+
+    def test_lost_publish_is_sent_again(self):
+        with mock.patch(
+            "wallet.tasks.execute_async_transfer.apply_async", side_effect=ConnectionError
+        ):
+            transfer_id = self.submit("1000")
+        self.assertIsNone(AsyncTransfer.objects.get(id=transfer_id).queued_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(requeue_async_transfers.delay().get(), 0)
+
+        AsyncTransfer.objects.filter(id=transfer_id).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(requeue_async_transfers.delay().get(), 1)
+
+        self.assertEqual(self.status_of(transfer_id).data["status"], AsyncTransfer.SUCCEEDED)
+        self.assertEqual(Wallet.objects.get(id=self.receiver.wallet.id).balance, 51000)
+
+    def test_handed_over_task_is_not_sent_again(self):
+        with mock.patch("wallet.tasks.execute_async_transfer.apply_async") as apply_async:
+            transfer_id = self.submit("1000")
+            AsyncTransfer.objects.filter(id=transfer_id).update(
+                created_at=timezone.now() - timedelta(hours=1)
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(requeue_async_transfers.delay().get(), 0)
+        self.assertEqual(apply_async.call_count, 1)
+
+    @mock.patch("wallet.async_transfers.time.sleep")
+    def test_retried_transfer_keeps_its_place(self, mock_sleep):
+        with mock.patch("wallet.tasks.execute_async_transfer.apply_async"):
+            first = self.submit("1000")
+            second = self.submit("2000")
+
+        transfer_funds = WalletService.transfer_funds
+        calls = []
+
+        def flaky(sender, receiver_id, amount):
+            calls.append(amount)
+            if len(calls) == 1:
+                raise OperationalError("server closed the connection")
+            return transfer_funds(sender, receiver_id, amount)
+
+        # The later transfer's task arrives first, e.g. because the earlier
+        # one's was redelivered behind it; the earlier one still runs first
+        # and its retry happens in place.
+        with mock.patch("wallet.async_transfers.WalletService.transfer_funds", flaky):
+            self.assertEqual(execute_async_transfer.delay(second).get(), AsyncTransfer.SUCCEEDED)
+            self.assertEqual(execute_async_transfer.delay(first).get(), AsyncTransfer.SUCCEEDED)
+
+        self.assertEqual(calls, [1000, 1000, 2000])
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(Wallet.objects.get(id=self.sender.wallet.id).balance, 47000)
+
+    @mock.patch("wallet.async_transfers.time.sleep")
+    def test_unexpected_errors_are_retried_then_recorded(self, mock_sleep):
+        transfer_funds = mock.Mock(side_effect=OperationalError("server closed the connection"))
+        with mock.patch("wallet.tasks.execute_async_transfer.apply_async"):
+            transfer_id = self.submit("1000")
+        with mock.patch("wallet.async_transfers.WalletService.transfer_funds", transfer_funds):
+            self.assertEqual(
+                execute_async_transfer.delay(transfer_id).get(), AsyncTransfer.FAILED
+            )
+
+        self.assertEqual(transfer_funds.call_count, async_transfers.RETRY_ATTEMPTS)
+        response = self.status_of(transfer_id)
+        self.assertEqual(response.data["status"], AsyncTransfer.FAILED)
+        self.assertIn("server closed the connection", response.data["error"])
+        self.assertEqual(Wallet.objects.get(id=self.sender.wallet.id).balance, 50000)
+
+    def test_task_goes_back_to_the_broker_if_nothing_can_be_recorded(self):
+        with mock.patch(
+            "wallet.async_transfers.execute", side_effect=OperationalError("database is gone")
+        ):
+            with self.assertRaises(Reject):
+                execute_async_transfer("00000000-0000-0000-0000-000000000000")
@@ -0,0 +1,122 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+import httpx
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+from wallet.gateways import AsyncZarinpalClient
+from wallet.models import Payment, Wallet, WalletTransaction
+
+
+class AsyncPaymentViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user1", password="password123")
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.gateway = MagicMock()
+        self.gateway.request_payment = AsyncMock(
+            return_value={"data": {"code": 100, "authority": "A0001"}, "errors": []}
+        )
+        self.gateway.verify_payment = AsyncMock(
+            return_value={"data": {"code": 100, "ref_id": 1}, "errors": []}
+        )
+        self.gateway.start_pay_url.return_value = "https://gateway.test/pg/StartPay/A0001"
+        patcher = patch(
+            "wallet.async_views.get_async_zarinpal_client", return_value=self.gateway
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_requires_token(self):
+        response = await self.async_client.post(
+            reverse("wallet:payment_request_async"), {}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_payment_request(self):
+        response = await self.async_client.post(
+            reverse("wallet:payment_request_async"),
+            {
+                "amount": 10000,
+                "description": "Charge",
+                "email": "user1@example.com",
+                "mobile": "09120000000",
+            },
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["authority"], "A0001")
+        payment = await Payment.objects.aget(authority="A0001")
+        self.assertEqual(payment.status, Payment.PENDING)
+
+    async def add_payment(self, user=None, authority="A0001"):
+        user = user or self.user
+        return await Payment.objects.acreate(
+            wallet=await Wallet.objects.aget(user=user),
+            amount=10000,
+            status=Payment.PENDING,
+            authority=authority,
+        )
+
+    async def verify(self, authority="A0001", **headers):
+        return await self.async_client.post(
+            reverse("wallet:payment_verify_async"),
+            {"authority": authority},
+            content_type="application/json",
+            headers={**self.headers, **headers},
+        )
+
+    async def test_payment_verify_credits_once(self):
+        await self.add_payment()
+        for _ in range(2):
+            response = await self.verify(**{"Idempotency-Key": "verify-1"})
+            self.assertEqual(response.status_code, 200)
+
+        # The repeat finds the payment paid and never calls the gateway.
+        self.gateway.verify_payment.assert_awaited_once_with(10000, "A0001")
+        self.assertEqual(
+            await WalletTransaction.objects.filter(
+                description="Payment verified with authority A0001"
+            ).acount(),
+            1,
+        )
+        payment = await Payment.objects.aget(authority="A0001")
+        self.assertEqual(payment.status, Payment.PAID)
+
+    async def test_non_json_gateway_reply_is_reported(self):
+        await self.add_payment()
+        gateway = AsyncZarinpalClient(verify_retries=0)
+        gateway.session = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(502, text="<html>Bad Gateway</html>")
+            )
+        )
+        with patch("wallet.async_views.get_async_zarinpal_client", return_value=gateway):
+            response = await self.verify()
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("without JSON", response.json()["errors"])
+        payment = await Payment.objects.aget(authority="A0001")
+        self.assertEqual(payment.status, Payment.PENDING)
+
+    async def test_payment_of_another_user_is_not_found(self):
+        other = await User.objects.acreate_user(username="user2", password="password123")
+        await self.add_payment(user=other)
+
+        response = await self.verify()
+
+        self.assertEqual(response.status_code, 404)
+        self.gateway.verify_payment.assert_not_awaited()
+
+    async def test_invalid_payload(self):
+        response = await self.async_client.post(
+            reverse("wallet:payment_verify_async"),
+            {},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,168 @@
+import random
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import balance_cache, metrics
+from wallet.models import Wallet
+from wallet.services import WalletService
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class WalletBalanceCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username="user1", password="password123")
+        self.user2 = User.objects.create_user(username="user2", password="password123")
+        self.wallet1 = self.user1.wallet
+        self.wallet2 = self.user2.wallet
+        self.client.force_authenticate(user=self.user1)
+        self.url = reverse("wallet:wallet_detail")
+
+    def test_repeated_polls_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["balance"], "50000")
+        self.assertEqual(response.data["user"], "user1")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["balance"], "50000")
+        self.assertEqual(response.data["id"], str(self.wallet1.id))
+
+        stats = metrics.snapshot()
+        self.assertEqual(stats["wallet_cache.misses"], 1)
+        self.assertEqual(stats["wallet_cache.hits"], 1)
+
+    def test_mutations_write_through_after_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.transfer_funds(self.wallet1, str(self.wallet2.id), 500)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["balance"], "49500")
+
+        self.client.force_authenticate(user=self.user2)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["balance"], "50500")
+
+    def test_rolled_back_change_never_reaches_cache(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    WalletService.charge_wallet(self.wallet1, 1000)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["balance"], "50000")
+
+    def test_older_snapshot_cannot_overwrite_newer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.charge_wallet(self.wallet1, 1000)
+        stale = Wallet.objects.select_related("user").get(id=self.wallet1.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.charge_wallet(self.wallet1, 1000)
+
+        self.assertFalse(balance_cache._store(stale, {"balance": "51000"}))
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["balance"], "52000")
+
+    def test_deleted_wallet_is_forgotten(self):
+        self.client.get(self.url)
+        self.wallet1.delete()
+        self.assertIsNone(balance_cache._load(self.user1.pk))
+
+
+@unittest.skipUnless(fakeredis is not None, "fakeredis is not installed.")
+class RedisCompareAndSetTests(APITestCase):
+    """
+    The same guarantees through the Lua compare-and-set used with Redis.
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(balance_cache, "_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+
+    def cached(self):
+        return balance_cache._load(self.user.pk)
+
+    def test_older_version_does_not_overwrite_newer(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.charge_wallet(self.wallet, 1000)
+        stale = Wallet.objects.get(id=self.wallet.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.charge_wallet(self.wallet, 1000)
+
+        self.assertFalse(balance_cache._store(stale, {"balance": "51000"}))
+        self.assertEqual(self.cached()["balance"], "52000")
+        key = cache.make_key(balance_cache._cache_key(self.user.pk))
+        self.assertGreater(self.redis.ttl(key), 0)
+
+    def test_refresh_racing_with_a_write_keeps_the_write(self):
+        balance_cache.refresh([self.wallet.id])
+        store = balance_cache._store
+        raced = []
+
+        def store_after_a_write(wallet, data):
+            # The refresh has read its snapshot; a write commits and caches
+            # its newer version before the snapshot is stored.
+            if not raced:
+                raced.append(wallet.version)
+                with self.captureOnCommitCallbacks(execute=True):
+                    WalletService.charge_wallet(self.wallet, 1000)
+            return store(wallet, data)
+
+        with mock.patch.object(balance_cache, "_store", side_effect=store_after_a_write):
+            balance_cache.refresh([self.wallet.id])
+
+        self.assertEqual(self.cached()["balance"], "51000")
+
+    def test_concurrent_stores_leave_the_newest(self):
+        versions = list(range(1, 21))
+        random.shuffle(versions)
+        wallets = [
+            SimpleNamespace(id=self.wallet.id, user_id=self.user.pk, version=version)
+            for version in versions
+        ]
+        threads = [
+            threading.Thread(
+                target=balance_cache._store, args=(wallet, {"version": wallet.version})
+            )
+            for wallet in wallets
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.cached(), {"version": 20})
+
+    def test_other_wallet_of_a_reused_user_id_wins(self):
+        balance_cache._store(
+            SimpleNamespace(id="old-wallet", user_id=self.user.pk, version=99), {}
+        )
+
+        self.assertTrue(balance_cache._store(self.wallet, {"balance": "50000"}))
+        self.assertEqual(self.cached(), {"balance": "50000"})
@@ -0,0 +1,84 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.models import WalletTransaction
+
+
+class BatchTransferTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username="payroll", password="password123")
+        self.receivers = [
+            User.objects.create_user(username=f"employee{i}", password="password123")
+            for i in range(3)
+        ]
+        self.url = reverse("wallet:wallet_transfer_batch")
+        self.client.force_authenticate(user=self.sender)
+
+    def invalid_batch(self):
+        transfers = [
+            {"receiver_wallet_id": str(user.wallet.id), "amount": "10000.00"}
+            for user in self.receivers
+        ]
+        transfers += [
+            # Only 20,000 is left at this point.
+            {"receiver_wallet_id": str(self.receivers[0].wallet.id), "amount": "30000.00"},
+            {"receiver_wallet_id": "00000000-0000-0000-0000-000000000000", "amount": "1.00"},
+            {"receiver_wallet_id": str(self.sender.wallet.id), "amount": "1.00"},
+            {"receiver_wallet_id": str(self.receivers[0].wallet.id), "amount": "5000.00"},
+        ]
+        return transfers
+
+    def test_batch_with_a_failing_item_is_rejected(self):
+        response = self.client.post(self.url, {"transfers": self.invalid_batch()}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((response.data["succeeded"], response.data["failed"]), (0, 3))
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["skipped"] * 3 + ["error"] * 3 + ["skipped"],
+        )
+        self.assertEqual(response.data["results"][3]["error"], "Insufficient funds.")
+        self.sender.wallet.refresh_from_db()
+        self.assertEqual(self.sender.wallet.balance, 50000)
+        self.assertFalse(
+            WalletTransaction.objects.filter(transaction_type="TRANSFER_OUT").exists()
+        )
+
+    def test_partial_batch_applies_valid_items_and_reports_failures(self):
+        response = self.client.post(
+            self.url, {"transfers": self.invalid_batch(), "allow_partial": True}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["succeeded"], 4)
+        self.assertEqual(response.data["failed"], 3)
+        self.assertEqual(
+            [item["status"] for item in response.data["results"]],
+            ["success"] * 3 + ["error"] * 3 + ["success"],
+        )
+        self.assertEqual(response.data["results"][3]["error"], "Insufficient funds.")
+        self.assertEqual(
+            response.data["results"][4]["error"], "Receiver's wallet not found."
+        )
+
+        self.sender.wallet.refresh_from_db()
+        self.assertEqual(self.sender.wallet.balance, 15000)
+        balances = []
+        for user in self.receivers:
+            user.wallet.refresh_from_db()
+            balances.append(user.wallet.balance)
+        self.assertEqual(
+            balances,
+            [65000, 60000, 60000],
+        )
+        self.assertEqual(
+            WalletTransaction.objects.filter(
+                wallet=self.sender.wallet, transaction_type="TRANSFER_OUT"
+            ).count(),
+            4,
+        )
+
+    def test_empty_batch_is_rejected(self):
+        response = self.client.post(self.url, {"transfers": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,93 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from accounts.models import User
+from wallet.models import Wallet, WalletTransaction
+from wallet.services import WalletService
+
+
+def run_concurrently(func, count, workers=32):
+    """
+    Call ``func(i)`` ``count`` times from a thread pool.
+    Each worker thread opens its own DB connection, which is closed afterwards.
+    """
+
+    def call(i):
+        try:
+            return func(i)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(call, range(count)))
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Row-level concurrency needs PostgreSQL."
+)
+class ConcurrentChargeTests(TransactionTestCase):
+    """
+    Fire many parallel charges at a single wallet and make sure no update is lost.
+    """
+
+    CHARGES = 300
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+
+    def test_parallel_charges_do_not_lose_updates(self):
+        def charge(_):
+            wallet = Wallet.objects.get(id=self.wallet.id)
+            WalletService.charge_wallet(wallet, 1)
+
+        run_concurrently(charge, self.CHARGES)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(
+            self.wallet.balance, 50000 + self.CHARGES * 1
+        )
+        self.assertEqual(
+            WalletTransaction.objects.filter(
+                wallet=self.wallet, description="Wallet charged"
+            ).count(),
+            self.CHARGES,
+        )
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Row-level concurrency needs PostgreSQL."
+)
+class ConcurrentTransferTests(TransactionTestCase):
+    """
+    Users sending money to each other at the same time must not deadlock.
+    """
+
+    TRANSFERS = 200
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(username="user1", password="password123")
+        self.user2 = User.objects.create_user(username="user2", password="password123")
+
+    def test_opposite_transfers_do_not_deadlock(self):
+        wallets = [self.user1.wallet, self.user2.wallet]
+
+        def transfer(i):
+            sender = Wallet.objects.select_related("user").get(id=wallets[i % 2].id)
+            WalletService.transfer_funds(
+                sender, wallets[(i + 1) % 2].id, 1
+            )
+
+        run_concurrently(transfer, self.TRANSFERS)
+
+        balances = set(
+            Wallet.objects.filter(id__in=[w.id for w in wallets]).values_list(
+                "balance", flat=True
+            )
+        )
+        self.assertEqual(balances, {50000})
+        self.assertEqual(
+            WalletTransaction.objects.filter(transaction_type="TRANSFER_OUT").count(),
+            self.TRANSFERS,
+        )
@@ -0,0 +1,68 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.models import WalletTransaction
+from wallet.services import WalletService
+
+
+class CounterpartyTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username="alice", password="password123")
+        self.receiver = User.objects.create_user(username="bob", password="password123")
+        self.client.force_authenticate(user=self.sender)
+
+    def test_transfers_store_counterparty_and_render_description(self):
+        WalletService.transfer_funds(self.sender.wallet, self.receiver.wallet.id, 100)
+
+        out = WalletTransaction.objects.get(transaction_type="TRANSFER_OUT")
+        self.assertEqual(out.counterparty_wallet_id, self.receiver.wallet.id)
+        self.assertIsNone(out.description)
+
+        response = self.client.get(reverse("wallet:wallet_transactions"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        line = response.data["results"][0]
+        self.assertEqual(line["description"], "Transferred to bob")
+        self.assertEqual(line["counterparty_wallet"], self.receiver.wallet.id)
+
+    def test_history_query_count_does_not_grow_with_transfers(self):
+        url = reverse("wallet:wallet_transactions")
+        WalletService.transfer_funds(self.sender.wallet, self.receiver.wallet.id, 1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for _ in range(5):
+            WalletService.transfer_funds(self.sender.wallet, self.receiver.wallet.id, 1)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(few))
+
+    def test_backfill_links_old_descriptions(self):
+        wallet = self.sender.wallet
+        WalletTransaction.objects.bulk_create(
+            [
+                WalletTransaction(
+                    wallet=wallet, transaction_type="TRANSFER_OUT", amount=1,
+                    description="Transferred to bob",
+                ),
+                WalletTransaction(
+                    wallet=wallet, transaction_type="TRANSFER_IN", amount=1,
+                    description="Received from someone-deleted",
+                ),
+            ]
+        )
+
+        out = StringIO()
+        call_command("backfill_transfer_counterparties", chunk_size=1, stdout=out)
+        self.assertIn("Linked 1 transfers; 1 left", out.getvalue())
+
+        linked = WalletTransaction.objects.get(transaction_type="TRANSFER_OUT")
+        self.assertEqual(linked.counterparty_wallet_id, self.receiver.wallet.id)
+        self.assertIsNone(linked.description)
+        self.assertEqual(linked.display_description, "Transferred to bob")
+        kept = WalletTransaction.objects.get(transaction_type="TRANSFER_IN")
+        self.assertIsNone(kept.counterparty_wallet_id)
+        self.assertEqual(kept.display_description, "Received from someone-deleted")
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.models import WalletTransaction
+from wallet.services import WalletService
+
+
+class TransactionExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.other = User.objects.create_user(username="user2", password="password123")
+        self.wallet = self.user.wallet
+        WalletService.charge_wallet(self.wallet, 100)
+        WalletService.settle_funds(self.wallet, 40)
+        self.url = reverse("wallet:wallet_transactions_export")
+        self.client.force_authenticate(user=self.user)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_streams_full_history(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+
+        self.assertEqual(
+            [row["transaction_type"] for row in rows],
+            ["CHARGE", "CHARGE", "SETTLEMENT"],
+        )
+        self.assertEqual(rows[2]["amount"], "40")
+
+    def test_ndjson_export_with_type_filter(self):
+        response = self.client.get(
+            self.url, {"export_format": "ndjson", "transaction_type": "SETTLEMENT"}
+        )
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]["transaction_type"], "SETTLEMENT")
+        self.assertEqual(lines[0]["amount"], "40")
+
+    def test_date_range_filter(self):
+        old = WalletTransaction.objects.filter(wallet=self.wallet).first()
+        WalletTransaction.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(
+            self.url, {"export_format": "ndjson", "start": today, "end": today}
+        )
+        lines = self.read(response).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {"export_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"start": "2025-02-01", "end": "2025-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
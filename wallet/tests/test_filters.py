@@ -0,0 +1,123 @@
+import itertools
+import unittest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import partitions
+from wallet.models import Wallet, WalletTransaction
+
+
+def add_transaction(wallet, created_at, transaction_type, amount):
+    tx = WalletTransaction.objects.create(
+        wallet=wallet, transaction_type=transaction_type, amount=amount
+    )
+    WalletTransaction.objects.filter(id=tx.id).update(created_at=created_at)
+    return tx
+
+
+class TransactionFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+        WalletTransaction.objects.filter(wallet=self.wallet).delete()
+        self.now = timezone.now()
+        add_transaction(self.wallet, self.now - timedelta(days=1), "CHARGE", 500)
+        add_transaction(self.wallet, self.now - timedelta(days=2), "SETTLEMENT", 200)
+        add_transaction(self.wallet, self.now - timedelta(days=3), "CHARGE", 100)
+        add_transaction(self.wallet, self.now - timedelta(days=60), "CHARGE", 300)
+        self.url = reverse("wallet:wallet_transactions")
+        self.client.force_authenticate(user=self.user)
+
+    def amounts(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["amount"] for row in response.data["results"]]
+
+    def test_filters_narrow_the_history(self):
+        self.assertEqual(self.amounts(transaction_type="CHARGE"), ["500", "100", "300"])
+        self.assertEqual(self.amounts(min_amount="200", max_amount="300"), ["200", "300"])
+        start = (self.now - timedelta(days=3)).date()
+        end = (self.now - timedelta(days=2)).date()
+        self.assertEqual(self.amounts(start=start, end=end), ["200", "100"])
+        self.assertEqual(
+            self.amounts(transaction_type="CHARGE", start=start, min_amount="150"), ["500"]
+        )
+
+    def test_invalid_filters_are_rejected(self):
+        for params in (
+            {"transaction_type": "REFUND"},
+            {"min_amount": "10.5"},
+            {"start": "2025-02-01", "end": "2025-01-01"},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "The index plans are PostgreSQL's."
+)
+class TransactionFilterPlanTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(username=f"user{i}", password="password123")
+            for i in range(8)
+        ]
+        cls.user = users[0]
+        types = itertools.cycle(["CHARGE", "CHARGE", "TRANSFER_IN", "SETTLEMENT"])
+        WalletTransaction.objects.bulk_create(
+            WalletTransaction(
+                wallet=user.wallet, transaction_type=next(types), amount=i * 37 % 100000
+            )
+            for user in users
+            for i in range(2500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {partitions.LEDGER_TABLE} "
+                "SET created_at = now() - random() * interval '60 days'"
+            )
+            cursor.execute(f"ANALYZE {partitions.LEDGER_TABLE}")
+            cursor.execute(f"ANALYZE {Wallet._meta.db_table}")
+            # Empty future partitions are scanned sequentially at no cost.
+            cursor.execute(
+                f"SELECT DISTINCT tableoid::regclass::text FROM {partitions.LEDGER_TABLE}"
+            )
+            cls.populated = [row[0] for row in cursor.fetchall()]
+
+    def test_every_filter_combination_uses_an_index(self):
+        today = timezone.now().date()
+        filters = {
+            "transaction_type": "SETTLEMENT",
+            "start": today - timedelta(days=10),
+            "end": today - timedelta(days=5),
+            "min_amount": "50000",
+            "max_amount": "51000",
+        }
+        self.client.force_authenticate(user=self.user)
+        url = reverse("wallet:wallet_transactions")
+
+        names = [("transaction_type",), ("start", "end"), ("min_amount", "max_amount")]
+        for count in range(len(names) + 1):
+            for combination in itertools.combinations(names, count):
+                params = {name: filters[name] for group in combination for name in group}
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                plans = []
+                for query in queries:
+                    if partitions.LEDGER_TABLE not in query["sql"]:
+                        continue
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN {query['sql']}")
+                        plans.append("\n".join(row[0] for row in cursor.fetchall()))
+                # A page query the planner proves empty scans nothing at all.
+                self.assertTrue(any("Index" in plan for plan in plans), params)
+                for plan in plans:
+                    for partition in self.populated:
+                        self.assertNotIn(f"Seq Scan on {partition} ", plan, params)
@@ -0,0 +1,111 @@
+from unittest.mock import MagicMock, patch
+import requests
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.gateways import ZarinpalClient
+from wallet.models import Payment
+
+
+def json_response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+@override_settings(
+    ZARINPAL_MERCHANT_ID="merchant",
+    ZARINPAL_BASE_URL="https://gateway.test/",
+    ZARINPAL_CONNECT_TIMEOUT=1,
+    ZARINPAL_READ_TIMEOUT=2,
+    ZARINPAL_VERIFY_RETRIES=2,
+)
+@patch("wallet.gateways.time.sleep")
+class ZarinpalClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = ZarinpalClient()
+        self.post = patch.object(self.client.session, "post").start()
+        self.addCleanup(patch.stopall)
+
+    def test_settings_drive_credentials_and_timeouts(self, mock_sleep):
+        self.post.return_value = json_response({"data": {"code": 100}})
+        self.client.request_payment(1000, "Charge")
+
+        url = self.post.call_args.args[0]
+        kwargs = self.post.call_args.kwargs
+        self.assertEqual(url, "https://gateway.test/pg/v4/payment/request.json")
+        self.assertEqual(kwargs["json"]["merchant_id"], "merchant")
+        self.assertEqual(kwargs["timeout"], (1, 2))
+
+    def test_verify_is_retried_on_connection_errors(self, mock_sleep):
+        self.post.side_effect = [
+            requests.ConnectionError(),
+            requests.Timeout(),
+            json_response({"data": {"code": 101}}),
+        ]
+        result = self.client.verify_payment(1000, "A1")
+
+        self.assertTrue(ZarinpalClient.is_verified(result))
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_verify_gives_up_after_retries(self, mock_sleep):
+        self.post.side_effect = requests.Timeout()
+        with self.assertRaises(requests.Timeout):
+            self.client.verify_payment(1000, "A1")
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_payment_request_is_never_retried(self, mock_sleep):
+        self.post.side_effect = requests.Timeout()
+        with self.assertRaises(requests.Timeout):
+            self.client.request_payment(1000, "Charge")
+        self.assertEqual(self.post.call_count, 1)
+
+
+class PaymentRequestViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.client.force_authenticate(user=self.user)
+
+    @patch("wallet.views.get_zarinpal_client")
+    def test_payment_request_uses_shared_client(self, mock_get_client):
+        gateway = mock_get_client.return_value
+        gateway.request_payment.return_value = {
+            "data": {"code": 100, "authority": "A0001"},
+            "errors": [],
+        }
+        gateway.start_pay_url.return_value = "https://gateway.test/pg/StartPay/A0001"
+
+        response = self.client.post(
+            reverse("wallet:payment_request"),
+            {
+                "amount": 10000,
+                "description": "Charge",
+                "email": "user1@example.com",
+                "mobile": "09120000000",
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["payment_url"], gateway.start_pay_url.return_value)
+        payment = Payment.objects.get(authority="A0001")
+        self.assertEqual(payment.status, Payment.PENDING)
+        self.assertEqual(payment.amount, 10000)
+
+    @patch("wallet.views.get_zarinpal_client")
+    def test_gateway_failure_is_reported(self, mock_get_client):
+        mock_get_client.return_value.request_payment.side_effect = requests.Timeout("slow")
+
+        response = self.client.post(
+            reverse("wallet:payment_request"),
+            {
+                "amount": 10000,
+                "description": "Charge",
+                "email": "user1@example.com",
+                "mobile": "09120000000",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
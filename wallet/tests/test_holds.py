@@ -0,0 +1,80 @@
+from datetime import timedelta
+from unittest import mock
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import outbox
+from wallet.models import OutboxEvent, Wallet, WalletHold, WalletTransaction
+from wallet.services import WalletService
+from wallet.tasks import expire_wallet_holds
+
+
+class WalletHoldTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.other = User.objects.create_user(username="user2", password="password123")
+        self.wallet = self.user.wallet
+
+    def balances(self):
+        wallet = Wallet.objects.get(id=self.wallet.id)
+        return wallet.balance, wallet.held, wallet.available_balance
+
+    def test_hold_reserves_available_balance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hold = WalletService.hold(self.wallet, 30000, reference="payout-1")
+
+        self.assertEqual(self.balances(), (50000, 30000, 20000))
+        with self.assertRaisesMessage(ValueError, "Insufficient funds."):
+            WalletService.transfer_funds(self.wallet, self.other.wallet.id, 20001)
+        with self.assertRaisesMessage(ValueError, "Insufficient funds."):
+            WalletService.hold(self.wallet, 20001)
+        with self.captureOnCommitCallbacks(execute=True):
+            WalletService.transfer_funds(self.wallet, self.other.wallet.id, 20000)
+        self.assertEqual(self.balances(), (30000, 30000, 0))
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("wallet:wallet_detail"))
+        self.assertEqual(response.data["available_balance"], "0")
+        self.assertEqual(response.data["held"], "30000")
+
+        WalletService.capture(hold.id)
+        self.assertEqual(self.balances(), (0, 0, 0))
+        self.assertTrue(
+            WalletTransaction.objects.filter(
+                wallet=self.wallet, transaction_type="SETTLEMENT", amount=30000
+            ).exists()
+        )
+        with self.assertRaisesMessage(ValueError, "The hold is already captured."):
+            WalletService.release(hold.id)
+
+    def test_release_returns_the_funds(self):
+        hold = WalletService.hold(self.wallet, 10000)
+        WalletService.release(hold.id)
+
+        self.assertEqual(self.balances(), (50000, 0, 50000))
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by("id").values_list("topic", flat=True)),
+            [outbox.HOLD_PLACED, outbox.HOLD_RELEASED],
+        )
+        with self.assertRaisesMessage(ValueError, "The hold is already released."):
+            WalletService.capture(hold.id)
+
+    def test_sweeper_expires_stale_holds(self):
+        stale = [WalletService.hold(self.wallet, 1000, ttl=60) for _ in range(3)]
+        fresh = WalletService.hold(self.wallet, 2000, ttl=3600)
+        other = WalletService.hold(self.other.wallet, 500, ttl=60)
+
+        later = timezone.now() + timedelta(minutes=5)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            with self.assertRaisesMessage(ValueError, "The hold has expired."):
+                WalletService.capture(stale[0].id)
+            self.assertEqual(expire_wallet_holds.delay(batch_size=2).get(), 4)
+
+        self.assertEqual(self.balances(), (50000, 2000, 48000))
+        self.assertEqual(Wallet.objects.get(id=self.other.wallet.id).held, 0)
+        self.assertEqual(
+            set(WalletHold.objects.filter(status=WalletHold.EXPIRED).values_list("id", flat=True)),
+            {hold.id for hold in stale} | {other.id},
+        )
+        self.assertEqual(WalletHold.objects.get(id=fresh.id).status, WalletHold.ACTIVE)
@@ -0,0 +1,118 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.models import IdempotencyKey, WalletTransaction
+
+
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username="user1", password="password123")
+        self.user2 = User.objects.create_user(username="user2", password="password123")
+        self.wallet1 = self.user1.wallet
+        self.client.force_authenticate(user=self.user1)
+        self.charge_url = reverse("wallet:wallet_charge")
+        self.transfer_url = reverse("wallet:wallet_transfer")
+
+    def charges(self):
+        return WalletTransaction.objects.filter(
+            wallet=self.wallet1, description="Wallet charged"
+        ).count()
+
+    def test_retried_charge_is_applied_once(self):
+        for _ in range(3):
+            response = self.client.post(
+                self.charge_url,
+                {"amount": "1000.00"},
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="charge-1",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.wallet1.refresh_from_db()
+        self.assertEqual(self.wallet1.balance, 51000)
+        self.assertEqual(self.charges(), 1)
+
+    def test_replay_survives_cache_loss(self):
+        payload = {"receiver_wallet_id": str(self.user2.wallet.id), "amount": "500.00"}
+        self.client.post(
+            self.transfer_url, payload, format="json", HTTP_IDEMPOTENCY_KEY="t-1"
+        )
+        cache.clear()
+
+        response = self.client.post(
+            self.transfer_url, payload, format="json", HTTP_IDEMPOTENCY_KEY="t-1"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.wallet1.refresh_from_db()
+        self.assertEqual(self.wallet1.balance, 49500)
+
+    def test_client_errors_are_replayed(self):
+        payload = {"amount": "9999999.00"}
+        settle_url = reverse("wallet:wallet_settle")
+        first = self.client.post(
+            settle_url, payload, format="json", HTTP_IDEMPOTENCY_KEY="s-1"
+        )
+        second = self.client.post(
+            settle_url, payload, format="json", HTTP_IDEMPOTENCY_KEY="s-1"
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(IdempotencyKey.objects.filter(key="s-1").count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        self.client.post(
+            self.charge_url, {"amount": "10.00"}, format="json", HTTP_IDEMPOTENCY_KEY="k"
+        )
+        response = self.client.post(
+            self.charge_url, {"amount": "20.00"}, format="json", HTTP_IDEMPOTENCY_KEY="k"
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.charges(), 1)
+
+    def test_in_flight_duplicate_is_rejected(self):
+        cache.add(f"wallet:idempotency:{self.user1.pk}:busy", "x")
+        response = self.client.post(
+            self.charge_url, {"amount": "10.00"}, format="json", HTTP_IDEMPOTENCY_KEY="busy"
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.charges(), 0)
+
+    @override_settings(WALLET_IDEMPOTENCY_LOCK_SECONDS=30)
+    def test_in_flight_marker_is_short_lived(self):
+        with mock.patch.object(cache, "add", wraps=cache.add) as add:
+            self.client.post(
+                self.charge_url, {"amount": "10.00"}, format="json", HTTP_IDEMPOTENCY_KEY="k"
+            )
+        self.assertEqual(add.call_args.args[2], 30)
+
+    def test_works_without_redis(self):
+        with mock.patch("wallet.idempotency.cache") as broken:
+            for operation in (broken.add, broken.set, broken.delete):
+                operation.side_effect = ConnectionError("redis down")
+            for _ in range(2):
+                response = self.client.post(
+                    self.charge_url,
+                    {"amount": "10.00"},
+                    format="json",
+                    HTTP_IDEMPOTENCY_KEY="no-redis",
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertEqual(self.charges(), 1)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        for _ in range(2):
+            self.client.post(self.charge_url, {"amount": "10.00"}, format="json")
+        self.assertEqual(self.charges(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,33 @@
+import time
+import uuid
+from django.test import TestCase
+from accounts.models import User
+from wallet.ids import uuid7
+from wallet.models import JournalEntry, WalletTransaction
+from wallet.services import WalletService
+
+
+class UUID7Tests(TestCase):
+    def test_layout(self):
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertTrue(before <= value.int >> 80 <= after + 1)
+
+    def test_ids_sort_in_creation_order(self):
+        ids = [uuid7() for _ in range(20000)]
+
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_new_ledger_rows_use_time_ordered_ids(self):
+        user = User.objects.create_user(username="user1", password="password123")
+        WalletService.charge_wallet(user.wallet, 10)
+
+        rows = WalletTransaction.objects.filter(wallet=user.wallet).order_by("created_at")
+        self.assertEqual([row.id.version for row in rows], [7, 7])
+        self.assertLess(rows[0].id, rows[1].id)
+        self.assertEqual({entry.id.version for entry in JournalEntry.objects.all()}, {7})
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from wallet import journal
+from wallet.models import JournalEntry, JournalPosting, Wallet
+from wallet.services import WalletService
+
+
+class JournalTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="password123").wallet
+        self.bob = User.objects.create_user(username="bob", password="password123").wallet
+        self.carol = User.objects.create_user(username="carol", password="password123").wallet
+
+    def assert_books_balance(self):
+        unbalanced = (
+            JournalPosting.objects.values("entry")
+            .annotate(total=Sum("amount"))
+            .exclude(total=0)
+        )
+        self.assertFalse(unbalanced.exists())
+        for wallet in Wallet.objects.all():
+            self.assertEqual(journal.wallet_balance(wallet.id), wallet.balance)
+
+    def test_every_operation_posts_a_balanced_entry(self):
+        WalletService.charge_wallet(self.alice, 700)
+        WalletService.transfer_funds(self.alice, str(self.bob.id), 100)
+        WalletService.transfer_many(
+            self.bob,
+            [
+                {"receiver_wallet_id": str(self.carol.id), "amount": 30},
+                {"receiver_wallet_id": str(self.alice.id), "amount": 999999},
+                {"receiver_wallet_id": str(self.alice.id), "amount": 20},
+            ],
+            allow_partial=True,
+        )
+        WalletService.settle_funds(self.carol, 10)
+
+        self.assert_books_balance()
+        # Three welcome bonuses, a charge, three transfers and a settlement.
+        self.assertEqual(JournalEntry.objects.count(), 8)
+        self.assertEqual(JournalEntry.objects.filter(kind="TRANSFER").count(), 3)
+
+    def test_system_accounts_hold_the_float_and_payouts(self):
+        WalletService.charge_wallet(self.alice, 700)
+        WalletService.charge_wallet(self.bob, 300)
+        WalletService.settle_funds(self.bob, 120)
+
+        self.assertEqual(journal.system_balance(journal.GATEWAY_FLOAT), 1000)
+        self.assertEqual(journal.system_balance(journal.SETTLEMENT), -120)
+        self.assertEqual(journal.system_balance(journal.PROMOTIONS), 150000)
+
+    def test_transfers_between_two_wallets(self):
+        WalletService.transfer_funds(self.alice, str(self.bob.id), 100)
+        WalletService.transfer_funds(self.bob, str(self.alice.id), 40)
+        WalletService.transfer_funds(self.alice, str(self.carol.id), 5)
+
+        postings = list(journal.transfers_between(self.alice.id, self.bob.id))
+
+        self.assertEqual(len(postings), 4)
+        self.assertEqual(len({p.entry_id for p in postings}), 2)
+        self.assertEqual({p.entry.kind for p in postings}, {"TRANSFER"})
+        # Alice sent 100 and got 40 back: debits of 100, credits of 40.
+        self.assertEqual(
+            sorted(p.amount for p in postings if p.wallet_id == self.alice.id),
+            [-40, 100],
+        )
+
+    def test_unbalanced_entries_are_rejected(self):
+        with self.assertRaises(ValueError):
+            journal.Journal().add("CHARGE", "", [(self.alice.id, -1)])
+
+    def test_entries_keep_the_time_they_are_given(self):
+        earlier = timezone.now() - timedelta(days=30)
+        entries = journal.Journal()
+        entry = journal.add_opening(entries, self.alice.id, 5, earlier)
+        entries.save()
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.created_at, earlier)
+        self.assertEqual({p.created_at for p in entry.postings.all()}, {earlier})
+
+    def test_backfill_opens_wallets_older_than_the_journal(self):
+        # Alice's wallet predates the journal: it holds 80000 that no posting
+        # accounts for, and has only been charged since.
+        JournalEntry.objects.filter(postings__wallet=self.alice).delete()
+        Wallet.objects.filter(id=self.alice.id).update(balance=80000)
+        self.alice.refresh_from_db()
+        WalletService.charge_wallet(self.alice, 700)
+
+        out = StringIO()
+        call_command("backfill_journal_openings", chunk_size=2, stdout=out)
+
+        self.assertIn("Posted 1 opening balances", out.getvalue())
+        self.assert_books_balance()
+        opening = JournalEntry.objects.get(kind="OPENING")
+        self.assertEqual(opening.created_at, self.alice.created_at)
+        self.assertEqual(journal.system_balance(journal.OPENING_BALANCES), 80000)
+
+        call_command("backfill_journal_openings", stdout=out)
+        self.assertEqual(JournalEntry.objects.filter(kind="OPENING").count(), 1)
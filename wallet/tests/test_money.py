@@ -0,0 +1,60 @@
+import gzip
+import json
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import archive
+from wallet.models import Wallet
+from wallet.money import Money, format_minor, to_minor
+from wallet.serializers import WalletSerializer
+
+
+class MoneyTests(APITestCase):
+    def test_parse_and_format_by_currency_exponent(self):
+        self.assertEqual(Money.parse("50000"), Money(50000, "IRR"))
+        self.assertEqual(Money.parse("50000.00"), Money(50000, "IRR"))
+        self.assertEqual(Money.parse("12.5", "USD"), Money(1250, "USD"))
+        self.assertEqual(str(Money(1250, "USD")), "12.50")
+        self.assertEqual(format_minor(-50000), "-50000")
+        self.assertEqual(Money(1, "USD") + Money(2, "USD"), Money(3, "USD"))
+
+        for value, currency in (("10.5", "IRR"), ("0.001", "USD"), ("abc", "IRR"), ("1", "XXX")):
+            with self.assertRaises(ValueError):
+                to_minor(value, currency)
+        with self.assertRaises(TypeError):
+            Money(1, "USD") + Money(1, "IRR")
+
+    def test_api_amounts_are_minor_units_of_the_wallet_currency(self):
+        user = User.objects.create_user(username="user1", password="password123")
+        self.client.force_authenticate(user=user)
+        charge_url = reverse("wallet:wallet_charge")
+
+        response = self.client.post(charge_url, {"amount": "10.50"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        Wallet.objects.filter(id=user.wallet.id).update(currency="USD", balance=0)
+        user.refresh_from_db()
+        response = self.client.post(charge_url, {"amount": "10.50"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        wallet = Wallet.objects.get(id=user.wallet.id)
+        self.assertEqual(wallet.balance, 1050)
+        self.assertEqual(WalletSerializer(wallet).data["balance"], "10.50")
+        response = self.client.get(reverse("wallet:wallet_transactions"))
+        self.assertEqual(response.data["results"][0]["amount"], "10.50")
+
+    def test_archive_reads_decimal_amounts_of_old_chunks(self):
+        row = ("00" * 16, "11" * 16, "CHARGE", "1000.00", "", "2025-01-01T00:00:00+00:00")
+        chunk = gzip.compress(
+            json.dumps(
+                {field: [value] for field, value in zip(archive.ARCHIVE_FIELDS, row)}
+            ).encode()
+        )
+        self.assertEqual(archive._decode_chunk(chunk)[0][3], 1000)
+
+        rows = archive._decode_chunk(archive._encode_chunk(archive._decode_chunk(chunk)))
+        self.assertEqual(rows[0][3], 1000)
+        self.assertIsInstance(rows[0][3], int)
+        self.assertEqual(Decimal(rows[0][3]), Decimal("1000"))
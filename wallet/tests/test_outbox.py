@@ -0,0 +1,101 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from celery import current_app
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from kombu import Exchange, Queue
+from accounts.models import User
+from wallet import outbox
+from wallet.models import OutboxEvent
+from wallet.services import WalletService
+from wallet.tasks import dispatch_outbox
+from wallet.tests.test_concurrency import run_concurrently
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username="user1", password="password123")
+        self.receiver = User.objects.create_user(username="user2", password="password123")
+
+    def test_service_changes_write_their_events(self):
+        WalletService.charge_wallet(self.sender.wallet, 100)
+        WalletService.transfer_funds(self.sender.wallet, self.receiver.wallet.id, 30)
+        WalletService.transfer_many(
+            self.sender.wallet,
+            [
+                {"receiver_wallet_id": self.receiver.wallet.id, "amount": 5},
+                {"receiver_wallet_id": self.receiver.wallet.id, "amount": 10**9},
+            ],
+            allow_partial=True,
+        )
+        WalletService.settle_funds(self.sender.wallet, 20)
+        with self.assertRaises(ValueError):
+            WalletService.transfer_funds(self.sender.wallet, self.receiver.wallet.id, 10**9)
+
+        events = list(OutboxEvent.objects.order_by("id"))
+        self.assertEqual(
+            [event.topic for event in events],
+            [outbox.CHARGED, outbox.TRANSFERRED, outbox.TRANSFERRED, outbox.SETTLED],
+        )
+        self.assertEqual(
+            events[1].payload,
+            {
+                "sender_wallet_id": str(self.sender.wallet.id),
+                "receiver_wallet_id": str(self.receiver.wallet.id),
+                "amount": 30,
+                "currency": "IRR",
+            },
+        )
+
+    def test_dispatch_publishes_to_the_exchange_and_deletes(self):
+        WalletService.charge_wallet(self.sender.wallet, 100)
+        WalletService.settle_funds(self.sender.wallet, 20)
+        exchange = Exchange(settings.WALLET_EVENTS_EXCHANGE, type="topic")
+        with current_app.connection_for_write() as conn:
+            queue = Queue("wallet-events-test", exchange, routing_key="wallet.#")
+            queue(conn.default_channel).declare()
+
+            self.assertEqual(dispatch_outbox.delay(batch_size=1).get(), 2)
+
+            received = []
+            while (message := queue(conn.default_channel).get(no_ack=True)) is not None:
+                received.append(message.payload)
+        self.assertEqual([body["topic"] for body in received], [outbox.CHARGED, outbox.SETTLED])
+        self.assertEqual(received[0]["data"]["amount"], 100)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_publish_keeps_the_batch(self):
+        WalletService.charge_wallet(self.sender.wallet, 100)
+        with mock.patch("wallet.outbox.publish", side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                outbox.dispatch()
+
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "SKIP LOCKED needs PostgreSQL."
+)
+class ConcurrentDispatchTests(TransactionTestCase):
+    def test_concurrent_dispatchers_publish_each_event_once(self):
+        outbox.emit(*(outbox.new_event(outbox.CHARGED, amount=i) for i in range(200)))
+        published = []
+        lock = threading.Lock()
+
+        def record(events):
+            time.sleep(0.01)  # hold the batch long enough for others to skip it
+            with lock:
+                published.extend(event.id for event in events)
+
+        with mock.patch("wallet.outbox.publish", side_effect=record):
+            counts = run_concurrently(
+                lambda _: outbox.dispatch(batch_size=10, max_batches=100), 4, workers=4
+            )
+
+        self.assertEqual(sum(counts), 200)
+        self.assertEqual(len(published), 200)
+        self.assertEqual(len(set(published)), 200)
+        self.assertFalse(OutboxEvent.objects.exists())
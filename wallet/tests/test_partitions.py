@@ -0,0 +1,143 @@
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import partitions
+from wallet.models import WalletTransaction
+from wallet.pagination import TransactionCursorPagination, keyset_after
+from wallet.tasks import ensure_ledger_partitions
+
+
+def add_transaction(wallet, created_at):
+    tx = WalletTransaction.objects.create(
+        wallet=wallet, transaction_type="CHARGE", amount=1
+    )
+    WalletTransaction.objects.filter(id=tx.id).update(created_at=created_at)
+    return tx
+
+
+class RecentWindowPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+        now = timezone.now()
+        for days in (1, 2, 3, 40, 41, 400, 401, 402):
+            add_transaction(self.wallet, now - timedelta(days=days))
+        self.client.force_authenticate(user=self.user)
+
+    def test_pages_continue_past_the_recent_window(self):
+        url = reverse("wallet:wallet_transactions") + "?page_size=3"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            seen += [tx["id"] for tx in response.json()["results"]]
+            url = response.json()["next"]
+
+        expected = [
+            str(pk)
+            for pk in WalletTransaction.objects.filter(wallet=self.wallet)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        ]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 9)  # welcome bonus + 8 backdated rows
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Ledger partitioning needs PostgreSQL."
+)
+class LedgerPartitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+        self.next_month = partitions.add_months(
+            partitions.month_start(timezone.now()), 1
+        )
+
+    def partition_of(self, tx):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT tableoid::regclass::text FROM {partitions.LEDGER_TABLE} "
+                "WHERE id = %s",
+                [tx.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_rows_are_routed_to_their_month(self):
+        old = add_transaction(self.wallet, timezone.now() - timedelta(days=365))
+        upcoming = add_transaction(self.wallet, self.next_month + timedelta(days=3))
+
+        self.assertEqual(self.partition_of(old), f"{partitions.LEDGER_TABLE}_legacy")
+        self.assertEqual(
+            self.partition_of(upcoming), partitions.partition_name(self.next_month)
+        )
+
+    def test_command_creates_partitions_ahead(self):
+        call_command("ledger_partitions", ahead=6, stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            names = [p.name for p in partitions.list_partitions(cursor)]
+        for offset in range(1, 7):
+            month = partitions.add_months(self.next_month, offset - 1)
+            self.assertIn(partitions.partition_name(month), names)
+
+        far = partitions.add_months(self.next_month, 5) + timedelta(days=1)
+        add_transaction(self.wallet, far)  # would fail without a partition
+
+    def test_beat_task_creates_the_coming_months(self):
+        later = partitions.add_months(self.next_month, 12)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            result = ensure_ledger_partitions()
+
+        self.assertEqual(result["months_ahead"], 3)
+        self.assertIn(partitions.partition_name(later), result["created"])
+        add_transaction(self.wallet, partitions.add_months(later, 3))
+
+    def test_too_few_future_partitions_fail_the_check(self):
+        later = partitions.add_months(self.next_month, 12)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            with self.assertRaisesMessage(CommandError, "Only 0 future month(s)"):
+                call_command("ledger_partitions", check=1, stdout=StringIO())
+            with self.assertLogs("wallet.partitions", "ERROR"):
+                partitions.maintain(ahead=1, minimum=2)
+            call_command("ledger_partitions", check=1, stdout=StringIO())
+
+    def test_command_detaches_old_partitions(self):
+        tx = add_transaction(self.wallet, self.next_month + timedelta(days=1))
+        later = self.next_month + timedelta(days=200)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            call_command(
+                "ledger_partitions",
+                detach_before=partitions.add_months(self.next_month, 1),
+                stdout=StringIO(),
+            )
+
+        with connection.cursor() as cursor:
+            remaining = partitions.list_partitions(cursor)
+        self.assertTrue(all(p.lower and p.lower > self.next_month for p in remaining))
+        self.assertFalse(WalletTransaction.objects.filter(id=tx.id).exists())
+
+    def test_history_page_prunes_old_partitions(self):
+        cursor_at = self.next_month + timedelta(days=40)
+        window_start = cursor_at - TransactionCursorPagination.recent_window
+        queryset = WalletTransaction.objects.filter(wallet=self.wallet).order_by(
+            *TransactionCursorPagination.ordering
+        )
+        plan = keyset_after(queryset, cursor_at, self.wallet.id).filter(
+            created_at__gte=window_start
+        )[:11].explain()
+
+        month_after = partitions.add_months(self.next_month, 1)
+        self.assertIn(partitions.partition_name(month_after), plan)
+        self.assertIn(partitions.partition_name(self.next_month), plan)
+        self.assertNotIn(f"{partitions.LEDGER_TABLE}_legacy", plan)
+        self.assertNotIn(
+            partitions.partition_name(partitions.add_months(month_after, 1)), plan
+        )
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from unittest.mock import patch
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from wallet.models import Payment, Wallet, WalletTransaction
+from wallet.services import WalletService
+from wallet.tasks import sweep_pending_payments
+
+RESULTS = {
+    "PAID": {"data": {"code": 100}, "errors": []},
+    "LATE": {"data": {"code": 101}, "errors": []},
+    "CANCELLED": {"data": {}, "errors": {"code": -51}},
+    "EXPIRED": {"data": {}, "errors": {"code": -54}},
+    "THROTTLED": {"data": {}, "errors": {"code": -12, "message": "Too many attempts"}},
+}
+
+
+def verify(amount, authority):
+    if authority.startswith("DOWN"):
+        raise requests.ConnectionError()
+    return RESULTS[authority.rstrip("0123456789")]
+
+
+@override_settings(WALLET_PAYMENT_SWEEP_AFTER_SECONDS=600, WALLET_PAYMENT_SWEEP_WORKERS=4)
+@patch("wallet.payments.get_zarinpal_client")
+class PaymentSweeperTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+
+    def add_payment(self, authority, age_minutes=60, amount=1000):
+        payment = Payment.objects.create(
+            wallet=self.wallet, amount=amount, status=Payment.PENDING, authority=authority
+        )
+        Payment.objects.filter(id=payment.id).update(
+            updated_at=timezone.now() - timedelta(minutes=age_minutes)
+        )
+        return payment
+
+    def status_of(self, authority):
+        return Payment.objects.get(authority=authority).status
+
+    def test_stale_payments_are_resolved(self, mock_get_client):
+        mock_get_client.return_value.verify_payment.side_effect = verify
+        for i in range(3):
+            self.add_payment(f"PAID{i}")
+        self.add_payment("LATE")
+        self.add_payment("CANCELLED")
+        self.add_payment("EXPIRED")
+        self.add_payment("DOWN")
+        self.add_payment("PAID9", age_minutes=1)
+
+        stats = sweep_pending_payments.delay(batch_size=2).get()
+
+        self.assertEqual(
+            {key: stats[key] for key in ("paid", "failed", "errors", "backlog")},
+            {"paid": 4, "failed": 2, "errors": 1, "backlog": 0},
+        )
+        self.assertEqual(Wallet.objects.get(id=self.wallet.id).balance, 50000 + 4 * 1000)
+        self.assertEqual(self.status_of("PAID0"), Payment.PAID)
+        self.assertEqual(self.status_of("CANCELLED"), Payment.FAILED)
+        self.assertEqual(self.status_of("EXPIRED"), Payment.FAILED)
+        # Errors and recent payments stay pending for a later sweep.
+        self.assertEqual(self.status_of("DOWN"), Payment.PENDING)
+        self.assertEqual(self.status_of("PAID9"), Payment.PENDING)
+
+        # The failed verify was leased; it is not retried before its time.
+        self.assertEqual(sweep_pending_payments.delay().get()["errors"], 0)
+
+    def test_rate_limited_payment_stays_pending(self, mock_get_client):
+        mock_get_client.return_value.verify_payment.side_effect = verify
+        self.add_payment("THROTTLED")
+
+        stats = sweep_pending_payments.delay().get()
+
+        self.assertEqual((stats["failed"], stats["errors"]), (0, 1))
+        self.assertEqual(self.status_of("THROTTLED"), Payment.PENDING)
+
+        # Once the gateway answers, the next sweep credits it.
+        Payment.objects.filter(authority="THROTTLED").update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        mock_get_client.return_value.verify_payment.side_effect = None
+        mock_get_client.return_value.verify_payment.return_value = RESULTS["PAID"]
+        self.assertEqual(sweep_pending_payments.delay().get()["paid"], 1)
+        self.assertEqual(self.status_of("THROTTLED"), Payment.PAID)
+
+    def test_credit_is_applied_once(self, mock_get_client):
+        self.add_payment("PAID1")
+
+        self.assertTrue(WalletService.credit_verified_payment("PAID1"))
+        self.assertFalse(WalletService.credit_verified_payment("PAID1"))
+        mock_get_client.return_value.verify_payment.side_effect = verify
+        self.assertEqual(sweep_pending_payments.delay().get()["paid"], 0)
+
+        self.assertEqual(Wallet.objects.get(id=self.wallet.id).balance, 51000)
+        self.assertEqual(
+            WalletTransaction.objects.filter(
+                description="Payment verified with authority PAID1"
+            ).count(),
+            1,
+        )
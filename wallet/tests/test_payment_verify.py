@@ -0,0 +1,86 @@
+from unittest.mock import patch
+import requests
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet.models import Payment, Wallet, WalletTransaction
+
+VERIFIED = {"data": {"code": 100, "ref_id": 1}, "errors": []}
+
+
+@patch("wallet.views.get_zarinpal_client")
+class PaymentVerifyViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.payment = Payment.objects.create(
+            wallet=self.user.wallet, amount=10000, status=Payment.PENDING, authority="A0001"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def verify(self, data=None):
+        return self.client.post(
+            reverse("wallet:payment_verify"), data or {"authority": "A0001"}, format="json"
+        )
+
+    def balance(self):
+        return Wallet.objects.get(id=self.user.wallet.id).balance
+
+    def test_stored_amount_is_credited_once(self, get_client):
+        get_client.return_value.verify_payment.return_value = VERIFIED
+        before = self.balance()
+
+        for _ in range(2):
+            response = self.verify({"authority": "A0001", "amount": 10**9})
+            self.assertEqual(response.status_code, 200)
+
+        get_client.return_value.verify_payment.assert_called_once_with(10000, "A0001")
+        self.assertEqual(self.balance(), before + 10000)
+        self.assertEqual(
+            WalletTransaction.objects.filter(
+                description="Payment verified with authority A0001"
+            ).count(),
+            1,
+        )
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PAID)
+
+    def test_rejected_payment_stays_pending(self, get_client):
+        get_client.return_value.verify_payment.return_value = {
+            "data": {}, "errors": {"code": -51}
+        }
+        before = self.balance()
+
+        response = self.verify()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(), before)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PENDING)
+
+    def test_gateway_error(self, get_client):
+        get_client.return_value.verify_payment.side_effect = requests.ConnectionError("down")
+
+        response = self.verify()
+
+        self.assertEqual(response.status_code, 500)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PENDING)
+
+    def test_payment_of_another_user_is_not_found(self, get_client):
+        other = User.objects.create_user(username="user2", password="password123")
+        self.client.force_authenticate(user=other)
+
+        response = self.verify()
+
+        self.assertEqual(response.status_code, 404)
+        get_client.return_value.verify_payment.assert_not_called()
+
+    def test_failed_payment_is_not_verified(self, get_client):
+        Payment.objects.filter(id=self.payment.id).update(status=Payment.FAILED)
+
+        response = self.verify()
+
+        self.assertEqual(response.status_code, 400)
+        get_client.return_value.verify_payment.assert_not_called()
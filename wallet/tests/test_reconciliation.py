@@ -0,0 +1,101 @@
+import unittest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from accounts.models import User
+from wallet import reconciliation
+from wallet.models import Wallet, WalletBalanceCheckpoint, WalletTransaction
+from wallet.services import WalletService
+
+
+def reconcile(**options):
+    out = StringIO()
+    call_command("reconcile_wallets", lag_seconds=0, stdout=out, **options)
+    return out.getvalue()
+
+
+class ReconcileWalletsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.other = User.objects.create_user(username="user2", password="password123")
+        WalletService.transfer_funds(self.user.wallet, str(self.other.wallet.id), 1000)
+        WalletService.charge_wallet(self.user.wallet, 250)
+
+    def test_clean_run_checkpoints_every_wallet(self):
+        output = reconcile(workers=1)
+
+        self.assertIn("Checked 2 wallets", output)
+        self.assertIn("0 drifted", output)
+        checkpoint = WalletBalanceCheckpoint.objects.get(wallet=self.user.wallet)
+        self.assertEqual(checkpoint.balance, 49250)
+        newest = WalletTransaction.objects.filter(wallet=self.user.wallet).order_by(
+            "-created_at", "-id"
+        )[0]
+        self.assertEqual(checkpoint.last_transaction_id, newest.id)
+
+    def test_drifted_wallet_is_reported_and_keeps_its_checkpoint(self):
+        reconcile(workers=1)
+        before = WalletBalanceCheckpoint.objects.get(wallet=self.user.wallet)
+        Wallet.objects.filter(id=self.user.wallet.id).update(balance=99999)
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 wallets drifted"):
+            call_command("reconcile_wallets", workers=1, lag_seconds=0, stdout=out)
+
+        self.assertIn(
+            f"DRIFT {self.user.wallet.id}: balance 99999, ledger 49250, diff 50749",
+            out.getvalue(),
+        )
+        self.assertEqual(
+            WalletBalanceCheckpoint.objects.get(wallet=self.user.wallet).as_of, before.as_of
+        )
+
+    def test_only_rows_after_the_checkpoint_are_summed(self):
+        reconcile(workers=1)
+        # Rows before the checkpoint are trusted and no longer read.
+        WalletTransaction.objects.filter(wallet=self.user.wallet).update(amount=1)
+        WalletService.charge_wallet(self.user.wallet, 10)
+
+        self.assertIn("0 drifted", reconcile(workers=1))
+        self.assertEqual(
+            WalletBalanceCheckpoint.objects.get(wallet=self.user.wallet).balance,
+            49260,
+        )
+
+    def test_checkpoint_lags_behind_recent_rows(self):
+        settled_before = timezone.now() - timedelta(minutes=5)
+        stats = reconciliation.reconcile_range(None, None, settled_before)
+
+        self.assertEqual(stats, {"checked": 2, "drifted": []})
+        checkpoint = WalletBalanceCheckpoint.objects.get(wallet=self.user.wallet)
+        self.assertEqual(checkpoint.balance, 0)
+        self.assertIsNone(checkpoint.last_transaction_id)
+        self.assertEqual(checkpoint.as_of, settled_before)
+
+    def test_ranges_cover_the_id_space(self):
+        bounds = reconciliation.wallet_range_bounds(4)
+
+        self.assertEqual(len(bounds), 4)
+        self.assertIsNone(bounds[0][0])
+        self.assertIsNone(bounds[-1][1])
+        self.assertEqual([upper for _, upper in bounds[:-1]], [lower for lower, _ in bounds[1:]])
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "Worker processes need a shared database."
+)
+class ParallelReconcileTests(TransactionTestCase):
+    def test_worker_processes_check_every_wallet(self):
+        for i in range(20):
+            User.objects.create_user(username=f"user{i}", password="password123")
+        Wallet.objects.filter(user__username="user7").update(balance=1)
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_wallets", workers=2, lag_seconds=0, stdout=out)
+
+        self.assertIn("Checked 20 wallets", out.getvalue())
+        self.assertEqual(WalletBalanceCheckpoint.objects.count(), 19)
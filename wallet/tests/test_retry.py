@@ -0,0 +1,77 @@
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase
+from wallet import metrics
+from wallet.services import retry_on_conflict
+
+
+class FakePgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def db_error(pgcode):
+    """Build the Django-wrapped error the way the DB layer raises it."""
+    try:
+        raise OperationalError("conflict") from FakePgError(pgcode)
+    except OperationalError as exc:
+        return exc
+
+
+@patch("wallet.services.time.sleep")
+class RetryOnConflictTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_deadlock_is_retried_and_counted(self, mock_sleep):
+        calls = []
+
+        @retry_on_conflict(attempts=3)
+        def transfer_funds():
+            calls.append(1)
+            if len(calls) < 3:
+                raise db_error("40P01")
+            return "done"
+
+        self.assertEqual(transfer_funds(), "done")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(metrics.snapshot()["transfer_funds.conflict_retries"], 2)
+
+    def test_gives_up_after_last_attempt(self, mock_sleep):
+        @retry_on_conflict(attempts=2)
+        def transfer_funds():
+            raise db_error("40001")
+
+        with self.assertRaises(OperationalError):
+            transfer_funds()
+        self.assertEqual(metrics.snapshot()["transfer_funds.conflict_failures"], 1)
+
+    def test_conflict_counters_of_decorated_functions_are_listed(self, mock_sleep):
+        # Importing the views imports every decorated function.
+        import wallet.views  # noqa: F401
+
+        for name in (
+            "transfer_funds",
+            "transfer_many",
+            "run_and_store",
+            "apply_transfer",
+            "_expire_batch",
+        ):
+            self.assertIn(f"{name}.conflict_retries", metrics.snapshot())
+            self.assertIn(f"{name}.conflict_failures", metrics.METRIC_NAMES)
+
+    def test_other_errors_are_not_retried(self, mock_sleep):
+        calls = []
+
+        @retry_on_conflict()
+        def transfer_funds():
+            calls.append(1)
+            raise db_error("57014")  # query_canceled
+
+        with self.assertRaises(OperationalError):
+            transfer_funds()
+        self.assertEqual(len(calls), 1)
+        mock_sleep.assert_not_called()
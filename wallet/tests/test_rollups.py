@@ -0,0 +1,99 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from wallet import rollups, tasks
+from wallet.models import WalletDailyAggregate, WalletTransaction
+
+
+def add_transaction(wallet, created_at, transaction_type, amount):
+    tx = WalletTransaction.objects.create(
+        wallet=wallet, transaction_type=transaction_type, amount=amount
+    )
+    WalletTransaction.objects.filter(id=tx.id).update(created_at=created_at)
+    return tx
+
+
+class DailyAggregateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+        self.today = timezone.now().date()
+        self.long_ago = timezone.now() - timedelta(days=90)
+        add_transaction(self.wallet, self.long_ago, "CHARGE", 100)
+        add_transaction(self.wallet, self.long_ago + timedelta(minutes=1), "SETTLEMENT", 30)
+        add_transaction(self.wallet, self.long_ago + timedelta(days=1), "TRANSFER_OUT", 5)
+
+    def totals(self, days_back=120):
+        return {
+            aggregate.day: (
+                aggregate.charged,
+                aggregate.transferred_in,
+                aggregate.transferred_out,
+                aggregate.settled,
+                aggregate.transaction_count,
+            )
+            for aggregate in rollups.daily_totals(
+                self.wallet.id, self.today - timedelta(days=days_back), self.today
+            )
+        }
+
+    def test_backfill_sums_each_day_by_type(self):
+        expected = self.totals()
+        call_command("backfill_daily_aggregates", stdout=StringIO())
+
+        day = self.long_ago.date()
+        stored = WalletDailyAggregate.objects.get(wallet=self.wallet, day=day)
+        self.assertEqual(stored.charged, 100)
+        self.assertEqual(stored.settled, 30)
+        self.assertEqual(stored.transaction_count, 2)
+        self.assertEqual(
+            WalletDailyAggregate.objects.get(wallet=self.wallet, day=day + timedelta(days=1)).transferred_out,
+            5,
+        )
+        self.assertEqual(self.totals(), expected)
+
+    def test_new_rows_are_added_once(self):
+        call_command("backfill_daily_aggregates", stdout=StringIO())
+        add_transaction(self.wallet, timezone.now() - timedelta(seconds=1), "TRANSFER_IN", 7)
+
+        with override_settings(WALLET_ROLLUP_LAG_SECONDS=0):
+            tasks.roll_up_daily_aggregates.delay()
+            tasks.roll_up_daily_aggregates.delay()
+            call_command("backfill_daily_aggregates", stdout=StringIO())
+
+        self.assertEqual(
+            sum(WalletDailyAggregate.objects.values_list("transaction_count", flat=True)),
+            WalletTransaction.objects.filter(created_at__lt=rollups.watermark()).count(),
+        )
+        transferred_in = sum(
+            WalletDailyAggregate.objects.filter(wallet=self.wallet).values_list(
+                "transferred_in", flat=True
+            )
+        )
+        self.assertEqual(transferred_in, 7)
+
+    def test_reads_include_rows_past_the_watermark(self):
+        call_command("backfill_daily_aggregates", stdout=StringIO())
+        # The welcome bonus is within the lag and not rolled up yet.
+        self.assertGreater(
+            WalletTransaction.objects.filter(created_at__gte=rollups.watermark()).count(), 0
+        )
+
+        with self.assertNumQueries(4):
+            totals = self.totals()
+
+        self.assertEqual(totals[self.today][0], 50000)
+        self.assertEqual(totals[self.long_ago.date()][4], 2)
+
+    def test_gaps_in_the_ledger_are_skipped(self):
+        windows = 0
+        until = rollups.settled_before()
+        while rollups.roll_up_window(until) is not None:
+            windows += 1
+
+        # Two days of old rows, then a jump to the welcome bonus.
+        self.assertLessEqual(windows, 4)
+        self.assertEqual(rollups.watermark(), until)
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from accounts.models import User
+from wallet import partitions
+from wallet.models import Wallet, WalletStatement, WalletTransaction
+
+
+def add_transaction(wallet, created_at, transaction_type, amount):
+    tx = WalletTransaction.objects.create(
+        wallet=wallet, transaction_type=transaction_type, amount=amount
+    )
+    WalletTransaction.objects.filter(id=tx.id).update(created_at=created_at)
+    change = amount if transaction_type in WalletTransaction.CREDIT_TYPES else -amount
+    Wallet.objects.filter(id=wallet.id).update(balance=F("balance") + change)
+    return tx
+
+
+class WalletStatementTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user1", password="password123")
+        self.wallet = self.user.wallet
+        self.this_month = partitions.month_start(timezone.now())
+        self.two_ago = partitions.add_months(self.this_month, -2)
+        self.last_month = partitions.add_months(self.this_month, -1)
+        # The welcome bonus is moved into the oldest month.
+        WalletTransaction.objects.filter(wallet=self.wallet).update(
+            created_at=self.two_ago + timedelta(hours=1)
+        )
+        add_transaction(self.wallet, self.two_ago + timedelta(days=3), "SETTLEMENT", 1000)
+        add_transaction(self.wallet, self.last_month + timedelta(days=1), "CHARGE", 250)
+        add_transaction(self.wallet, self.last_month + timedelta(days=9), "TRANSFER_OUT", 50)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("wallet:wallet_statements")
+
+    def close_months(self):
+        call_command("reconcile_wallets", workers=1, lag_seconds=0, stdout=StringIO())
+        call_command("backfill_daily_aggregates", stdout=StringIO())
+
+    def get_statements(self, start, end):
+        response = self.client.get(self.url, {"start": f"{start:%Y-%m}", "end": f"{end:%Y-%m}"})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["statements"]
+
+    def test_balances_chain_across_months(self):
+        self.close_months()
+        older, last, current = self.get_statements(self.two_ago, self.this_month)
+
+        self.assertEqual(older["opening_balance"], "0")
+        self.assertEqual(older["closing_balance"], "49000")
+        self.assertEqual(older["totals"]["SETTLEMENT"], "1000")
+        self.assertEqual(last["opening_balance"], "49000")
+        self.assertEqual(last["closing_balance"], "49200")
+        self.assertEqual(
+            [line["transaction_type"] for line in last["lines"]], ["CHARGE", "TRANSFER_OUT"]
+        )
+        self.assertEqual(current["closing_balance"], "49200")
+        self.assertEqual(
+            [(s["month"], s["closed"]) for s in (older, last, current)],
+            [(f"{self.two_ago:%Y-%m}", True), (f"{self.last_month:%Y-%m}", True), (f"{self.this_month:%Y-%m}", False)],
+        )
+
+    def test_closed_months_are_stored_once(self):
+        self.close_months()
+        first = self.get_statements(self.two_ago, self.last_month)
+        self.assertEqual(WalletStatement.objects.filter(wallet=self.wallet).count(), 2)
+
+        # Stored statements are not rebuilt from the ledger.
+        WalletTransaction.objects.filter(wallet=self.wallet).update(amount=1)
+        self.assertEqual(self.get_statements(self.two_ago, self.last_month), first)
+        cache.clear()
+        self.assertEqual(self.get_statements(self.two_ago, self.last_month), first)
+
+    def test_cached_year_costs_a_fixed_number_of_queries(self):
+        self.close_months()
+        start = partitions.add_months(self.this_month, -11)
+        self.get_statements(start, self.this_month)
+
+        with self.assertNumQueries(8):
+            statements = self.get_statements(start, self.this_month)
+        self.assertEqual(len(statements), 12)
+
+    def test_months_are_computed_live_until_reconciled(self):
+        older, last = self.get_statements(self.two_ago, self.last_month)
+
+        self.assertFalse(older["closed"])
+        self.assertEqual(last["closing_balance"], "49200")
+        self.assertFalse(WalletStatement.objects.exists())
+
+    def test_range_is_validated(self):
+        start = partitions.add_months(self.this_month, -12)
+        response = self.client.get(self.url, {"start": f"{start:%Y-%m}", "end": f"{self.this_month:%Y-%m}"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {"start": "2025-13"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()["statements"]), 12)
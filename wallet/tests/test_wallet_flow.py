@@ -1,7 +1,6 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from decimal import Decimal
 from accounts.models import User
 from wallet.models import WalletTransaction
 
@@ -25,12 +24,12 @@ class WalletTests(APITestCase):
 
     def test_wallet_auto_creation_with_bonus(self):
         """Each new user should get a wallet with a 50,000 bonus."""
-        self.assertEqual(self.wallet1.balance, Decimal("50000.00"))
-        self.assertEqual(self.wallet2.balance, Decimal("50000.00"))
+        self.assertEqual(self.wallet1.balance, 50000)
+        self.assertEqual(self.wallet2.balance, 50000)
 
         tx = self.wallet1.transactions.first()
         self.assertEqual(tx.transaction_type, "CHARGE")
-        self.assertEqual(tx.amount, Decimal("50000.00"))
+        self.assertEqual(tx.amount, 50000)
 
     def test_charge_wallet_success_and_failure(self):
         self.client.force_authenticate(user=self.user1)
@@ -40,7 +39,7 @@ class WalletTests(APITestCase):
         response = self.client.post(charge_url, {"amount": "1000.00"}, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.wallet1.refresh_from_db()
-        self.assertEqual(self.wallet1.balance, Decimal("51000.00"))
+        self.assertEqual(self.wallet1.balance, 51000)
 
         # Invalid (negative amount)
         response = self.client.post(charge_url, {"amount": "-10.00"}, format="json")
@@ -59,8 +58,8 @@ class WalletTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.wallet1.refresh_from_db()
         self.wallet2.refresh_from_db()
-        self.assertEqual(self.wallet1.balance, Decimal("49500.00"))
-        self.assertEqual(self.wallet2.balance, Decimal("50500.00"))
+        self.assertEqual(self.wallet1.balance, 49500)
+        self.assertEqual(self.wallet2.balance, 50500)
 
         # Failure: insufficient funds
         response = self.client.post(
@@ -97,7 +96,7 @@ class WalletTests(APITestCase):
         response = self.client.post(settle_url, {"amount": "1000.00"}, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.wallet1.refresh_from_db()
-        self.assertEqual(self.wallet1.balance, Decimal("49000.00"))
+        self.assertEqual(self.wallet1.balance, 49000)
 
         # Failure: insufficient funds
         response = self.client.post(settle_url, {"amount": "9999999.00"}, format="json")
@@ -107,8 +106,8 @@ class WalletTests(APITestCase):
         response = self.client.post(settle_url, {"amount": "-10.00"}, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    def test_transaction_history_limit(self):
-        """Should return the last 10 transactions only."""
+    def test_transaction_history_first_page(self):
+        """The first page holds the 10 most recent transactions."""
         self.client.force_authenticate(user=self.user1)
         charge_url = reverse("wallet:wallet_charge")
 
@@ -120,13 +119,45 @@ class WalletTests(APITestCase):
         response = self.client.get(transactions_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        data = response.json()
-        self.assertEqual(len(data), 10)  # last 10 only
+        data = response.json()["results"]
+        self.assertEqual(len(data), 10)  # first page only
+        self.assertIsNotNone(response.json()["next"])
 
         # Verify the latest transaction is the most recent
         latest_tx = (
             WalletTransaction.objects.filter(wallet=self.wallet1)
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
             .first()
         )
         self.assertEqual(str(latest_tx.id), data[0]["id"])
+
+    def test_transaction_history_cursor_pagination(self):
+        """Following `next` walks the whole history once, newest first."""
+        self.client.force_authenticate(user=self.user1)
+        charge_url = reverse("wallet:wallet_charge")
+        for i in range(12):
+            self.client.post(charge_url, {"amount": "1.00"}, format="json")
+
+        url = reverse("wallet:wallet_transactions") + "?page_size=5"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [tx["id"] for tx in response.json()["results"]]
+            url = response.json()["next"]
+
+        expected = [
+            str(pk)
+            for pk in WalletTransaction.objects.filter(wallet=self.wallet1)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        ]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 13)  # welcome bonus + 12 charges
+
+    def test_transaction_history_invalid_cursor(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(
+            reverse("wallet:wallet_transactions"), {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -3,12 +3,19 @@ from django.urls import path
 from .views import (
     WalletDetailView,
     WalletTransactionsView,
+    WalletTransactionExportView,
+    WalletStatementView,
     ChargeWalletView,
     TransferView,
+    AsyncTransferView,
+    AsyncTransferStatusView,
+    BatchTransferView,
     SettlementView,
     PaymentRequestView,
-    PaymentVerifyView
+    PaymentVerifyView,
+    WalletMetricsView,
 )
+from .async_views import AsyncPaymentRequestView, AsyncPaymentVerifyView
 
 
 app_name = "wallet"
@@ -16,9 +23,33 @@ app_name = "wallet"
 urlpatterns = [
     path("", WalletDetailView.as_view(), name="wallet_detail"),
     path("transactions/", WalletTransactionsView.as_view(), name="wallet_transactions"),
+    path(
+        "transactions/export/",
+        WalletTransactionExportView.as_view(),
+        name="wallet_transactions_export",
+    ),
+    path("statements/", WalletStatementView.as_view(), name="wallet_statements"),
     path("charge/", ChargeWalletView.as_view(), name="wallet_charge"),
     path("transfer/", TransferView.as_view(), name="wallet_transfer"),
+    path("transfer/batch/", BatchTransferView.as_view(), name="wallet_transfer_batch"),
+    path("transfer/async/", AsyncTransferView.as_view(), name="wallet_transfer_async"),
+    path(
+        "transfer/async/<uuid:transfer_id>/",
+        AsyncTransferStatusView.as_view(),
+        name="wallet_transfer_async_status",
+    ),
     path("settle/", SettlementView.as_view(), name="wallet_settle"),
     path("payment/request/",PaymentRequestView.as_view(), name="payment_request"),
-    path("payment/verify/",PaymentVerifyView.as_view(), name="payment_verify")
+    path("payment/verify/",PaymentVerifyView.as_view(), name="payment_verify"),
+    path(
+        "payment/async/request/",
+        AsyncPaymentRequestView.as_view(),
+        name="payment_request_async",
+    ),
+    path(
+        "payment/async/verify/",
+        AsyncPaymentVerifyView.as_view(),
+        name="payment_verify_async",
+    ),
+    path("metrics/", WalletMetricsView.as_view(), name="wallet_metrics"),
 ]
\ No newline at end of file
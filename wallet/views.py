@@ -1,56 +1,155 @@
 # wallet/views.py
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, generics
 from rest_framework.generics import GenericAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from .serializers import (
     WalletSerializer,
     WalletTransactionSerializer,
     ChargeWalletSerializer,
     TransferSerializer,
+    AsyncTransferSerializer,
+    BatchTransferSerializer,
     SettlementSerializer,
+    TransactionExportSerializer,
     PaymentRequestSerializer,
     PaymentVerifySerializer,
+    StatementSerializer,
 )
+from . import archive, async_transfers, balance_cache, exports, metrics, payments, statements
+from .filters import WalletTransactionFilter
+from .idempotency import IDEMPOTENCY_HEADER, idempotent, run_idempotently
+from .pagination import TransactionCursorPagination
 from .services import WalletService
-from .models import WalletTransaction, Payment
-from decimal import Decimal
+from .models import AsyncTransfer, WalletTransaction, Payment
+from .gateways import get_zarinpal_client
 import requests
 
 
-ZARINPAL_MERCHANT_ID = 'cb2833bb-f8d9-4535-9b16-b68202fc686a'
-ZP_API_REQUEST = "https://sandbox.zarinpal.com/pg/v4/payment/request.json"
-ZP_API_VERIFY = "https://sandbox.zarinpal.com/pg/v4/payment/verify.json"
-ZP_API_STARTPAY = "https://sandbox.zarinpal.com/pg/StartPay/"
-ZARINPAL_CALLBACK_URL = 'http://127.0.0.1:8000'
-
-
 
 
 class WalletDetailView(generics.RetrieveAPIView):
+    """
+    The caller's wallet. Clients poll this constantly, so it is served from
+    the balance cache, which every WalletService mutation writes through.
+    """
+
     serializer_class = WalletSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         return self.request.user.wallet
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(balance_cache.get_wallet_data(request.user))
+
 
 class WalletTransactionsView(generics.ListAPIView):
+    """
+    The caller's history, newest first, narrowed by the query parameters
+    of ``WalletTransactionFilter``.
+    """
+
     serializer_class = WalletTransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = WalletTransactionFilter
 
     def get_queryset(self):
-        return WalletTransaction.objects.filter(
-            wallet=self.request.user.wallet
-        ).order_by("-created_at")[:10]
+        return WalletTransaction.objects.filter(wallet=self.request.user.wallet).select_related(
+            "counterparty_wallet__user"
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["currency"] = self.request.user.wallet.currency
+        return context
+
+    def archived_history(self, before, limit):
+        # Only reached after the filter backend has validated the parameters.
+        filterset = WalletTransactionFilter(self.request.query_params, request=self.request)
+        filterset.is_valid()
+        return archive.history(
+            self.request.user.wallet.id,
+            before,
+            limit,
+            since=filterset.criteria["since"],
+            until=filterset.criteria["until"],
+            match=filterset.matches,
+        )
+
+
+class WalletTransactionExportView(APIView):
+    """
+    Stream the caller's full transaction history as CSV or NDJSON.
+    Rows are read with a server-side cursor and written out as they arrive,
+    so memory use does not grow with the size of the history.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = TransactionExportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        wallet = request.user.wallet
+        rows = exports.export_rows(
+            wallet,
+            start=params.get("start"),
+            end=params.get("end"),
+            transaction_type=params.get("transaction_type"),
+        )
+        render, content_type = exports.RENDERERS[params["export_format"]]
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="transactions-{wallet.id}.{params["export_format"]}"'
+        )
+        return response
+
+
+class WalletStatementView(APIView):
+    """
+    Monthly statements of the caller's wallet, up to 12 months per request:
+        GET /api/wallet/statements/?start=2025-01&end=2025-12
+    Closed months are stored once and served from the cache; only months
+    that are not closed yet are computed (see wallet/statements.py).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        serializer = StatementSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        return Response(
+            {
+                "wallet": str(request.user.wallet.id),
+                "statements": statements.monthly_statements(
+                    request.user.wallet.id,
+                    params["start"],
+                    params["end"],
+                    request.user.wallet.currency,
+                ),
+            }
+        )
 
 
 class ChargeWalletView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @idempotent("charge")
     def post(self, request, *args, **kwargs):
-        serializer = ChargeWalletSerializer(data=request.data)
+        serializer = ChargeWalletSerializer(
+            data=request.data, context={"currency": request.user.wallet.currency}
+        )
         if serializer.is_valid():
             amount = serializer.validated_data["amount"]
             try:
@@ -74,20 +173,11 @@ class PaymentRequestView(APIView):
             description = serializer.validated_data.get("description", "Charge Wallet")
             email = serializer.validated_data.get("email", request.user.email or "")
             mobile = serializer.validated_data.get("mobile", request.user.phone_number or "")
-            
-
-            payload = {
-                "merchant_id": ZARINPAL_MERCHANT_ID,
-                "amount": amount,
-                "description": description,
-                "callback_url": ZARINPAL_CALLBACK_URL,
-                "metadata": {"email": email, "mobile": mobile},
-             }
-            
+            gateway = get_zarinpal_client()
+
             try:
                 # Send request to ZarinPal
-                response = requests.post(ZP_API_REQUEST, json=payload)
-                result = response.json()
+                result = gateway.request_payment(amount, description, email, mobile)
                 """
                 response is something like this :
 
@@ -105,12 +195,12 @@ class PaymentRequestView(APIView):
 
                 if result.get("data") and result["data"].get("code") == 100:
                     authority = result["data"]["authority"]
-                    payment_url = f"{ZP_API_STARTPAY}{authority}"
+                    payment_url = gateway.start_pay_url(authority)
                     
                     payment = Payment.objects.create(
                         wallet=request.user.wallet,
                         amount=amount,
-                        status="pending",
+                        status=Payment.PENDING,
                         authority=authority,
                     )
 
@@ -138,88 +228,71 @@ class PaymentRequestView(APIView):
 
 
 class PaymentVerifyView(APIView):
-    permission_classes=[IsAuthenticated]
-    serializer_class = PaymentVerifySerializer
-    def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data = request.data)
-        if serializer.is_valid():
-            amount = serializer.validated_data["amount"] 
-            authority = serializer.validated_data["authority"]
-
-            verifyload = {
-                "merchant_id": ZARINPAL_MERCHANT_ID,
-                "amount": amount,
-                "authority":authority
-             }
-            
-            try:
-                response = requests.post(ZP_API_VERIFY, json=verifyload)
-                result = response.json()
-                """
-                response is something like this :
-                {
-                    "data": {
-                        "wages": null,
-                        "code": 101,
-                        "message": "Verified",
-                        "card_hash": "0866A6EAEA5CB085E4CF6EF19296BF19647552DD5F96F1E530DB3AE61837EFE7",
-                        "card_pan": "999999******9999",
-                        "ref_id": 10955701,
-                        "fee_type": "Merchant",
-                        "fee": 1000,
-                        "shaparak_fee": 1200,
-                        "order_id": null
-                    },
-                    "errors": []
-                }
-                """
-
-                if result.get("data") and result["data"].get("code") in [100,101]:
-                    wallet = request.user.wallet
-
-                    WalletTransaction.objects.create(
-                        wallet=wallet,
-                        transaction_type="CHARGE",
-                        amount=amount, 
-                        description=f"Payment verified with authority {authority}",
-                    )
-                    
-
-                    return Response(
-                       {
-                            "status": "success",
-                            "message": "Transaction created successfully",
-                            "authority": authority,
-                        },
-                        status=status.HTTP_200_OK,
-                    )
-                else:
-                    errors = result.get("errors", "Unknown error")
-                    return Response(
-                        {"status": "error", "errors": errors},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-            except requests.RequestException as e:
-                return Response(
-                    {"status": "error", "errors": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-
-
-
-
+    """
+    Verify the caller's payment with Zarinpal and credit its stored amount
+    (see wallet/payments.py). The gateway call runs before any transaction
+    is opened; a payment already paid is answered without calling it.
+    """
 
+    permission_classes = [IsAuthenticated]
+    serializer_class = PaymentVerifySerializer
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        authority = serializer.validated_data["authority"]
+
+        payment = Payment.objects.filter(
+            authority=authority, wallet=request.user.wallet
+        ).first()
+        response = payments.known_outcome(payment)
+        if response is not None:
+            return response
+
+        try:
+            result = get_zarinpal_client().verify_payment(payment.amount, authority)
+            """
+            response is something like this :
+            {
+                "data": {
+                    "wages": null,
+                    "code": 101,
+                    "message": "Verified",
+                    "card_hash": "0866A6EAEA5CB085E4CF6EF19296BF19647552DD5F96F1E530DB3AE61837EFE7",
+                    "card_pan": "999999******9999",
+                    "ref_id": 10955701,
+                    "fee_type": "Merchant",
+                    "fee": 1000,
+                    "shaparak_fee": 1200,
+                    "order_id": null
+                },
+                "errors": []
+            }
+            """
+        except requests.RequestException as e:
+            return Response(
+                {"status": "error", "errors": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        return run_idempotently(
+            request.user,
+            request.headers.get(IDEMPOTENCY_HEADER),
+            "payment_verify",
+            request.data,
+            lambda: payments.record_verification(authority, result),
+        )
 
 
 class TransferView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent("transfer")
     def post(self, request, *args, **kwargs):
-        serializer = TransferSerializer(data=request.data)
+        serializer = TransferSerializer(
+            data=request.data, context={"currency": request.user.wallet.currency}
+        )
         if serializer.is_valid():
             data = serializer.validated_data
             try:
@@ -237,11 +310,97 @@ class TransferView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AsyncTransferView(APIView):
+    """
+    Accept a transfer and execute it later on the sender's transfer queue
+    (see wallet/async_transfers.py). Responds 202 with the transfer id;
+    poll ``AsyncTransferStatusView`` for the outcome.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @idempotent("transfer_async")
+    def post(self, request, *args, **kwargs):
+        currency = request.user.wallet.currency
+        serializer = TransferSerializer(data=request.data, context={"currency": currency})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            transfer = async_transfers.submit(
+                request.user.wallet, data["receiver_wallet_id"], data["amount"]
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            AsyncTransferSerializer(transfer, context={"currency": currency}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class AsyncTransferStatusView(generics.RetrieveAPIView):
+    serializer_class = AsyncTransferSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = "transfer_id"
+
+    def get_queryset(self):
+        return AsyncTransfer.objects.filter(sender_wallet=self.request.user.wallet)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["currency"] = self.request.user.wallet.currency
+        return context
+
+
+class BatchTransferView(APIView):
+    """
+    Send many transfers from the caller's wallet in one request and one
+    database transaction. Responds with a result per item, in request order.
+
+    The batch is all or nothing: if any item fails (insufficient funds, an
+    unknown receiver, ...) no transfer is made and the response is a 400
+    whose results mark the other items ``"skipped"``. Send
+    ``"allow_partial": true`` to apply the items that can be applied and
+    get a 200 reporting the rest.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @idempotent("transfer_batch")
+    def post(self, request, *args, **kwargs):
+        serializer = BatchTransferSerializer(
+            data=request.data, context={"currency": request.user.wallet.currency}
+        )
+        if serializer.is_valid():
+            allow_partial = serializer.validated_data["allow_partial"]
+            results = WalletService.transfer_many(
+                request.user.wallet, serializer.validated_data["transfers"], allow_partial
+            )
+            succeeded = sum(1 for item in results if item["status"] == "success")
+            failed = sum(1 for item in results if item["status"] == "error")
+            return Response(
+                {
+                    "succeeded": succeeded,
+                    "failed": failed,
+                    "results": results,
+                },
+                status=(
+                    status.HTTP_200_OK
+                    if allow_partial or not failed
+                    else status.HTTP_400_BAD_REQUEST
+                ),
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class SettlementView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent("settle")
     def post(self, request, *args, **kwargs):
-        serializer = SettlementSerializer(data=request.data)
+        serializer = SettlementSerializer(
+            data=request.data, context={"currency": request.user.wallet.currency}
+        )
         if serializer.is_valid():
             amount = serializer.validated_data["amount"]
             try:
@@ -253,3 +412,15 @@ class SettlementView(APIView):
             except ValueError as e:
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class WalletMetricsView(APIView):
+    """
+    Operational counters of the wallet app (retries, failures, ...).
+    Restricted to staff users.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)